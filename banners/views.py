@@ -2,6 +2,7 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.db.models import Q
+from products.conditional import ConditionalGetMixin
 from .models import Banner
 from .serializers import (
     BannerSerializer, 
@@ -147,7 +148,7 @@ class BannerDetailView(generics.RetrieveUpdateDestroyAPIView):
             'message': 'Banner deleted successfully'
         }, status=status.HTTP_204_NO_CONTENT)
 
-class ActiveBannerListView(generics.ListAPIView):
+class ActiveBannerListView(ConditionalGetMixin, generics.ListAPIView):
     """
     GET: List only active banners (public endpoint)
     """
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the create-with-variants form parser.
+Compares products.variant_parser.parse_variants with the previous
+five-strategy parser of EnhancedProductCreateView (embedded below verbatim)
+on multipart-shaped payloads with 30+ variants and image files, both for
+the parser alone and for the request handling around it (debug dumps and
+the request.data copy the view made before validating).
+
+Usage: python benchmark_variant_parser.py [--variants 40] [--repeat 200] [--image-kb 200]
+"""
+
+import argparse
+import contextlib
+import os
+import timeit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'holister_backend.settings')
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+from products.variant_parser import parse_variants
+
+
+class LegacyVariantParser:
+    """EnhancedProductCreateView variant parsing before the single-pass parser"""
+
+    def _parse_variants_from_form_data(self, data, files):
+        """
+        Parse multipart form data to extract variants array.
+        Handles different data structures from frontend.
+        """
+        print("🔧 _parse_variants_from_form_data called")
+        print(f"  Input data type: {type(data)}")
+        print(f"  Input files type: {type(files)}")
+        print(f"  Data keys: {list(data.keys())}")
+        print(f"  Files keys: {list(files.keys())}")
+        
+        variants = []
+        
+        # Method 1: Check if variants is already a list (Frontend sends this way)
+        print("🔧 Method 1: Checking if variants is already a list...")
+        if 'variants' in data and isinstance(data['variants'], list):
+            print(f"✅ Method 1 succeeded: variants is already a list with {len(data['variants'])} items")
+            # Process the variants to match expected format
+            processed_variants = []
+            for i, variant in enumerate(data['variants']):
+                print(f"  Processing variant {i}: {variant}")
+                
+                processed_variant = {}
+                
+                # Handle name
+                if 'name' in variant:
+                    processed_variant['name'] = str(variant['name'])
+                    print(f"    Name: {processed_variant['name']}")
+                else:
+                    print(f"    ❌ Missing name for variant {i}")
+                    continue
+                
+                # Handle color
+                if 'color' in variant:
+                    processed_variant['color'] = str(variant['color'])
+                    print(f"    Color: {processed_variant['color']}")
+                else:
+                    print(f"    ❌ Missing color for variant {i}")
+                    continue
+                
+                # Handle stock (convert from stock_quantity if needed)
+                if 'stock' in variant:
+                    stock_value = variant['stock']
+                elif 'stock_quantity' in variant:
+                    stock_value = variant['stock_quantity']
+                else:
+                    stock_value = 0
+                
+                try:
+                    processed_variant['stock'] = int(stock_value)
+                    print(f"    Stock: {processed_variant['stock']}")
+                except (ValueError, TypeError) as e:
+                    print(f"    Stock conversion failed: {e}")
+                    processed_variant['stock'] = 0
+                
+                # Handle sizes (convert from array to string if needed)
+                if 'sizes' in variant:
+                    sizes_data = variant['sizes']
+                    if isinstance(sizes_data, list):
+                        processed_variant['sizes'] = [str(size) for size in sizes_data]
+                        print(f"    Sizes (from array): {processed_variant['sizes']}")
+                    elif isinstance(sizes_data, str):
+                        processed_variant['sizes'] = [size.strip() for size in sizes_data.split(',')]
+                        print(f"    Sizes (from string): {processed_variant['sizes']}")
+                    else:
+                        processed_variant['sizes'] = []
+                        print(f"    Sizes (unknown type): {sizes_data}")
+                else:
+                    processed_variant['sizes'] = []
+                    print(f"    Sizes: Not found")
+                
+                # Handle image files if present
+                if 'variant_icon' in variant:
+                    processed_variant['variant_icon'] = variant['variant_icon']
+                    print(f"    Icon: {variant['variant_icon']}")
+                
+                if 'variant_picture' in variant:
+                    processed_variant['variant_picture'] = variant['variant_picture']
+                    print(f"    Picture: {variant['variant_picture']}")
+                
+                # Only add variant if it has required fields
+                if processed_variant['name'] and processed_variant['color']:
+                    processed_variants.append(processed_variant)
+                    print(f"    ✅ Variant {i} processed and added")
+                else:
+                    print(f"    ❌ Variant {i} skipped - missing required fields")
+            
+            print(f"  Total processed variants: {len(processed_variants)}")
+            return processed_variants
+        
+        # Method 2: Try to parse array-style field names
+        print("🔧 Method 2: Trying array-style field names...")
+        variants_data = self._parse_array_style_fields(data, files)
+        if variants_data:
+            print(f"✅ Method 2 succeeded: {len(variants_data)} variants found")
+            return variants_data
+        print("❌ Method 2 failed")
+        
+        # Method 3: Try to parse if variants is a JSON string
+        print("🔧 Method 3: Checking if variants is a JSON string...")
+        if 'variants' in data and isinstance(data['variants'], str):
+            try:
+                import json
+                parsed_variants = json.loads(data['variants'])
+                if isinstance(parsed_variants, list):
+                    print(f"✅ Method 3 succeeded: parsed JSON variants with {len(parsed_variants)} items")
+                    return parsed_variants
+            except (json.JSONDecodeError, TypeError) as e:
+                print(f"❌ Method 3 failed: JSON decode error - {e}")
+        print("❌ Method 3 failed")
+        
+        # Method 4: Try to parse individual variant fields
+        print("🔧 Method 4: Checking for individual variant fields...")
+        variants_data = self._parse_individual_variant_fields(data, files)
+        if variants_data:
+            print(f"✅ Method 4 succeeded: {len(variants_data)} variants found")
+            return variants_data
+        print("❌ Method 4 failed")
+        
+        # Method 5: Try to parse variant_0_name style fields
+        print("🔧 Method 5: Checking for variant_0_name style fields...")
+        variants_data = self._parse_variant_indexed_fields(data, files)
+        if variants_data:
+            print(f"✅ Method 5 succeeded: {len(variants_data)} variants found")
+            return variants_data
+        print("❌ Method 5 failed")
+        
+        print("❌ All parsing methods failed - returning empty list")
+        return []
+    
+    def _parse_array_style_fields(self, data, files):
+        """Parse variants[0][name] style fields"""
+        print("🔧 _parse_array_style_fields called")
+        variants = []
+        variant_index = 0
+        
+        while True:
+            # Check if we have a variant at this index
+            name_key = f'variants[{variant_index}][name]'
+            if name_key not in data:
+                print(f"  No more variants found at index {variant_index}")
+                break
+            
+            print(f"  Found variant at index {variant_index}")
+            variant_data = {}
+            
+            # Extract basic fields
+            variant_data['name'] = data.get(f'variants[{variant_index}][name]', '')
+            variant_data['color'] = data.get(f'variants[{variant_index}][color]', '')
+            stock_value = data.get(f'variants[{variant_index}][stock]', 0)
+            
+            print(f"    Name: {variant_data['name']}")
+            print(f"    Color: {variant_data['color']}")
+            print(f"    Stock (raw): {stock_value} (type: {type(stock_value)})")
+            
+            # Convert stock to integer
+            try:
+                variant_data['stock'] = int(stock_value)
+                print(f"    Stock (converted): {variant_data['stock']}")
+            except (ValueError, TypeError) as e:
+                print(f"    Stock conversion failed: {e}")
+                variant_data['stock'] = 0
+            
+            # Extract image files
+            icon_key = f'variants[{variant_index}][variant_icon]'
+            if icon_key in files and files[icon_key]:
+                variant_data['variant_icon'] = files[icon_key]
+                print(f"    Icon: {files[icon_key].name}")
+            else:
+                print(f"    Icon: Not found or empty")
+            
+            picture_key = f'variants[{variant_index}][variant_picture]'
+            if picture_key in files and files[picture_key]:
+                variant_data['variant_picture'] = files[picture_key]
+                print(f"    Picture: {files[picture_key].name}")
+            else:
+                print(f"    Picture: Not found or empty")
+            
+            # Extract sizes
+            sizes_key = f'variants[{variant_index}][sizes]'
+            if sizes_key in data:
+                sizes_str = data[sizes_key]
+                print(f"    Sizes (raw): {sizes_str} (type: {type(sizes_str)})")
+                if isinstance(sizes_str, str):
+                    variant_data['sizes'] = [size.strip() for size in sizes_str.split(',')]
+                    print(f"    Sizes (parsed): {variant_data['sizes']}")
+                else:
+                    variant_data['sizes'] = sizes_str
+                    print(f"    Sizes (direct): {variant_data['sizes']}")
+            else:
+                print(f"    Sizes: Not found")
+            
+            # Only add variant if it has required fields
+            if variant_data['name'] and variant_data['color']:
+                variants.append(variant_data)
+                print(f"    ✅ Variant added to list")
+            else:
+                print(f"    ❌ Variant skipped - missing name or color")
+            
+            variant_index += 1
+        
+        print(f"  Total variants parsed: {len(variants)}")
+        return variants
+    
+    def _parse_individual_variant_fields(self, data, files):
+        """Parse individual variant fields if they exist"""
+        variants = []
+        
+        # Look for variant fields in the data
+        variant_fields = {}
+        for key, value in data.items():
+            if key.startswith('variant_'):
+                variant_fields[key] = value
+        
+        if variant_fields:
+            # This might be a single variant
+            variant_data = {}
+            variant_data['name'] = data.get('variant_name', '')
+            variant_data['color'] = data.get('variant_color', '')
+            variant_data['stock'] = int(data.get('variant_stock', 0))
+            
+            # Handle sizes
+            sizes_str = data.get('variant_sizes', '')
+            if sizes_str:
+                variant_data['sizes'] = [size.strip() for size in sizes_str.split(',')]
+            
+            if variant_data['name'] and variant_data['color']:
+                variants.append(variant_data)
+        
+        return variants
+    
+    def _parse_variant_indexed_fields(self, data, files):
+        """Parse variant_0_name, variant_0_color style fields"""
+        print("🔧 _parse_variant_indexed_fields called")
+        variants = []
+        variant_index = 0
+        
+        while True:
+            # Check if we have a variant at this index
+            name_key = f'variant_{variant_index}_name'
+            if name_key not in data:
+                print(f"  No more variants found at index {variant_index}")
+                break
+            
+            print(f"  Found variant at index {variant_index}")
+            variant_data = {}
+            
+            # Extract basic fields
+            variant_data['name'] = data.get(f'variant_{variant_index}_name', '')
+            variant_data['color'] = data.get(f'variant_{variant_index}_color', '')
+            # Handle both stock and stock_quantity field names
+            stock_value = data.get(f'variant_{variant_index}_stock_quantity', 
+                                 data.get(f'variant_{variant_index}_stock', 0))
+            
+            print(f"    Name: {variant_data['name']}")
+            print(f"    Color: {variant_data['color']}")
+            print(f"    Stock (raw): {stock_value} (type: {type(stock_value)})")
+            
+            # Convert stock to integer
+            try:
+                variant_data['stock'] = int(stock_value)
+                print(f"    Stock (converted): {variant_data['stock']}")
+            except (ValueError, TypeError) as e:
+                print(f"    Stock conversion failed: {e}")
+                variant_data['stock'] = 0
+            
+            # Extract image files
+            icon_key = f'variant_{variant_index}_icon'
+            if icon_key in files and files[icon_key]:
+                variant_data['variant_icon'] = files[icon_key]
+                print(f"    Icon: {files[icon_key].name}")
+            else:
+                print(f"    Icon: Not found or empty")
+            
+            picture_key = f'variant_{variant_index}_image'
+            if picture_key in files and files[picture_key]:
+                variant_data['variant_picture'] = files[picture_key]
+                print(f"    Picture: {files[picture_key].name}")
+            else:
+                print(f"    Picture: Not found or empty")
+            
+            # Extract sizes
+            sizes_key = f'variant_{variant_index}_sizes'
+            if sizes_key in data:
+                sizes_str = data[sizes_key]
+                print(f"    Sizes (raw): {sizes_str} (type: {type(sizes_str)})")
+                if isinstance(sizes_str, str):
+                    variant_data['sizes'] = [size.strip() for size in sizes_str.split(',')]
+                    print(f"    Sizes (parsed): {variant_data['sizes']}")
+                else:
+                    variant_data['sizes'] = sizes_str
+                    print(f"    Sizes (direct): {variant_data['sizes']}")
+            else:
+                print(f"    Sizes: Not found")
+            
+            # Only add variant if it has required fields
+            if variant_data['name'] and variant_data['color']:
+                variants.append(variant_data)
+                print(f"    ✅ Variant added to list")
+            else:
+                print(f"    ❌ Variant skipped - missing name or color")
+            
+            variant_index += 1
+        
+        print(f"  Total variants parsed: {len(variants)}")
+        return variants
+
+
+    def create_preamble(self, request_data, files):
+        """The request handling EnhancedProductCreateView.create did before validation"""
+        print("📊 REQUEST.DATA CONTENTS:")
+        print("-" * 40)
+        for key, value in request_data.items():
+            print(f"  {key}: {type(value)} = {repr(value)}")
+        print()
+        
+        print("📁 REQUEST.FILES CONTENTS:")
+        print("-" * 40)
+        for key, value in files.items():
+            print(f"  {key}: {type(value)} = {value.name if hasattr(value, 'name') else value}")
+        print()
+        
+        variants_data = self._parse_variants_from_form_data(request_data, files)
+        print(f"  Content: {variants_data}")
+        
+        data = request_data.copy()
+        data['variants'] = variants_data
+        return variants_data
+
+
+def build_payload(shape, count, image_bytes):
+    """
+    Product form fields plus `count` variants in the given key shape.
+    Returns (request.data, request.FILES) as DRF builds them for multipart
+    requests, where request.data also holds the uploaded files.
+    """
+    data = QueryDict(mutable=True)
+    files = MultiValueDict()
+    for key, value in {'name': 'Hoodie', 'sku': 'HOOD-1', 'category': 'Hoodies', 'selling_price': '40.00'}.items():
+        data[key] = value
+    for index in range(count):
+        if shape == 'bracket':
+            prefix, icon, picture = f'variants[{index}]', f'variants[{index}][variant_icon]', f'variants[{index}][variant_picture]'
+            keys = {f'{prefix}[name]': f'Color {index}', f'{prefix}[color]': f'Color {index}',
+                    f'{prefix}[stock]': '5', f'{prefix}[sizes]': 'XS,S,M,L,XL'}
+        else:
+            prefix, icon, picture = f'variant_{index}', f'variant_{index}_icon', f'variant_{index}_image'
+            keys = {f'{prefix}_name': f'Color {index}', f'{prefix}_color': f'Color {index}',
+                    f'{prefix}_stock_quantity': '5', f'{prefix}_sizes': 'XS,S,M,L,XL'}
+        for key, value in keys.items():
+            data[key] = value
+        files[icon] = SimpleUploadedFile(f'icon_{index}.png', image_bytes)
+        files[picture] = SimpleUploadedFile(f'picture_{index}.png', image_bytes)
+    data.update(files)
+    return data, files
+
+
+def per_call_ms(function, repeat):
+    return timeit.timeit(function, number=repeat) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--variants', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--image-kb', type=int, default=200, help='Size of each uploaded image')
+    args = parser.parse_args()
+
+    legacy = LegacyVariantParser()
+    image_bytes = os.urandom(args.image_kb * 1024)
+    for shape in ('bracket', 'indexed'):
+        data, files = build_payload(shape, args.variants, image_bytes)
+        assert len(parse_variants(data, files)) == args.variants
+
+        # Legacy print() output goes to a real file, as it would to a log in production
+        with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink):
+            assert len(legacy._parse_variants_from_form_data(data, files)) == args.variants
+            legacy_parse = per_call_ms(lambda: legacy._parse_variants_from_form_data(data, files), args.repeat)
+            legacy_request = per_call_ms(lambda: legacy.create_preamble(data, files), args.repeat)
+        new_parse = per_call_ms(lambda: parse_variants(data, files), args.repeat)
+        new_request = per_call_ms(
+            lambda: [variant.as_dict() for variant in parse_variants(data, files)], args.repeat
+        )
+
+        print(f'{shape} ({args.variants} variants, {len(files)} files of {args.image_kb} KB):')
+        print(f'  parser only:      legacy {legacy_parse:8.3f} ms  single-pass {new_parse:7.3f} ms  '
+              f'({legacy_parse / new_parse:.1f}x)')
+        print(f'  request handling: legacy {legacy_request:8.3f} ms  single-pass {new_request:7.3f} ms  '
+              f'({legacy_request / new_request:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -100,6 +100,31 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='holister-cache'),
+    }
+}
+
+# Seconds a serialized product detail payload may live in the cache
+PRODUCT_DETAIL_CACHE_TIMEOUT = config('PRODUCT_DETAIL_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Upper bound on the age of the admin dashboard inventory snapshot
+INVENTORY_STATS_CACHE_TIMEOUT = config('INVENTORY_STATS_CACHE_TIMEOUT', default=900, cast=int)
+
+# Upper bound on the age of the homepage snapshot (banner and featured product writes drop it earlier)
+HOMEPAGE_CACHE_TIMEOUT = config('HOMEPAGE_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Buffer helpful votes and fold them into the review counters with the
+# flush_review_votes command (`--loop` flushes every REVIEW_VOTE_FLUSH_INTERVAL seconds)
+REVIEW_VOTE_BUFFERING = config('REVIEW_VOTE_BUFFERING', default=False, cast=bool)
+REVIEW_VOTE_FLUSH_INTERVAL = config('REVIEW_VOTE_FLUSH_INTERVAL', default=5, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, Min, OuterRef
+from orders.models import Order, OrderItem, ProductPurchase
+from products.models import Review
+from products.signals import products_changed
+
+
+class Command(BaseCommand):
+    help = 'Index past orders for verified-purchase reviews and flag the matching existing reviews'
+
+    def handle(self, *args, **kwargs):
+        purchases = (
+            OrderItem.objects.exclude(order__status__in=[Order.Status.CANCELLED, Order.Status.REFUNDED])
+            .order_by().values('order__customer_id', 'product_id')
+            .annotate(purchased_at=Min('order__created_at'))
+        )
+        ProductPurchase.objects.bulk_create([
+            ProductPurchase(
+                customer_id=row['order__customer_id'],
+                product_id=row['product_id'],
+                purchased_at=row['purchased_at'],
+            )
+            for row in purchases
+        ], batch_size=500, ignore_conflicts=True)
+        
+        purchased = ProductPurchase.objects.filter(customer=OuterRef('user'), product=OuterRef('product'))
+        reviews = Review.objects.filter(Exists(purchased), is_verified_purchase=False)
+        product_ids = list(reviews.values_list('product_id', flat=True))
+        verified = reviews.update(is_verified_purchase=True)
+        products_changed(product_ids)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {ProductPurchase.objects.count()} customer purchases, verified {verified} reviews'
+        ))
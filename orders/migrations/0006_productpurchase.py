@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_cart_applied_coupon_cart_coupon_discount_amount_and_more'),
+        ('products', '0027_review_verified_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purchased_at', models.DateTimeField(help_text='When the customer first ordered the product')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_purchases', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchases', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Product Purchase',
+                'verbose_name_plural': 'Product Purchases',
+                'unique_together': {('customer', 'product')},
+            },
+        ),
+    ]
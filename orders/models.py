@@ -95,6 +95,13 @@ class Order(models.Model):
     def __str__(self):
         return f"Order {self.order_number}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot of the stored row, used by signals to detect status changes
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
     @property
     def item_count(self):
         return self.items.count()
@@ -159,3 +166,53 @@ class ShippingAddress(models.Model):
     
     def __str__(self):
         return f"{self.user.email} - {self.address_line_1}"
+
+class ProductPurchase(models.Model):
+    """
+    Index of the products each customer has ordered, one row per
+    (customer, product). Filled at order creation and by the
+    backfill_product_purchases command, and re-derived when an order is
+    cancelled, refunded, reinstated or deleted; review creation reads it
+    to set Review.is_verified_purchase.
+    """
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='product_purchases')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='purchases')
+    purchased_at = models.DateTimeField(help_text="When the customer first ordered the product")
+    
+    class Meta:
+        verbose_name = _('Product Purchase')
+        verbose_name_plural = _('Product Purchases')
+        unique_together = ['customer', 'product']
+    
+    def __str__(self):
+        return f"{self.customer_id} bought {self.product_id}"
+    
+    @classmethod
+    def record_order(cls, order):
+        """Index the products of a newly placed order; already indexed pairs are kept"""
+        product_ids = set(order.items.values_list('product_id', flat=True))
+        cls.objects.bulk_create([
+            cls(customer_id=order.customer_id, product_id=product_id, purchased_at=order.created_at)
+            for product_id in product_ids
+        ], ignore_conflicts=True)
+    
+    @classmethod
+    def refresh_order(cls, order, deleted=False):
+        """
+        Re-derive the order customer's rows for the order's products from
+        their orders that still count (not cancelled or refunded, and not
+        this order when it is being deleted). Returns the product ids.
+        """
+        product_ids = set(order.items.values_list('product_id', flat=True))
+        items = OrderItem.objects.filter(order__customer_id=order.customer_id, product_id__in=product_ids).exclude(
+            order__status__in=[Order.Status.CANCELLED, Order.Status.REFUNDED]
+        )
+        if deleted:
+            items = items.exclude(order=order)
+        purchases = items.order_by().values('product_id').annotate(purchased_at=models.Min('order__created_at'))
+        cls.objects.filter(customer_id=order.customer_id, product_id__in=product_ids).delete()
+        cls.objects.bulk_create([
+            cls(customer_id=order.customer_id, product_id=row['product_id'], purchased_at=row['purchased_at'])
+            for row in purchases
+        ])
+        return product_ids
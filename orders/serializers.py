@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from .models import Order, OrderItem, OrderStatusHistory, ShippingAddress, Cart, CartItem
+from .models import Order, OrderItem, OrderStatusHistory, ShippingAddress, Cart, CartItem, ProductPurchase
 from products.models import Product, ProductVariant, ProductSize
+from products.bestsellers import record_order_sales
 from accounts.serializers import UserProfileSerializer
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -267,6 +268,8 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         
         order.total_amount = total_amount
         order.save()
+        ProductPurchase.record_order(order)
+        record_order_sales(order)
         
         # Create initial status history
         OrderStatusHistory.objects.create(
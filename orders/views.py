@@ -4,10 +4,13 @@ from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.db import transaction
-from django.db.models import Q, Sum, Count
+from django.db.models import Q, Sum, Count, F
 from django_filters.rest_framework import DjangoFilterBackend
 import uuid
-from .models import Order, OrderItem, OrderStatusHistory, ShippingAddress, Cart, CartItem
+from products.models import ProductSize
+from products.signals import products_changed
+from products.bestsellers import record_order_sales
+from .models import Order, OrderItem, OrderStatusHistory, ShippingAddress, Cart, CartItem, ProductPurchase
 from .serializers import (
     OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer, 
     OrderStatusUpdateSerializer, OrderItemCreateSerializer, 
@@ -379,14 +382,17 @@ def checkout_view(request):
                 )
                 
                 # Create order items from cart items
-                for cart_item in cart.items.all():
-                    # Check stock availability
-                    if cart_item.size:
-                        if cart_item.size.stock < cart_item.quantity:
+                stocked_products = set()
+                for cart_item in cart.items.select_related('product', 'variant', 'size'):
+                    if cart_item.size_id:
+                        # Check and decrement in one conditional UPDATE so
+                        # concurrent checkouts cannot oversell a size
+                        reserved = ProductSize.objects.filter(
+                            pk=cart_item.size_id, stock__gte=cart_item.quantity
+                        ).update(stock=F('stock') - cart_item.quantity)
+                        if not reserved:
                             raise Exception(f"Insufficient stock for {cart_item.product.name}")
-                        # Update stock
-                        cart_item.size.stock -= cart_item.quantity
-                        cart_item.size.save()
+                        stocked_products.add(cart_item.product_id)
                     
                     OrderItem.objects.create(
                         order=order,
@@ -398,6 +404,11 @@ def checkout_view(request):
                         total_price=cart_item.total_price
                     )
                 
+                # Stock moved through queryset updates; refresh cards, availability and caches
+                products_changed(stocked_products)
+                ProductPurchase.record_order(order)
+                record_order_sales(order)
+                
                 # Create initial status history
                 OrderStatusHistory.objects.create(
                     order=order,
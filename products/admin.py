@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, ProductVariant, ProductSize, Review, Category
+from .models import Product, ProductVariant, ProductSize, Review, Category, VariantImageJob
 
 class ProductSizeInline(admin.TabularInline):
     model = ProductSize
@@ -46,6 +46,14 @@ class ProductSizeAdmin(admin.ModelAdmin):
     search_fields = ('variant__name', 'size')
 
 
+@admin.register(VariantImageJob)
+class VariantImageJobAdmin(admin.ModelAdmin):
+    list_display = ('variant', 'field', 'status', 'attempts', 'updated_at')
+    list_filter = ('status', 'field')
+    search_fields = ('variant__name', 'variant__product__name', 'source')
+    readonly_fields = ('variant', 'field', 'source', 'attempts', 'error', 'created_at', 'updated_at')
+
+
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('product', 'user', 'rating', 'is_verified_purchase', 'helpful_votes', 'created_at')
@@ -69,12 +77,8 @@ class ReviewAdmin(admin.ModelAdmin):
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'is_active', 'product_count', 'created_at')
+    list_display = ('name', 'is_active', 'active_product_count', 'created_at')
     list_filter = ('is_active', 'created_at')
     search_fields = ('name', 'description')
     ordering = ('name',)
-    
-    def product_count(self, obj):
-        from .models import Product
-        return Product.objects.filter(category=obj.name).count()
-    product_count.short_description = 'Products'
+    readonly_fields = ('active_product_count',)
@@ -0,0 +1,52 @@
+from .models import ProductAvailability, ProductSize, ProductVariant
+
+# Products refreshed per query batch
+AVAILABILITY_BATCH_SIZE = 500
+
+
+def stocked_combinations(product_ids):
+    """
+    Set of (product_id, color, size) that can be bought right now: sizes
+    with stock, and variants stocked without sizes (size '').
+    """
+    sized = ProductSize.objects.filter(
+        variant__product__in=product_ids, stock__gt=0
+    ).values_list('variant__product_id', 'variant__color', 'size')
+    unsized = ProductVariant.objects.filter(
+        product__in=product_ids, stock__gt=0, sizes__isnull=True
+    ).values_list('product_id', 'color')
+    return set(sized) | {(product_id, color, '') for product_id, color in unsized}
+
+
+def refresh_product_availability(product_ids):
+    """
+    Bring the availability rows of the given products in line with their
+    variant and size stock, touching only the rows that changed.
+    """
+    product_ids = sorted(set(product_ids))
+    for start in range(0, len(product_ids), AVAILABILITY_BATCH_SIZE):
+        batch = product_ids[start:start + AVAILABILITY_BATCH_SIZE]
+        current = {
+            (row[1], row[2], row[3]): row[0] for row in
+            ProductAvailability.objects.filter(product__in=batch).values_list('id', 'product_id', 'color', 'size')
+        }
+        wanted = stocked_combinations(batch)
+        
+        stale = [row_id for combination, row_id in current.items() if combination not in wanted]
+        for offset in range(0, len(stale), AVAILABILITY_BATCH_SIZE):
+            ProductAvailability.objects.filter(pk__in=stale[offset:offset + AVAILABILITY_BATCH_SIZE]).delete()
+        ProductAvailability.objects.bulk_create([
+            ProductAvailability(product_id=product_id, color=color, size=size)
+            for product_id, color, size in wanted if (product_id, color, size) not in current
+        ])
+
+
+def rebuild_product_availability():
+    """Rebuild the whole index; returns the number of in-stock combinations"""
+    ProductAvailability.objects.all().delete()
+    rows = [
+        ProductAvailability(product_id=product_id, color=color, size=size)
+        for product_id, color, size in stocked_combinations(ProductVariant.objects.values('product'))
+    ]
+    ProductAvailability.objects.bulk_create(rows, batch_size=AVAILABILITY_BATCH_SIZE)
+    return len(rows)
@@ -0,0 +1,161 @@
+"""
+Best-seller leaderboards per category over rolling 7, 30 and 90 day windows.
+
+Order events keep two tables current. ProductDailySales holds the units
+sold per product and order date; BestSeller holds the window totals the
+leaderboards and ?ordering=best_selling read. Placing an order adds its
+units, and cancelling, refunding or deleting it takes them back out of the
+day it was placed on. Windows only slide forward when rebuild_best_sellers
+re-rolls them from the daily buckets, so that command runs once a day.
+"""
+from datetime import timedelta
+from django.db import connections, router, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from .models import BestSeller, Product, ProductDailySales
+
+BEST_SELLER_WINDOWS = tuple(BestSeller.Window.values)
+DEFAULT_WINDOW = BestSeller.Window.MONTH
+BEST_SELLERS_LIMIT = 10
+MAX_BEST_SELLERS_LIMIT = 100
+
+# Orders in these states are not sales
+UNCOUNTED_ORDER_STATUSES = (Order.Status.CANCELLED, Order.Status.REFUNDED)
+
+# Products per query batch and rows per bulk insert
+BEST_SELLER_BATCH_SIZE = 500
+
+
+def parse_window(value):
+    """The window in days named by a query param, or None if it is not one of the windows"""
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return None
+    return days if days in BEST_SELLER_WINDOWS else None
+
+
+def is_counted(status):
+    return status not in UNCOUNTED_ORDER_STATUSES
+
+
+def _increment(model, key_fields, rows, copied_fields=()):
+    """
+    Add quantity deltas to the rows of `model` identified by `key_fields`,
+    creating missing rows, with one upsert statement. Each row is a tuple
+    of key values, copied values and the delta; copied fields are
+    overwritten with the new values.
+    """
+    if not rows:
+        return
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    keys = [quote(model._meta.get_field(name).column) for name in key_fields]
+    copied = [quote(model._meta.get_field(name).column) for name in copied_fields]
+    quantity = quote('quantity')
+    columns = ', '.join(keys + copied + [quantity])
+    placeholders = ', '.join(['%s'] * (len(keys) + len(copied) + 1))
+    updates = [f'{column} = excluded.{column}' for column in copied]
+    updates.append(f'{quantity} = {table}.{quantity} + excluded.{quantity}')
+    sql = (
+        f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) '
+        f'ON CONFLICT ({", ".join(keys)}) DO UPDATE SET {", ".join(updates)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def record_order_sales(order, sign=1):
+    """
+    Add the units of an order to the daily buckets and to every window that
+    still covers the day it was placed on; sign=-1 takes them back out.
+    """
+    sales = (
+        OrderItem.objects.filter(order=order).order_by()
+        .values_list('product_id', 'product__category').annotate(units=Sum('quantity'))
+    )
+    sales = [(product_id, category, sign * units) for product_id, category, units in sales if units]
+    if not sales:
+        return
+    
+    day = timezone.localdate(order.created_at)
+    age = (timezone.localdate() - day).days
+    _increment(ProductDailySales, ('product', 'day'), [(product_id, day, units) for product_id, _, units in sales])
+    _increment(BestSeller, ('days', 'product'), [
+        (days, product_id, category, units)
+        for days in BEST_SELLER_WINDOWS if age < days
+        for product_id, category, units in sales
+    ], copied_fields=('category',))
+
+
+def order_status_changed(order, previous_status):
+    """Move an order's units in or out of the leaderboards when it is cancelled, refunded or reinstated"""
+    if is_counted(previous_status) != is_counted(order.status):
+        record_order_sales(order, 1 if is_counted(order.status) else -1)
+
+
+def refresh_best_seller_categories(product_ids):
+    """Copy changed product categories onto their leaderboard rows"""
+    category = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('category')[:1])
+    product_ids = sorted(set(product_ids))
+    for start in range(0, len(product_ids), BEST_SELLER_BATCH_SIZE):
+        batch = product_ids[start:start + BEST_SELLER_BATCH_SIZE]
+        BestSeller.objects.filter(product__in=batch).exclude(category=category).update(category=category)
+
+
+def roll_best_sellers(today=None):
+    """
+    Recompute every window from the daily buckets as of `today` and drop
+    buckets older than the longest window. Returns the number of rows.
+    """
+    today = today or timezone.localdate()
+    rows = []
+    for days in BEST_SELLER_WINDOWS:
+        totals = (
+            ProductDailySales.objects.filter(day__gt=today - timedelta(days=days)).order_by()
+            .values_list('product_id', 'product__category').annotate(units=Sum('quantity')).filter(units__gt=0)
+        )
+        rows.extend(
+            BestSeller(days=days, product_id=product_id, category=category, quantity=units)
+            for product_id, category, units in totals
+        )
+    
+    with transaction.atomic():
+        ProductDailySales.objects.filter(day__lte=today - timedelta(days=max(BEST_SELLER_WINDOWS))).delete()
+        BestSeller.objects.all().delete()
+        BestSeller.objects.bulk_create(rows, batch_size=BEST_SELLER_BATCH_SIZE)
+    return len(rows)
+
+
+def rebuild_daily_sales(today=None):
+    """Recount the daily buckets of the longest window from the order items"""
+    today = today or timezone.localdate()
+    since = today - timedelta(days=max(BEST_SELLER_WINDOWS) - 1)
+    sales = (
+        OrderItem.objects.exclude(order__status__in=UNCOUNTED_ORDER_STATUSES)
+        .annotate(day=TruncDate('order__created_at')).filter(day__gte=since).order_by()
+        .values_list('product_id', 'day').annotate(units=Coalesce(Sum('quantity'), 0))
+    )
+    rows = [ProductDailySales(product_id=product_id, day=day, quantity=units) for product_id, day, units in sales]
+    
+    with transaction.atomic():
+        ProductDailySales.objects.all().delete()
+        ProductDailySales.objects.bulk_create(rows, batch_size=BEST_SELLER_BATCH_SIZE)
+    return len(rows)
+
+
+def best_selling(days=DEFAULT_WINDOW):
+    """Annotation with a product's units sold over the window, for ordering product querysets"""
+    units = BestSeller.objects.filter(days=days, product=OuterRef('pk')).values('quantity')[:1]
+    return Coalesce(Subquery(units), 0)
+
+
+def best_seller_cards(days=DEFAULT_WINDOW, category=None, limit=BEST_SELLERS_LIMIT):
+    """Stored cards of the top selling active products over the window, best first"""
+    rows = BestSeller.objects.filter(days=days, quantity__gt=0, product__card__isnull=False)
+    if category:
+        rows = rows.filter(category=category)
+    return list(rows.order_by('-quantity', 'product').values_list('product__card__data', flat=True)[:limit])
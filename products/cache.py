@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Bump when the ProductDetailSerializer output changes so stale payloads are ignored
+DETAIL_CACHE_VERSION = 3
+
+
+def product_detail_key(product_id):
+    return f'products:detail:{product_id}'
+
+
+def get_cached_product_detail(product_id):
+    return cache.get(product_detail_key(product_id), version=DETAIL_CACHE_VERSION)
+
+
+def set_cached_product_detail(product_id, data):
+    timeout = getattr(settings, 'PRODUCT_DETAIL_CACHE_TIMEOUT', 60 * 60)
+    cache.set(product_detail_key(product_id), data, timeout, version=DETAIL_CACHE_VERSION)
+
+
+def invalidate_product_details(product_ids):
+    """
+    Drop cached detail payloads for the given products.
+    The keys are deleted right away and again once the surrounding
+    transaction commits, so a reader that cached the pre-commit state
+    in between cannot keep serving it.
+    """
+    keys = [product_detail_key(product_id) for product_id in set(product_ids)]
+    if not keys:
+        return
+    cache.delete_many(keys, version=DETAIL_CACHE_VERSION)
+    transaction.on_commit(lambda: cache.delete_many(keys, version=DETAIL_CACHE_VERSION))
+
+
+INVENTORY_STATS_KEY = 'products:inventory-stats'
+INVENTORY_STATS_CACHE_VERSION = 1
+
+
+def get_cached_inventory_stats():
+    return cache.get(INVENTORY_STATS_KEY, version=INVENTORY_STATS_CACHE_VERSION)
+
+
+def set_cached_inventory_stats(data):
+    timeout = getattr(settings, 'INVENTORY_STATS_CACHE_TIMEOUT', 15 * 60)
+    cache.set(INVENTORY_STATS_KEY, data, timeout, version=INVENTORY_STATS_CACHE_VERSION)
+
+
+def invalidate_inventory_stats():
+    """Drop the dashboard inventory snapshot, again once the transaction commits"""
+    cache.delete(INVENTORY_STATS_KEY, version=INVENTORY_STATS_CACHE_VERSION)
+    transaction.on_commit(lambda: cache.delete(INVENTORY_STATS_KEY, version=INVENTORY_STATS_CACHE_VERSION))
+
+
+HOMEPAGE_KEY = 'products:homepage'
+# Bump when the homepage snapshot layout changes
+HOMEPAGE_CACHE_VERSION = 1
+
+
+def get_cached_homepage():
+    return cache.get(HOMEPAGE_KEY, version=HOMEPAGE_CACHE_VERSION)
+
+
+def set_cached_homepage(snapshot):
+    timeout = getattr(settings, 'HOMEPAGE_CACHE_TIMEOUT', 60 * 60)
+    cache.set(HOMEPAGE_KEY, snapshot, timeout, version=HOMEPAGE_CACHE_VERSION)
+
+
+def invalidate_homepage():
+    """Drop the homepage snapshot, again once the transaction commits"""
+    cache.delete(HOMEPAGE_KEY, version=HOMEPAGE_CACHE_VERSION)
+    transaction.on_commit(lambda: cache.delete(HOMEPAGE_KEY, version=HOMEPAGE_CACHE_VERSION))
@@ -0,0 +1,86 @@
+import json
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from .models import Product, ProductCard, ProductVariant
+
+# Products rebuilt per query batch
+CARD_BATCH_SIZE = 500
+
+CARD_FIELDS = ('name', 'category', 'gender', 'selling_price', 'created_at')
+
+
+def primary_image(variants):
+    """
+    URL of the first variant picture (falling back to icons), preferring
+    its processed medium rendition. Storage URLs are relative to the site.
+    """
+    for field in ('variant_picture', 'variant_icon'):
+        for variant in variants:
+            image = getattr(variant, field)
+            if not image.name:
+                continue
+            rendition = (variant.renditions or {}).get(field) or {}
+            if rendition.get('source') == image.name and 'medium' in rendition:
+                return default_storage.url(rendition['medium'].get('webp') or rendition['medium']['jpeg'])
+            return default_storage.url(image.name)
+    return None
+
+
+def build_card(product):
+    """The card document of a product with its variants and sizes prefetched"""
+    variants = list(product.variants.all())
+    colors = list(dict.fromkeys(variant.color for variant in variants if variant.color))
+    in_stock = any(
+        any(size.stock > 0 for size in sizes) if sizes else variant.stock > 0
+        for variant, sizes in ((variant, list(variant.sizes.all())) for variant in variants)
+    )
+    return {
+        'id': product.pk,
+        'name': product.name,
+        'sku': product.sku,
+        'category': product.category,
+        'gender': product.gender,
+        'selling_price': f'{product.selling_price:.2f}',
+        'image': primary_image(variants),
+        'average_rating': round(product.average_rating, 2),
+        'review_count': product.review_count,
+        'colors': colors,
+        'in_stock': in_stock,
+    }
+
+
+def refresh_product_cards(product_ids):
+    """
+    Rebuild the cards of the given products with one upsert per batch.
+    Only active products have a card; deactivated products lose theirs and
+    cards of deleted products go away with them (cascade).
+    """
+    product_ids = sorted(set(product_ids))
+    variants = ProductVariant.objects.order_by('id').prefetch_related('sizes')
+    for start in range(0, len(product_ids), CARD_BATCH_SIZE):
+        batch = product_ids[start:start + CARD_BATCH_SIZE]
+        ProductCard.objects.filter(product__in=batch, product__is_active=False).delete()
+        products = Product.objects.filter(pk__in=batch, is_active=True).prefetch_related(
+            Prefetch('variants', queryset=variants)
+        )
+        cards = [
+            ProductCard(
+                product=product,
+                data=json.dumps(build_card(product), separators=(',', ':')),
+                **{field: getattr(product, field) for field in CARD_FIELDS}
+            )
+            for product in products
+        ]
+        if cards:
+            ProductCard.objects.bulk_create(
+                cards, update_conflicts=True, unique_fields=['product'],
+                update_fields=['data', *CARD_FIELDS, 'updated_at'],
+            )
+
+
+def rebuild_product_cards():
+    """Rebuild every card; returns the number of products carded"""
+    ProductCard.objects.filter(product__is_active=False).delete()
+    product_ids = list(Product.objects.filter(is_active=True).values_list('id', flat=True))
+    refresh_product_cards(product_ids)
+    return len(product_ids)
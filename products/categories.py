@@ -0,0 +1,56 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Category, Product
+
+
+def adjust_active_product_count(category_id, delta):
+    """Atomically shift the materialized active product count of a category"""
+    if category_id is not None and delta:
+        Category.objects.filter(pk=category_id).update(
+            active_product_count=F('active_product_count') + delta,
+            updated_at=timezone.now()
+        )
+
+
+def recount_active_products(queryset=None):
+    """
+    Recompute the materialized active product counts from the products table.
+    Returns the number of categories updated.
+    """
+    if queryset is None:
+        queryset = Category.objects.all()
+    
+    active = (
+        Product.objects.filter(category_ref=OuterRef('pk'), is_active=True)
+        .order_by().values('category_ref').annotate(total=Count('id')).values('total')
+    )
+    return queryset.update(active_product_count=Coalesce(Subquery(active), 0))
+
+
+def link_products_to_categories(create_missing=False):
+    """
+    Point products whose category_ref is empty at the Category row matching
+    their category name, one UPDATE per distinct name.
+    Returns (linked product count, names without a matching category).
+    """
+    unlinked = Product.objects.filter(category_ref__isnull=True)
+    unlinked_before = unlinked.count()
+    names = unlinked.exclude(category='').order_by().values_list('category', flat=True).distinct()
+    
+    unmatched = []
+    for name in names:
+        category = Category.for_name(name)
+        if category is None and create_missing and name.strip():
+            category = Category.objects.create(name=name.strip())
+        if category is None:
+            unmatched.append(name)
+            continue
+        
+        Product.objects.filter(category_ref__isnull=True, category=name).update(
+            category_ref=category, category=category.name
+        )
+    
+    recount_active_products()
+    # Creating a category links its products itself (see signals.category_post_save)
+    return unlinked_before - unlinked.count(), unmatched
@@ -0,0 +1,67 @@
+"""
+Catalog change feed for downstream sync (search, CDN purges, offline caches).
+
+Every product, variant, size and category write appends a CatalogChange
+row: model signals record the object itself and products_changed records
+the product whose tree changed, which also covers bulk paths that bypass
+signals (stock updates, imports, checkout). Consumers keep the sequence
+number of the last row they applied and ask for the rows after it, then
+re-fetch the products named in the page (e.g. through products/lookup/).
+"""
+from datetime import timedelta
+from django.utils import timezone
+from .models import CatalogChange
+
+CHANGE_FEED_LIMIT = 500
+MAX_CHANGE_FEED_LIMIT = 1000
+
+# Change rows inserted per statement
+CHANGE_BATCH_SIZE = 500
+
+
+class CursorExpired(Exception):
+    """The rows after the cursor have been pruned; the consumer has to resync from scratch"""
+
+
+def record_change(entity, object_id, action, product_id=None):
+    CatalogChange.objects.create(entity=entity, object_id=object_id, action=action, product_id=product_id)
+
+
+def record_product_changes(product_ids, action=CatalogChange.Action.UPDATED):
+    CatalogChange.objects.bulk_create([
+        CatalogChange(entity=CatalogChange.Entity.PRODUCT, object_id=pk, product_id=pk, action=action)
+        for pk in product_ids
+    ], batch_size=CHANGE_BATCH_SIZE)
+
+
+def change_feed(since=0, limit=CHANGE_FEED_LIMIT, entities=None):
+    """
+    Changes with a sequence number above `since`, oldest first.
+    Returns (changes, has_more); raises CursorExpired when rows after
+    `since` were already pruned.
+    """
+    changes = CatalogChange.objects.filter(pk__gt=since)
+    if entities:
+        changes = changes.filter(entity__in=entities)
+    rows = list(
+        changes.order_by('pk')
+        .values('id', 'entity', 'object_id', 'product_id', 'action', 'created_at')[:limit + 1]
+    )
+    
+    if since and (not rows or rows[0]['id'] > since + 1):
+        oldest = CatalogChange.objects.order_by('pk').values_list('pk', flat=True).first()
+        if oldest is not None and oldest > since + 1:
+            raise CursorExpired
+    return rows[:limit], len(rows) > limit
+
+
+def prune_changes(days):
+    """
+    Delete changes older than `days`; returns the number of rows removed.
+    The newest row is always kept so expired cursors stay detectable.
+    """
+    newest = CatalogChange.objects.order_by('-pk').values_list('pk', flat=True).first()
+    deleted, _ = CatalogChange.objects.filter(
+        created_at__lt=timezone.now() - timedelta(days=days)
+    ).exclude(pk=newest).delete()
+    return deleted
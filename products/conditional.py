@@ -0,0 +1,74 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET support for read endpoints.
+
+    Validators are derived from a cheap fingerprint of the data behind the
+    response -- max(updated_at) and a row count -- rather than from the
+    rendered body, so a matching If-None-Match / If-Modified-Since is
+    answered with 304 Not Modified before anything is serialized.
+    Child rows (variants, sizes, reviews) touch their product's updated_at
+    through products.signals.products_changed, which keeps the fingerprint
+    honest for nested data.
+    """
+    conditional_timestamp_field = 'updated_at'
+
+    def get_conditional_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_conditional_fingerprint(self):
+        """Return (last_modified datetime or None, row count)"""
+        fingerprint = self.get_conditional_queryset().aggregate(
+            last_modified=Max(self.conditional_timestamp_field),
+            count=Count('pk'),
+        )
+        return fingerprint['last_modified'], fingerprint['count']
+
+    def get_conditional_validators(self, request):
+        last_modified, count = self.get_conditional_fingerprint()
+        is_admin = getattr(request.user, 'is_admin', False)
+        key = '|'.join([
+            request.get_full_path(),
+            last_modified.isoformat() if last_modified else '',
+            str(count),
+            'admin' if is_admin else 'public',
+        ])
+        etag = 'W/"%s"' % hashlib.md5(key.encode('utf-8')).hexdigest()
+        return etag, last_modified
+
+    def supports_conditional_get(self, request):
+        """Whether the fingerprint covers everything this request's response depends on"""
+        return True
+
+    def get(self, request, *args, **kwargs):
+        if not self.supports_conditional_get(request):
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = self.get_conditional_validators(request)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            patch_vary_headers(not_modified, ['Authorization'])
+            return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """ConditionalGetMixin for single-object views, fingerprinted by the object's own row"""
+
+    def get_conditional_queryset(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
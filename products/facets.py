@@ -0,0 +1,78 @@
+from decimal import Decimal, InvalidOperation
+from django.db.models import Count, Q
+from .models import Product, ProductVariant, ProductSize
+
+DEFAULT_PRICE_BOUNDS = [Decimal('0'), Decimal('25'), Decimal('50'), Decimal('100'), Decimal('200')]
+
+
+def parse_price_bounds(value):
+    """Parse ?price_buckets=0,50,100 into sorted Decimal lower bounds"""
+    if not value:
+        return DEFAULT_PRICE_BOUNDS
+    try:
+        bounds = sorted({Decimal(bound.strip()) for bound in value.split(',') if bound.strip()})
+    except InvalidOperation:
+        raise ValueError('price_buckets must be a comma-separated list of numbers')
+    if not bounds or len(bounds) > 20:
+        raise ValueError('price_buckets must contain between 1 and 20 bounds')
+    return bounds
+
+
+def product_facets(queryset, price_bounds=DEFAULT_PRICE_BOUNDS):
+    """
+    Facet counts for a filtered product queryset in four grouped queries:
+    gender and price buckets share one conditional aggregate, category,
+    color and size are one GROUP BY each. Color and size count distinct
+    products, not variants or sizes.
+    """
+    products = queryset.order_by()
+    
+    buckets = []
+    for index, lower in enumerate(price_bounds):
+        upper = price_bounds[index + 1] if index + 1 < len(price_bounds) else None
+        condition = Q(selling_price__gte=lower)
+        if upper is not None:
+            condition &= Q(selling_price__lt=upper)
+        buckets.append((lower, upper, condition))
+    
+    aggregates = {'total': Count('pk')}
+    for value in Product.Gender.values:
+        aggregates[f'gender_{value}'] = Count('pk', filter=Q(gender=value))
+    for index, (lower, upper, condition) in enumerate(buckets):
+        aggregates[f'price_{index}'] = Count('pk', filter=condition)
+    totals = products.aggregate(**aggregates)
+    
+    product_ids = products.values('pk')
+    categories = (
+        products.values('category').annotate(count=Count('pk'))
+        .order_by('-count', 'category')
+    )
+    colors = (
+        ProductVariant.objects.filter(product__in=product_ids)
+        .values('color').annotate(count=Count('product', distinct=True))
+        .order_by('-count', 'color')
+    )
+    sizes = (
+        ProductSize.objects.filter(variant__product__in=product_ids)
+        .values('size').annotate(count=Count('variant__product', distinct=True))
+        .order_by('-count', 'size')
+    )
+    
+    return {
+        'total': totals['total'],
+        'gender': [
+            {'value': value, 'count': totals[f'gender_{value}']}
+            for value in Product.Gender.values
+        ],
+        'category': [{'value': row['category'], 'count': row['count']} for row in categories],
+        'color': [{'value': row['color'], 'count': row['count']} for row in colors],
+        'size': [{'value': row['size'], 'count': row['count']} for row in sizes],
+        'price': [
+            {
+                'min': str(lower),
+                'max': str(upper) if upper is not None else None,
+                'count': totals[f'price_{index}'],
+            }
+            for index, (lower, upper, condition) in enumerate(buckets)
+        ],
+    }
@@ -0,0 +1,97 @@
+class Fieldset:
+    """
+    Sparse fieldset requested through ?fields= and ?expand=.
+
+    `fields` keeps only the listed top-level fields. Relations (variants,
+    reviews, ...) are opt-in as soon as either param is present: they are
+    serialized when named in `expand` or `fields`, and a dotted path such as
+    `variants.sizes` expands a relation of a relation. Without both params
+    responses are unchanged.
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = set(fields) if fields is not None else None
+        self.expand = set(expand or ())
+        # Naming a nested path expands every relation on the way to it
+        for path in list(self.expand) + list(self.fields or ()):
+            parts = path.split('.')
+            for depth in range(1, len(parts)):
+                self.expand.add('.'.join(parts[:depth]))
+        if self.fields is not None:
+            self.expand.update(name for name in self.fields if '.' not in name)
+
+    @classmethod
+    def from_request(cls, request, fields_param='fields', expand_param='expand'):
+        """The request's fieldset, or None when it asks for the full representation"""
+        params = request.query_params
+        if fields_param not in params and expand_param not in params:
+            return None
+        fields = _split(params[fields_param]) if fields_param in params else None
+        return cls(fields=fields, expand=_split(params.get(expand_param, '')))
+
+    def includes(self, name):
+        """Whether a top-level, non-relation field is requested"""
+        return self.fields is None or name in self.fields
+
+    def expands(self, path):
+        return path in self.expand
+
+    def apply(self, data, relations):
+        """
+        Trim an already serialized full representation (e.g. a cached one).
+        `relations` holds the relation paths (dotted for nested ones).
+        """
+        return _trim(data, self, '', relations)
+
+
+def _split(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _trim(data, fieldset, prefix, relations):
+    trimmed = {}
+    for name, value in data.items():
+        path = f'{prefix}{name}'
+        if path in relations:
+            if not fieldset.expands(path):
+                continue
+            if isinstance(value, list):
+                value = [_trim(item, fieldset, f'{path}.', relations) for item in value]
+        elif not prefix and not fieldset.includes(name):
+            continue
+        trimmed[name] = value
+    return trimmed
+
+
+class SparseFieldsetMixin:
+    """
+    View mixin for ?fields= / ?expand= on read endpoints.
+
+    `relation_prefetches` maps each relation path to the prefetch lookup it
+    needs; lookups for relations the request does not expand are skipped,
+    so lean list calls run neither the joins nor the nested serializers.
+    """
+    relation_prefetches = {}
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = Fieldset.from_request(self.request) if self.request.method == 'GET' else None
+        return self._fieldset
+
+    def get_prefetches(self):
+        fieldset = self.get_fieldset()
+        return [
+            lookup for path, lookup in self.relation_prefetches.items()
+            if fieldset is None or fieldset.expands(path)
+        ]
+
+    def prefetch_for_fieldset(self, queryset):
+        lookups = self.get_prefetches()
+        return queryset.prefetch_related(*lookups) if lookups else queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        fieldset = self.get_fieldset()
+        if fieldset is not None and getattr(serializer_class, 'supports_fieldsets', False):
+            kwargs.setdefault('fieldset', fieldset)
+        return super().get_serializer(*args, **kwargs)
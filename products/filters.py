@@ -0,0 +1,40 @@
+import django_filters
+from django.db.models import Exists, OuterRef
+from .models import Product, ProductAvailability
+
+
+class CommaSeparatedCharFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """?size=M,L matches any of the listed values"""
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Storefront product filters. The stock filters read the availability
+    index (products/availability.py) instead of joining variants and sizes:
+    `in_stock` keeps products with (true) or without (false) anything to
+    buy, `size` and `color` keep products that have one of the values in
+    stock; given together they must match the same variant.
+    """
+    in_stock = django_filters.BooleanFilter(method='filter_in_stock')
+    size = CommaSeparatedCharFilter()
+    color = CommaSeparatedCharFilter()
+    
+    class Meta:
+        model = Product
+        fields = ['category', 'gender', 'is_active']
+    
+    def filter_in_stock(self, queryset, name, value):
+        stocked = Exists(ProductAvailability.objects.filter(product=OuterRef('pk')))
+        return queryset.filter(stocked if value else ~stocked)
+    
+    def filter_queryset(self, queryset):
+        # size and color have to hit the same availability row, so they are
+        # applied together rather than by the per-field loop
+        lookups = {
+            f'{name}__in': self.form.cleaned_data.pop(name)
+            for name in ('size', 'color') if self.form.cleaned_data.get(name)
+        }
+        queryset = super().filter_queryset(queryset)
+        if lookups:
+            queryset = queryset.filter(pk__in=ProductAvailability.objects.filter(**lookups).values('product'))
+        return queryset
@@ -0,0 +1,53 @@
+import hashlib
+from rest_framework.renderers import JSONRenderer
+from banners.models import Banner
+from banners.serializers import BannerSerializer
+from .cache import get_cached_homepage, invalidate_homepage, set_cached_homepage
+from .models import Product, ProductCard
+
+
+def build_homepage_snapshot():
+    """
+    Render the homepage payload: active banners plus the cards of active
+    products marked show_on_homepage. The body is stored pre-encoded and
+    `version` hashes it, so it doubles as the response ETag.
+    """
+    banners = Banner.objects.filter(is_active=True).order_by('-created_at')
+    cards = list(
+        ProductCard.objects.filter(product__show_on_homepage=True)
+        .order_by('-created_at', '-pk').values_list('pk', 'data')
+    )
+    
+    banners_json = JSONRenderer().render(BannerSerializer(banners, many=True).data)
+    products_json = b'[' + ','.join(data for _, data in cards).encode('utf-8') + b']'
+    version = hashlib.sha1(banners_json + b'|' + products_json).hexdigest()[:20]
+    body = b''.join([
+        b'{"success":true,"message":"Homepage retrieved successfully","data":{',
+        b'"version":"', version.encode('ascii'), b'",',
+        b'"banners":', banners_json, b',',
+        b'"products":', products_json,
+        b'}}',
+    ])
+    return {'version': version, 'product_ids': [pk for pk, _ in cards], 'body': body}
+
+
+def get_homepage_snapshot():
+    snapshot = get_cached_homepage()
+    if snapshot is None:
+        snapshot = build_homepage_snapshot()
+        set_cached_homepage(snapshot)
+    return snapshot
+
+
+def featured_products_changed(product_ids):
+    """
+    Drop the homepage snapshot when any of the products is on it or now
+    qualifies for it. Writes to other products leave it alone.
+    """
+    snapshot = get_cached_homepage()
+    if snapshot is None:
+        return
+    featured = set(snapshot['product_ids'])
+    featured.update(Product.objects.filter(show_on_homepage=True, is_active=True).values_list('id', flat=True))
+    if featured.intersection(product_ids):
+        invalidate_homepage()
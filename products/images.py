@@ -0,0 +1,182 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+from .models import ProductVariant, VariantImageJob
+from .signals import products_changed
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each rendition
+RENDITION_SIZES = {
+    'thumbnail': 96,
+    'medium': 480,
+    'large': 1200,
+}
+
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+RENDITION_DIR = 'variant_renditions'
+
+MAX_JOB_ATTEMPTS = 3
+
+# A job left in processing this long belongs to a worker that died
+STALE_JOB_AFTER = timedelta(minutes=10)
+
+
+def decode_data_image(value, stem):
+    """
+    Turn a `data:image/...;base64,` payload into a ContentFile named
+    `<stem>.<ext>`, or None when the value is not a decodable data URI.
+    """
+    if not value or not value.startswith('data:image'):
+        return None
+    try:
+        header, encoded = value.split(';base64,', 1)
+        content = ContentFile(base64.b64decode(encoded))
+    except (ValueError, binascii.Error):
+        return None
+    content.name = f"{stem}.{header.split('/')[-1]}"
+    return content
+
+
+def claim_image_jobs(limit):
+    """
+    Mark up to `limit` runnable jobs as processing and return them.
+    Each claim is a conditional UPDATE, so concurrent workers never pick
+    the same job. Stale jobs that already used every attempt are failed.
+    """
+    now = timezone.now()
+    stale = Q(status=VariantImageJob.Status.PROCESSING, updated_at__lt=now - STALE_JOB_AFTER)
+    # A worker died on the job's last allowed attempt; give up on it
+    VariantImageJob.objects.filter(stale, attempts__gte=MAX_JOB_ATTEMPTS).update(
+        status=VariantImageJob.Status.FAILED, error='Worker stopped while processing', updated_at=now
+    )
+    runnable = Q(status=VariantImageJob.Status.PENDING) | (stale & Q(attempts__lt=MAX_JOB_ATTEMPTS))
+    candidates = VariantImageJob.objects.filter(runnable).values_list('id', flat=True)[:limit]
+
+    claimed = []
+    for job_id in candidates:
+        if VariantImageJob.objects.filter(runnable, pk=job_id).update(
+            status=VariantImageJob.Status.PROCESSING, attempts=F('attempts') + 1, updated_at=now
+        ):
+            claimed.append(job_id)
+    return list(VariantImageJob.objects.filter(pk__in=claimed).select_related('variant'))
+
+
+def build_renditions(image_file):
+    """Return {size: {format: bytes}} for every configured rendition of an image"""
+    with Image.open(image_file) as original:
+        original = ImageOps.exif_transpose(original)
+        has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+        base = original.convert('RGBA' if has_alpha else 'RGB')
+
+    renditions = {}
+    for size, edge in RENDITION_SIZES.items():
+        resized = base.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        renditions[size] = {}
+        for extension, (image_format, options) in RENDITION_FORMATS.items():
+            image = resized
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                # JPEG has no alpha channel; flatten onto white
+                image = Image.new('RGB', resized.size, 'white')
+                image.paste(resized, mask=resized.getchannel('A'))
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, **options)
+            renditions[size][extension] = buffer.getvalue()
+    return renditions
+
+
+def process_image_job(job):
+    """Write the renditions for one claimed job and record them on the variant"""
+    variant = job.variant
+    if getattr(variant, job.field).name != job.source:
+        # A newer upload replaced the image; its own job renders it
+        job.status = VariantImageJob.Status.DONE
+        job.error = 'Superseded by a newer upload'
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        return
+
+    with default_storage.open(job.source, 'rb') as source:
+        renditions = build_renditions(source)
+
+    digest = hashlib.sha1(job.source.encode('utf-8')).hexdigest()[:10]
+    paths = {}
+    for size, encoded in renditions.items():
+        paths[size] = {}
+        for extension, content in encoded.items():
+            name = f'{RENDITION_DIR}/{variant.pk}/{job.field}_{digest}_{size}.{extension}'
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            paths[size][extension] = default_storage.save(name, ContentFile(content))
+
+    with transaction.atomic():
+        stored = ProductVariant.objects.select_for_update().filter(pk=variant.pk).values_list('renditions', flat=True).first()
+        if stored is None:
+            return
+        previous = stored.get(job.field) or {}
+        stored[job.field] = {'source': job.source, **paths}
+        ProductVariant.objects.filter(pk=variant.pk).update(renditions=stored)
+        job.status = VariantImageJob.Status.DONE
+        job.error = ''
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        products_changed([variant.product_id])
+
+    if previous and previous['source'] != job.source:
+        for size in RENDITION_SIZES:
+            for name in previous.get(size, {}).values():
+                default_storage.delete(name)
+
+
+def process_image_jobs(limit=50):
+    """
+    Run up to `limit` queued jobs.
+    Returns (processed, failed); failed jobs are retried until they reach
+    MAX_JOB_ATTEMPTS.
+    """
+    processed = failed = 0
+    for job in claim_image_jobs(limit):
+        try:
+            process_image_job(job)
+            processed += 1
+        except (OSError, ValueError, Image.DecompressionBombError) as error:
+            logger.warning('Image job %s failed: %s', job.pk, error)
+            job.status = (
+                VariantImageJob.Status.FAILED if job.attempts >= MAX_JOB_ATTEMPTS
+                else VariantImageJob.Status.PENDING
+            )
+            job.error = str(error)
+            job.save(update_fields=['status', 'error', 'updated_at'])
+            failed += 1
+    return processed, failed
+
+
+def rendition_urls(variant, field, request=None):
+    """
+    URLs of the processed renditions of a variant image, or None while the
+    current upload is still queued.
+    """
+    renditions = (variant.renditions or {}).get(field)
+    if not renditions or renditions.get('source') != getattr(variant, field).name:
+        return None
+
+    def url(name):
+        location = default_storage.url(name)
+        return request.build_absolute_uri(location) if request is not None else location
+
+    return {
+        size: {extension: url(name) for extension, name in files.items()}
+        for size, files in renditions.items() if size != 'source'
+    }
@@ -0,0 +1,484 @@
+import codecs
+import csv
+import hashlib
+import json
+from decimal import Decimal
+from functools import partial
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from .categories import adjust_active_product_count, recount_active_products
+from .models import Category, Product, ProductVariant, ProductSize
+from .signals import PRODUCT_ID_BATCH_SIZE, products_changed
+
+IMPORT_CHUNK_SIZE = 500
+
+# Keep the report small enough to return from the admin endpoint
+MAX_REPORTED_ERRORS = 500
+
+# Largest share of the hash-managed catalog a sync may deactivate without force=True
+MAX_DEACTIVATED_SHARE = 0.5
+
+PRODUCT_FIELDS = (
+    'sku', 'name', 'description', 'gender', 'category', 'selling_price',
+    'purchasing_price', 'material_and_care', 'is_active', 'show_on_homepage',
+)
+VARIANT_FIELDS = ('name', 'color', 'stock')
+SIZE_FIELDS = ('size', 'stock')
+
+# CSV files hold one row per size; product and variant columns repeat
+CSV_VARIANT_COLUMNS = {'variant_name': 'name', 'variant_color': 'color', 'variant_stock': 'stock'}
+CSV_SIZE_COLUMNS = {'size': 'size', 'size_stock': 'stock'}
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+
+
+def is_utf8(chunks):
+    """
+    Whether an iterable of byte chunks decodes as UTF-8. Imports write chunk
+    by chunk, so uploads are checked up front rather than failing halfway.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for chunk in chunks:
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def read_jsonl_records(stream):
+    """Yield (line number, product dict) pairs from a JSON Lines stream"""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record
+
+
+def read_csv_records(stream):
+    """
+    Yield (line number, product dict) pairs from a CSV stream.
+    Consecutive rows sharing a SKU form one product; rows with the same
+    variant_name are merged into one variant with one size per row.
+    """
+    reader = csv.DictReader(stream)
+    record, first_line = None, None
+    for row in reader:
+        sku = (row.get('sku') or '').strip()
+        if record is None or sku != record['sku']:
+            if record is not None:
+                yield first_line, record
+            record = {field: row.get(field) for field in PRODUCT_FIELDS}
+            record['sku'] = sku
+            record['variants'] = []
+            first_line = reader.line_num
+
+        variant_name = (row.get('variant_name') or '').strip()
+        if not variant_name:
+            continue
+        variants = record['variants']
+        if not variants or variants[-1]['name'] != variant_name:
+            variants.append({field: row.get(column) for column, field in CSV_VARIANT_COLUMNS.items()})
+            variants[-1]['sizes'] = []
+        if (row.get('size') or '').strip():
+            variants[-1]['sizes'].append({field: row.get(column) for column, field in CSV_SIZE_COLUMNS.items()})
+
+    if record is not None:
+        yield first_line, record
+
+
+def read_catalog_records(stream, file_format):
+    if file_format == 'csv':
+        return read_csv_records(stream)
+    if file_format == 'jsonl':
+        return read_jsonl_records(stream)
+    raise ValueError(f'Unsupported catalog format: {file_format}')
+
+
+def _clean_fields(model, raw, field_names, errors, prefix=''):
+    """Run model field validation over raw values, collecting messages in errors"""
+    cleaned = {}
+    for name in field_names:
+        field = model._meta.get_field(name)
+        value = raw.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            value = field.get_default() if field.has_default() else (None if field.null else '')
+        elif field.get_internal_type() == 'BooleanField' and isinstance(value, str):
+            lowered = value.lower()
+            value = True if lowered in TRUE_VALUES else False if lowered in FALSE_VALUES else value
+        try:
+            cleaned[name] = field.clean(value, None)
+        except ValidationError as error:
+            errors[f'{prefix}{name}'] = ' '.join(error.messages)
+            continue
+        if isinstance(cleaned[name], Decimal):
+            # Same value, same hash: '25' and '25.00' are stored identically
+            cleaned[name] = cleaned[name].quantize(Decimal(1).scaleb(-field.decimal_places))
+    return cleaned
+
+
+def clean_catalog_record(raw):
+    """
+    Validate one product tree.
+    Returns (product values, [(variant values, [size values])], errors).
+    """
+    errors = {}
+    if not isinstance(raw, dict):
+        return None, [], {'record': 'Expected a JSON object'}
+
+    product = _clean_fields(Product, raw, PRODUCT_FIELDS, errors)
+    for price_field in ('selling_price', 'purchasing_price'):
+        price = product.get(price_field)
+        if price is not None and price <= 0:
+            errors[price_field] = 'Price must be greater than 0.'
+
+    variants = []
+    raw_variants = raw.get('variants') or []
+    if not isinstance(raw_variants, list):
+        errors['variants'] = 'Must be a list'
+        raw_variants = []
+    variant_names = set()
+    for index, raw_variant in enumerate(raw_variants):
+        prefix = f'variants[{index}].'
+        if not isinstance(raw_variant, dict):
+            errors[f'variants[{index}]'] = 'Expected an object'
+            continue
+        variant = _clean_fields(ProductVariant, raw_variant, VARIANT_FIELDS, errors, prefix)
+        if variant.get('name') in variant_names:
+            errors[f'{prefix}name'] = 'Duplicate variant name'
+        variant_names.add(variant.get('name'))
+
+        sizes = []
+        raw_sizes = raw_variant.get('sizes') or []
+        if isinstance(raw_sizes, str):
+            raw_sizes = [size for size in raw_sizes.split(',') if size.strip()]
+        size_names = set()
+        for size_index, raw_size in enumerate(raw_sizes):
+            if not isinstance(raw_size, dict):
+                # Bare size names share the variant stock, as in create-with-variants
+                raw_size = {'size': raw_size, 'stock': variant.get('stock')}
+            size_prefix = f'{prefix}sizes[{size_index}].'
+            size = _clean_fields(ProductSize, raw_size, SIZE_FIELDS, errors, size_prefix)
+            if size.get('size') in size_names:
+                errors[f'{size_prefix}size'] = 'Duplicate size'
+            size_names.add(size.get('size'))
+            sizes.append(size)
+        variants.append((variant, sizes))
+
+    return product, variants, errors
+
+
+def catalog_tree_hash(product, variants):
+    """SHA-256 over the canonical form of a cleaned product tree"""
+    payload = {
+        'product': {name: product[name] for name in PRODUCT_FIELDS},
+        'variants': sorted(
+            ({**variant, 'sizes': sorted(sizes, key=lambda size: size['size'])} for variant, sizes in variants),
+            key=lambda variant: variant['name']
+        ),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class CatalogImport:
+    """
+    Chunked catalog import.
+    Each chunk is validated in memory, checked against existing SKUs with a
+    single query and written with bulk_create (products, then variants,
+    then sizes) in its own transaction, so a bad chunk never leaves
+    half-created product trees behind.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.seen_skus = set()
+        self.categories = {Category.name_key(name): (pk, name) for pk, name in Category.objects.values_list('id', 'name')}
+        self.report = {
+            'rows_processed': 0,
+            'rows_failed': 0,
+            'products_created': 0,
+            'variants_created': 0,
+            'sizes_created': 0,
+            'errors': [],
+        }
+
+    def run(self, records):
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        self.finish()
+        return self.report
+
+    def finish(self):
+        """Hook run once every chunk has been written"""
+
+    def add_error(self, line, sku, errors):
+        self.report['rows_failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'line': line, 'sku': sku, 'errors': errors})
+
+    def clean_chunk(self, chunk):
+        """Validate a chunk, returning (line, product values, variants) for the valid rows"""
+        self.report['rows_processed'] += len(chunk)
+        trees = []
+        for line, raw in chunk:
+            product, variants, errors = clean_catalog_record(raw)
+            sku = product.get('sku') if product else None
+            if not errors and sku in self.seen_skus:
+                errors = {'sku': 'Duplicate SKU in file'}
+            if sku:
+                self.seen_skus.add(sku)
+            if errors:
+                self.add_error(line, sku, errors)
+                continue
+            category = self.categories.get(Category.name_key(product['category']))
+            if category:
+                # Stored under the canonical name, as Product.save() would
+                product['category_ref_id'], product['category'] = category
+            product['content_hash'] = catalog_tree_hash(product, variants)
+            trees.append((line, product, variants))
+        return trees
+
+    def write_chunk(self, trees, write):
+        try:
+            with transaction.atomic():
+                write(trees)
+        except DatabaseError as error:
+            for line, product, _ in trees:
+                self.add_error(line, product['sku'], {'record': f'Chunk rejected by the database: {error}'})
+
+    def import_chunk(self, chunk):
+        trees = self.clean_chunk(chunk)
+        existing = set(
+            Product.objects.filter(sku__in=[product['sku'] for _, product, _ in trees])
+            .values_list('sku', flat=True)
+        )
+        if existing:
+            for line, product, _ in trees:
+                if product['sku'] in existing:
+                    self.add_error(line, product['sku'], {'sku': 'A product with this SKU already exists.'})
+            trees = [tree for tree in trees if tree[1]['sku'] not in existing]
+
+        if trees:
+            self.write_chunk(trees, self.write_trees)
+
+    def write_trees(self, trees):
+        products = [Product(**values) for _, values, _ in trees]
+        Product.objects.bulk_create(products)
+
+        variants, variant_sizes = [], []
+        for product, (_, _, tree) in zip(products, trees):
+            for values, sizes in tree:
+                variants.append(ProductVariant(product=product, **values))
+                variant_sizes.append(sizes)
+        ProductVariant.objects.bulk_create(variants)
+
+        sizes = [
+            ProductSize(variant=variant, **values)
+            for variant, size_values in zip(variants, variant_sizes)
+            for values in size_values
+        ]
+        ProductSize.objects.bulk_create(sizes)
+
+        # bulk_create skips the signals that maintain category counts
+        active_by_category = {}
+        for product in products:
+            if product.is_active and product.category_ref_id:
+                active_by_category[product.category_ref_id] = active_by_category.get(product.category_ref_id, 0) + 1
+        for category_id, count in active_by_category.items():
+            adjust_active_product_count(category_id, count)
+        products_changed([product.pk for product in products], touch=False)
+
+        self.report['products_created'] += len(products)
+        self.report['variants_created'] += len(variants)
+        self.report['sizes_created'] += len(sizes)
+
+
+class CatalogSync(CatalogImport):
+    """
+    Delta sync against a full catalog snapshot.
+    Each product tree is hashed and compared with the content_hash stored
+    by the previous import or sync: unchanged trees cost nothing beyond the
+    per-chunk SKU lookup, changed trees are diffed row by row and written
+    with bulk_create/bulk_update, and hash-managed products missing from
+    the snapshot are deactivated. Variants and sizes dropped from a
+    snapshot are set to zero stock rather than deleted, because order
+    items cascade from them.
+
+    Deactivation only runs for a clean snapshot: any failed row (a bad
+    header fails them all) skips it, and so does a snapshot that would
+    deactivate more than MAX_DEACTIVATED_SHARE of the managed products
+    unless force=True. The report says why under `deactivation_skipped`.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE, deactivate_missing=True, force=False):
+        super().__init__(chunk_size=chunk_size)
+        self.deactivate_missing = deactivate_missing
+        self.force = force
+        self.report.update({
+            'products_updated': 0,
+            'products_unchanged': 0,
+            'products_deactivated': 0,
+            'deactivation_skipped': None,
+            'variants_updated': 0,
+            'sizes_updated': 0,
+        })
+
+    def import_chunk(self, chunk):
+        trees = self.clean_chunk(chunk)
+        existing = {
+            sku: (product_id, content_hash, category_id)
+            for sku, product_id, content_hash, category_id in Product.objects.filter(
+                sku__in=[product['sku'] for _, product, _ in trees]
+            ).values_list('sku', 'id', 'content_hash', 'category_ref_id')
+        }
+
+        new, changed = [], []
+        for tree in trees:
+            stored = existing.get(tree[1]['sku'])
+            if stored is None:
+                new.append(tree)
+            elif stored[1] != tree[1]['content_hash']:
+                changed.append(tree)
+        self.report['products_unchanged'] += len(trees) - len(new) - len(changed)
+
+        if new:
+            self.write_chunk(new, self.write_trees)
+        if changed:
+            self.write_chunk(changed, partial(self.update_trees, existing))
+
+    def update_trees(self, existing, changed):
+        now = timezone.now()
+        products = []
+        categories = set()
+        incoming = {}
+        for _, values, variants in changed:
+            product_id, _, old_category_id = existing[values['sku']]
+            product = Product(pk=product_id, **values)
+            product.updated_at = now
+            products.append(product)
+            categories.update({old_category_id, product.category_ref_id})
+            incoming[product_id] = variants
+        Product.objects.bulk_update(
+            products, [*PRODUCT_FIELDS, 'category_ref', 'content_hash', 'updated_at'], batch_size=PRODUCT_ID_BATCH_SIZE
+        )
+
+        stored_variants = {
+            (variant.product_id, variant.name): variant
+            for variant in ProductVariant.objects.filter(product_id__in=incoming).only('id', 'product_id', 'name', 'color', 'stock')
+        }
+        new_variants, changed_variants, variant_sizes = [], {}, []
+        for product_id, variants in incoming.items():
+            for values, sizes in variants:
+                variant = stored_variants.pop((product_id, values['name']), None)
+                if variant is None:
+                    variant = ProductVariant(product_id=product_id, **values)
+                    new_variants.append(variant)
+                elif (variant.color, variant.stock) != (values['color'], values['stock']):
+                    variant.color, variant.stock = values['color'], values['stock']
+                    changed_variants[variant.pk] = variant
+                variant_sizes.append((variant, sizes))
+        for variant in stored_variants.values():
+            if variant.stock:
+                variant.stock = 0
+                changed_variants[variant.pk] = variant
+        ProductVariant.objects.bulk_create(new_variants)
+        for variant in changed_variants.values():
+            variant.updated_at = now
+        ProductVariant.objects.bulk_update(
+            changed_variants.values(), ['color', 'stock', 'updated_at'], batch_size=PRODUCT_ID_BATCH_SIZE
+        )
+
+        stored_sizes = {
+            (size.variant_id, size.size): size
+            for size in ProductSize.objects.filter(variant__product_id__in=incoming).only('id', 'variant_id', 'size', 'stock')
+        }
+        new_sizes, changed_sizes = [], []
+        for variant, sizes in variant_sizes:
+            for values in sizes:
+                size = stored_sizes.pop((variant.pk, values['size']), None)
+                if size is None:
+                    new_sizes.append(ProductSize(variant=variant, **values))
+                elif size.stock != values['stock']:
+                    size.stock = values['stock']
+                    changed_sizes.append(size)
+        changed_sizes.extend(size for size in stored_sizes.values() if size.stock)
+        for size in stored_sizes.values():
+            size.stock = 0
+        ProductSize.objects.bulk_create(new_sizes)
+        ProductSize.objects.bulk_update(changed_sizes, ['stock'], batch_size=PRODUCT_ID_BATCH_SIZE)
+
+        categories.discard(None)
+        recount_active_products(Category.objects.filter(pk__in=categories))
+        products_changed(incoming, touch=False)
+
+        self.report['products_updated'] += len(products)
+        self.report['variants_created'] += len(new_variants)
+        self.report['variants_updated'] += len(changed_variants)
+        self.report['sizes_created'] += len(new_sizes)
+        self.report['sizes_updated'] += len(changed_sizes)
+
+    def finish(self):
+        """Deactivate active hash-managed products the snapshot no longer lists"""
+        if not self.deactivate_missing:
+            return
+        if self.report['rows_failed']:
+            self.report['deactivation_skipped'] = 'The snapshot has failed rows'
+            return
+        if not self.report['rows_processed']:
+            self.report['deactivation_skipped'] = 'The snapshot has no valid rows'
+            return
+
+        managed = list(
+            Product.objects.filter(is_active=True).exclude(content_hash='').values_list('id', 'sku', 'category_ref_id')
+        )
+        missing = [(product_id, category_id) for product_id, sku, category_id in managed if sku not in self.seen_skus]
+        if not missing:
+            return
+        if not self.force and len(missing) > len(managed) * MAX_DEACTIVATED_SHARE:
+            self.report['deactivation_skipped'] = (
+                f'The snapshot would deactivate {len(missing)} of {len(managed)} products; '
+                'pass force to apply it'
+            )
+            return
+
+        product_ids = [product_id for product_id, _ in missing]
+        now = timezone.now()
+        with transaction.atomic():
+            for start in range(0, len(product_ids), PRODUCT_ID_BATCH_SIZE):
+                # Clearing the hash lets a later snapshot that lists the SKU again reactivate it
+                Product.objects.filter(pk__in=product_ids[start:start + PRODUCT_ID_BATCH_SIZE]).update(
+                    is_active=False, content_hash='', updated_at=now
+                )
+            categories = {category_id for _, category_id in missing if category_id}
+            recount_active_products(Category.objects.filter(pk__in=categories))
+            products_changed(product_ids, touch=False)
+        self.report['products_deactivated'] = len(product_ids)
+
+
+def import_catalog(stream, file_format, chunk_size=IMPORT_CHUNK_SIZE, sync=False, deactivate_missing=True,
+                   force=False):
+    """
+    Import a CSV or JSONL catalog stream and return the import report.
+    With sync=True the stream is treated as a full snapshot and applied as
+    a delta against the stored catalog; force=True lifts the cap on how
+    much of the catalog it may deactivate.
+    """
+    if sync:
+        importer = CatalogSync(chunk_size=chunk_size, deactivate_missing=deactivate_missing, force=force)
+    else:
+        importer = CatalogImport(chunk_size=chunk_size)
+    return importer.run(read_catalog_records(stream, file_format))
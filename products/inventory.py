@@ -0,0 +1,170 @@
+from decimal import Decimal
+from django.db import connections, router, transaction
+from django.db.models import Count, DecimalField, Exists, ExpressionWrapper, F, OuterRef, Q, Sum
+from django.utils import timezone
+from .cache import get_cached_inventory_stats, set_cached_inventory_stats
+from .models import Product, ProductVariant, ProductSize
+from .signals import products_changed
+
+
+def parse_stock_entries(entries, label):
+    """
+    Validate a list of {"id": ..., "stock": ...} payload entries.
+    Returns ({id: stock}, errors); later duplicates win.
+    """
+    stock_by_id = {}
+    errors = {}
+    if not isinstance(entries, list):
+        return stock_by_id, {label: 'Must be a list'}
+    
+    for index, entry in enumerate(entries):
+        try:
+            object_id = int(entry['id'])
+            stock = int(entry['stock'])
+            if stock < 0:
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            errors[f'{label}[{index}]'] = 'Expected an integer id and a non-negative integer stock'
+            continue
+        stock_by_id[object_id] = stock
+    return stock_by_id, errors
+
+
+def _write_stock(model, rows, timestamp=None):
+    """
+    Write (stock, id) rows with one parametrized UPDATE run through
+    executemany(). Django's bulk_update() builds a CASE WHEN expression per
+    row, which costs far more Python time than the database write itself
+    for warehouse-sized payloads.
+    """
+    if not rows:
+        return
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    if timestamp is not None:
+        timestamp = connection.ops.adapt_datetimefield_value(timestamp)
+        sql = f'UPDATE {table} SET {quote("stock")} = %s, {quote("updated_at")} = %s WHERE {quote("id")} = %s'
+        params = [(stock, timestamp, object_id) for stock, object_id in rows]
+    else:
+        sql = f'UPDATE {table} SET {quote("stock")} = %s WHERE {quote("id")} = %s'
+        params = rows
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def apply_stock_updates(variant_stock, size_stock):
+    """
+    Set variant and size stock levels in one transaction.
+    Each table is read once with in_bulk() and written with a single
+    executemany() UPDATE, skipping rows whose stock is already at the
+    requested level. Returns a summary with the updated counts and the
+    ids that do not exist.
+    """
+    with transaction.atomic():
+        variants = ProductVariant.objects.only('id', 'stock', 'product_id').in_bulk(list(variant_stock))
+        changed_variants = [
+            variant for variant_id, variant in variants.items()
+            if variant.stock != variant_stock[variant_id]
+        ]
+        _write_stock(
+            ProductVariant,
+            [(variant_stock[variant.id], variant.id) for variant in changed_variants],
+            timestamp=timezone.now()
+        )
+        
+        sizes = (
+            ProductSize.objects.annotate(product_id=F('variant__product_id'))
+            .only('id', 'stock', 'variant_id').in_bulk(list(size_stock))
+        )
+        changed_sizes = [
+            size for size_id, size in sizes.items()
+            if size.stock != size_stock[size_id]
+        ]
+        _write_stock(ProductSize, [(size_stock[size.id], size.id) for size in changed_sizes])
+        
+        product_ids = {variant.product_id for variant in changed_variants}
+        product_ids.update(size.product_id for size in changed_sizes)
+        products_changed(product_ids)
+    
+    return {
+        'updated_variants': len(changed_variants),
+        'updated_sizes': len(changed_sizes),
+        'missing_variant_ids': sorted(set(variant_stock) - set(variants)),
+        'missing_size_ids': sorted(set(size_stock) - set(sizes)),
+    }
+
+
+def _stock_value(purchasing_price):
+    return ExpressionWrapper(
+        F('stock') * F(purchasing_price),
+        output_field=DecimalField(max_digits=20, decimal_places=2)
+    )
+
+
+def compute_inventory_stats():
+    """
+    Aggregate inventory figures in the database.
+    Runs a fixed number of queries however many variants exist. Units are
+    counted the way the availability index counts them: size stock for
+    variants that have sizes, variant stock for those that don't.
+    Valuation uses the product purchasing price and skips products
+    without one.
+    """
+    variant_sizes = ProductSize.objects.filter(variant=OuterRef('pk'))
+    unsized = Q(has_sizes=False)
+    variants = ProductVariant.objects.alias(
+        has_sizes=Exists(variant_sizes),
+        has_sized_stock=Exists(variant_sizes.filter(stock__gt=0)),
+    )
+    variant_totals = variants.aggregate(
+        total_variants=Count('id'),
+        unsized_stock=Sum('stock', filter=unsized),
+        out_of_stock_variants=Count('id', filter=(unsized & Q(stock=0)) | Q(has_sizes=True, has_sized_stock=False)),
+        unsized_value=Sum(_stock_value('product__purchasing_price'), filter=unsized),
+    )
+    size_totals = ProductSize.objects.aggregate(
+        total_sizes=Count('id'),
+        out_of_stock_sizes=Count('id', filter=Q(stock=0)),
+        sized_stock=Sum('stock'),
+        sized_value=Sum(_stock_value('variant__product__purchasing_price')),
+    )
+    
+    by_category = {}
+    for row in (
+        variants.order_by()
+        .values(category_id=F('product__category_ref_id'), category=F('product__category_ref__name'))
+        .annotate(units=Sum('stock', filter=unsized), variants=Count('id'))
+    ):
+        by_category[row['category_id']] = {**row, 'units': row['units'] or 0}
+    for row in (
+        ProductSize.objects.order_by()
+        .values(category_id=F('variant__product__category_ref_id'))
+        .annotate(units=Sum('stock'))
+    ):
+        by_category[row['category_id']]['units'] += row['units'] or 0
+    inventory_value = (variant_totals['unsized_value'] or Decimal('0')) + (size_totals['sized_value'] or Decimal('0'))
+    
+    return {
+        'total_products': Product.objects.count(),
+        'total_variants': variant_totals['total_variants'],
+        'total_sizes': size_totals['total_sizes'],
+        'total_stock': (variant_totals['unsized_stock'] or 0) + (size_totals['sized_stock'] or 0),
+        'out_of_stock_variants': variant_totals['out_of_stock_variants'],
+        'out_of_stock_sizes': size_totals['out_of_stock_sizes'],
+        'inventory_value': str(Decimal(inventory_value).quantize(Decimal('0.01'))),
+        'stock_by_category': sorted(by_category.values(), key=lambda row: (row['category'] is not None, row['category'] or '')),
+        'generated_at': timezone.now().isoformat(),
+    }
+
+
+def get_inventory_stats():
+    """
+    Dashboard inventory snapshot, served from the cache.
+    products_changed() drops it whenever stock, prices or products change.
+    """
+    stats = get_cached_inventory_stats()
+    if stats is None:
+        stats = compute_inventory_stats()
+        set_cached_inventory_stats(stats)
+    return stats
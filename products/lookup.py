@@ -0,0 +1,16 @@
+# Upper bound on ids per kind in one batch lookup; keeps each IN (...) list in one query
+MAX_LOOKUP_IDS = 300
+
+
+def parse_ids(value, name):
+    """Parse ?<name>=1,2,3 into a de-duplicated list of ids in request order"""
+    if not value:
+        return []
+    try:
+        ids = [int(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValueError(f'{name} must be a comma-separated list of ids')
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_LOOKUP_IDS:
+        raise ValueError(f'{name} can list at most {MAX_LOOKUP_IDS} ids')
+    return ids
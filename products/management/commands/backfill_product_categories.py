@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from products.categories import link_products_to_categories
+
+
+class Command(BaseCommand):
+    help = 'Link products to Category rows using their category names and recount active products'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Create categories for names that have no matching Category row',
+        )
+
+    def handle(self, *args, **options):
+        linked, unmatched = link_products_to_categories(create_missing=options['create_missing'])
+        
+        self.stdout.write(self.style.SUCCESS(f'Linked {linked} products to their categories'))
+        for name in unmatched:
+            self.stdout.write(self.style.WARNING(f'No category found for: {name}'))
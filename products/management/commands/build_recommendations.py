@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from products.recommendations import ORDER_CHUNK_SIZE, build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Fold new orders into the co-purchase matrix and refresh related products'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild from all orders instead of only those placed since the last run',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=ORDER_CHUNK_SIZE,
+            help='Orders counted per chunk',
+        )
+
+    def handle(self, *args, **options):
+        run = build_recommendations(full=options['full'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {run.orders} orders up to #{run.last_order_id}, refreshed {run.products} products'
+        ))
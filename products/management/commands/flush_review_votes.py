@@ -0,0 +1,23 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from products.votes import flush_review_votes
+
+
+class Command(BaseCommand):
+    help = 'Fold buffered helpful votes into the review counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing every REVIEW_VOTE_FLUSH_INTERVAL seconds instead of once',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            counted = flush_review_votes()
+            self.stdout.write(self.style.SUCCESS(f'Counted {counted} buffered helpful votes'))
+            if not options['loop']:
+                break
+            time.sleep(getattr(settings, 'REVIEW_VOTE_FLUSH_INTERVAL', 5))
@@ -0,0 +1,72 @@
+import os
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from products.importer import IMPORT_CHUNK_SIZE, import_catalog, is_utf8
+
+
+class Command(BaseCommand):
+    help = 'Import products, variants and sizes from a CSV or JSON Lines catalog file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Catalog file (.csv or .jsonl)')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='File format (defaults to the file extension)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Products validated and written per transaction',
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Treat the file as a full snapshot and apply only what changed',
+        )
+        parser.add_argument(
+            '--keep-missing',
+            action='store_true',
+            help='With --sync, leave products missing from the snapshot active',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='With --sync, deactivate missing products even when they are a large share of the catalog',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise CommandError('Pass --format csv or --format jsonl for files without a known extension')
+        
+        try:
+            with open(path, 'rb') as raw:
+                if not is_utf8(File(raw).chunks()):
+                    raise CommandError(f'{path} must be UTF-8 encoded')
+            with open(path, newline='', encoding='utf-8-sig') as stream:
+                report = import_catalog(
+                    stream, file_format,
+                    chunk_size=options['chunk_size'],
+                    sync=options['sync'],
+                    deactivate_missing=not options['keep_missing'],
+                    force=options['force']
+                )
+        except OSError as error:
+            raise CommandError(f'Could not read {path}: {error}')
+        
+        for error in report['errors']:
+            self.stdout.write(self.style.WARNING(f"Line {error['line']} ({error['sku']}): {error['errors']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['products_created']} products, {report['variants_created']} variants and "
+            f"{report['sizes_created']} sizes; {report['rows_failed']} of {report['rows_processed']} rows failed"
+        ))
+        if options['sync']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Updated {report['products_updated']} products, left {report['products_unchanged']} unchanged "
+                f"and deactivated {report['products_deactivated']}"
+            ))
+            if report['deactivation_skipped']:
+                self.stdout.write(self.style.WARNING(f"Skipped deactivation: {report['deactivation_skipped']}"))
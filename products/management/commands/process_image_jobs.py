@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from products.images import process_image_jobs
+
+
+class Command(BaseCommand):
+    help = 'Build resized renditions for queued variant image uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit instead of polling',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Jobs claimed per batch',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed, failed = process_image_jobs(limit=options['batch_size'])
+            if processed or failed:
+                self.stdout.write(f'Processed {processed} image jobs, {failed} failed')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from products.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Delete catalog change feed rows older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Keep changes from the last N days (default 30)',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} catalog changes'))
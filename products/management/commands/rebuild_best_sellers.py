@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from products.bestsellers import rebuild_daily_sales, roll_best_sellers
+
+
+class Command(BaseCommand):
+    help = 'Roll the best-seller windows forward from the daily sales buckets (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-orders',
+            action='store_true',
+            help='Recount the daily sales buckets from the order items first',
+        )
+
+    def handle(self, *args, **options):
+        if options['from_orders']:
+            buckets = rebuild_daily_sales()
+            self.stdout.write(f'Recounted {buckets} daily sales buckets')
+        rows = roll_best_sellers()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} best-seller rows'))
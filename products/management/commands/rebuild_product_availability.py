@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from products.availability import rebuild_product_availability
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the in-stock availability index from variant and size stock'
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild_product_availability()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {rows} in-stock color/size combinations'))
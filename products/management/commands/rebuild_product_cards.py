@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from products.cards import rebuild_product_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed storefront cards of all products'
+
+    def handle(self, *args, **kwargs):
+        rebuilt = rebuild_product_cards()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt cards for {rebuilt} products'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from products.ratings import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the stored rating aggregates of all products from their reviews'
+
+    def handle(self, *args, **kwargs):
+        updated = rebuild_rating_aggregates()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {updated} products'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.search import fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index from the products table'
+
+    def handle(self, *args, **kwargs):
+        if not fts_available():
+            raise CommandError('The product search index is only available on SQLite with FTS5')
+        
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Product search index rebuilt'))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:09
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('products', 'Review')
+    
+    totals = Review.objects.order_by().values('product').annotate(total=Sum('rating'), count=Count('id'))
+    for row in totals:
+        Product.objects.filter(pk=row['product']).update(
+            rating_sum=row['total'],
+            review_count=row['count'],
+            average_rating=row['total'] / row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_add_category_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='average_rating',
+            field=models.FloatField(default=0, help_text='Average review rating'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, help_text='Sum of all review ratings'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of reviews'),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
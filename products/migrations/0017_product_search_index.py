@@ -0,0 +1,83 @@
+# Full-text search index for products (SQLite FTS5), kept in sync by triggers
+
+import products.models
+from django.db import migrations, models
+
+
+FTS_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_product_fts USING fts5(
+        name, sku, description,
+        content='products_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_fts_ai AFTER INSERT ON products_product BEGIN
+        INSERT INTO products_product_fts(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_fts_ad AFTER DELETE ON products_product BEGIN
+        INSERT INTO products_product_fts(products_product_fts, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_fts_au AFTER UPDATE OF name, sku, description ON products_product BEGIN
+        INSERT INTO products_product_fts(products_product_fts, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+        INSERT INTO products_product_fts(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+    "INSERT INTO products_product_fts(products_product_fts) VALUES('rebuild')",
+]
+
+FTS_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS products_product_fts_ai",
+    "DROP TRIGGER IF EXISTS products_product_fts_ad",
+    "DROP TRIGGER IF EXISTS products_product_fts_au",
+    "DROP TABLE IF EXISTS products_product_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases keep using the LIKE based SearchFilter
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FTS_SETUP:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FTS_TEARDOWN:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.CreateModel(
+            name='ProductSearchIndex',
+            fields=[
+                ('rowid', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('document', products.models.SearchDocumentField(db_column='products_product_fts')),
+                ('name', models.TextField()),
+                ('sku', models.TextField()),
+                ('description', models.TextField()),
+            ],
+            options={
+                'db_table': 'products_product_fts',
+                'managed': False,
+            },
+        ),
+    ]
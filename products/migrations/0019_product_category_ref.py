@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def link_categories(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    Product = apps.get_model('products', 'Product')
+    
+    # Exact name matches only; backfill_product_categories handles the rest
+    for category in Category.objects.all():
+        Product.objects.filter(category=category.name).update(category_ref=category)
+    
+    active_counts = (
+        Product.objects.filter(is_active=True, category_ref__isnull=False)
+        .order_by().values('category_ref').annotate(total=Count('id'))
+    )
+    for row in active_counts:
+        Category.objects.filter(pk=row['category_ref']).update(active_product_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_product_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of active products in this category'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='category_ref',
+            field=models.ForeignKey(blank=True, help_text='Category row matching the category name (filled on save or by backfill_product_categories)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='products', to='products.category'),
+        ),
+        migrations.RunPython(link_categories, migrations.RunPython.noop),
+    ]
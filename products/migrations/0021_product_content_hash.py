@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:31
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# Adding a NOT NULL column makes SQLite rebuild products_product, which drops
+# the FTS triggers created in 0017; recreate them and resync the index
+search_index = import_module('products.migrations.0017_product_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_product_category_ref'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, search_index.create_search_index),
+        migrations.AddField(
+            model_name='product',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(search_index.create_search_index, migrations.RunPython.noop),
+    ]
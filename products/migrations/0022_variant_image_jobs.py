@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_product_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productvariant',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of the variant images, written by process_image_jobs'),
+        ),
+        migrations.CreateModel(
+            name='VariantImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(help_text='Image field on the variant', max_length=30)),
+                ('source', models.CharField(help_text='Stored file name the job was queued for', max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_jobs', to='products.productvariant')),
+            ],
+            options={
+                'verbose_name': 'Variant Image Job',
+                'verbose_name_plural': 'Variant Image Jobs',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='image_job_status_idx')],
+            },
+        ),
+    ]
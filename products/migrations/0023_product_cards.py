@@ -0,0 +1,96 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:43
+
+import django.db.models.deletion
+import json
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.db.models import Prefetch
+
+# Frozen copy of products.cards as of this migration, so later changes to
+# the live card builder do not change what this backfill does
+CARD_BATCH_SIZE = 500
+CARD_FIELDS = ('name', 'category', 'gender', 'selling_price', 'created_at')
+
+
+def primary_image(variants):
+    for field in ('variant_picture', 'variant_icon'):
+        for variant in variants:
+            image = getattr(variant, field)
+            if not image.name:
+                continue
+            rendition = (variant.renditions or {}).get(field) or {}
+            if rendition.get('source') == image.name and 'medium' in rendition:
+                return default_storage.url(rendition['medium'].get('webp') or rendition['medium']['jpeg'])
+            return default_storage.url(image.name)
+    return None
+
+
+def build_card(product):
+    variants = list(product.variants.all())
+    colors = list(dict.fromkeys(variant.color for variant in variants if variant.color))
+    in_stock = any(
+        any(size.stock > 0 for size in sizes) if sizes else variant.stock > 0
+        for variant, sizes in ((variant, list(variant.sizes.all())) for variant in variants)
+    )
+    return {
+        'id': product.pk,
+        'name': product.name,
+        'sku': product.sku,
+        'category': product.category,
+        'gender': product.gender,
+        'selling_price': f'{product.selling_price:.2f}',
+        'image': primary_image(variants),
+        'average_rating': round(product.average_rating, 2),
+        'review_count': product.review_count,
+        'colors': colors,
+        'in_stock': in_stock,
+    }
+
+
+def populate_product_cards(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    ProductCard = apps.get_model('products', 'ProductCard')
+    
+    variants = ProductVariant.objects.order_by('id').prefetch_related('sizes')
+    products = Product.objects.filter(is_active=True).order_by('id').prefetch_related(Prefetch('variants', queryset=variants))
+    cards = []
+    for product in products.iterator(chunk_size=CARD_BATCH_SIZE):
+        cards.append(ProductCard(
+            product=product,
+            data=json.dumps(build_card(product), separators=(',', ':')),
+            **{field: getattr(product, field) for field in CARD_FIELDS}
+        ))
+        if len(cards) == CARD_BATCH_SIZE:
+            ProductCard.objects.bulk_create(cards)
+            cards = []
+    ProductCard.objects.bulk_create(cards)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0022_variant_image_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='products.product')),
+                ('data', models.TextField(help_text='Card document, stored as encoded JSON')),
+                ('name', models.CharField(max_length=255)),
+                ('category', models.CharField(max_length=100)),
+                ('gender', models.CharField(choices=[('men', 'Men'), ('women', 'Women'), ('unisex', 'Unisex'), ('kids', 'Kids')], max_length=10)),
+                ('selling_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Product Card',
+                'verbose_name_plural': 'Product Cards',
+                'indexes': [models.Index(fields=['created_at', 'product'], name='card_created_idx'), models.Index(fields=['selling_price', 'product'], name='card_price_idx'), models.Index(fields=['name', 'product'], name='card_name_idx'), models.Index(fields=['category', 'created_at', 'product'], name='card_cat_created_idx'), models.Index(fields=['gender', 'created_at', 'product'], name='card_gender_created_idx')],
+            },
+        ),
+        migrations.RunPython(populate_product_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_availability(apps, schema_editor):
+    ProductAvailability = apps.get_model('products', 'ProductAvailability')
+    ProductSize = apps.get_model('products', 'ProductSize')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    
+    sized = ProductSize.objects.filter(stock__gt=0).values_list('variant__product_id', 'variant__color', 'size')
+    unsized = ProductVariant.objects.filter(stock__gt=0, sizes__isnull=True).values_list('product_id', 'color')
+    combinations = set(sized) | {(product_id, color, '') for product_id, color in unsized}
+    ProductAvailability.objects.bulk_create([
+        ProductAvailability(product_id=product_id, color=color, size=size)
+        for product_id, color, size in combinations
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0023_product_cards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('color', models.CharField(max_length=50)),
+                ('size', models.CharField(blank=True, help_text='Empty for variants stocked without sizes', max_length=20)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Product Availability',
+                'verbose_name_plural': 'Product Availability',
+                'indexes': [models.Index(fields=['size', 'color', 'product'], name='availability_size_idx'), models.Index(fields=['color', 'product'], name='availability_color_idx')],
+                'unique_together': {('product', 'color', 'size')},
+            },
+        ),
+        migrations.RunPython(populate_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:50
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+# The new NOT NULL columns make SQLite rebuild products_product, which drops
+# the FTS triggers created in 0017; recreate them and resync the index
+search_index = import_module('products.migrations.0017_product_search_index')
+
+
+def populate_rating_histogram(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('products', 'Review')
+    
+    counts = {}
+    for row in Review.objects.order_by().values('product', 'rating').annotate(count=Count('id')):
+        counts.setdefault(row['product'], {})[f"rating_{row['rating']}_count"] = row['count']
+    for product_id, histogram in counts.items():
+        Product.objects.filter(pk=product_id).update(**histogram)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0024_product_availability'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, search_index.create_search_index),
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 1 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 2 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 3 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 4 star reviews'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of 5 star reviews'),
+        ),
+        migrations.RunPython(search_index.create_search_index, migrations.RunPython.noop),
+        migrations.RunPython(populate_rating_histogram, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'created_at', 'id'], name='review_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'helpful_votes', 'id'], name='review_product_helpful_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'rating', 'id'], name='review_product_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0025_rating_histogram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counted', models.BooleanField(default=True, help_text='Whether the vote is included in helpful_votes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='products.review')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_votes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Review Vote',
+                'verbose_name_plural': 'Review Votes',
+                'indexes': [models.Index(condition=models.Q(('counted', False)), fields=['review'], name='review_vote_pending_idx')],
+                'unique_together': {('review', 'user')},
+            },
+        ),
+    ]
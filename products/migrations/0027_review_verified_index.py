@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0026_review_votes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'is_verified_purchase', 'created_at', 'id'], name='review_product_verified_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0027_review_verified_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_order_id', models.PositiveBigIntegerField(default=0, help_text='Highest order id included')),
+                ('orders', models.PositiveIntegerField(default=0, help_text='Orders read in this run')),
+                ('products', models.PositiveIntegerField(default=0, help_text='Products whose neighbors were refreshed')),
+                ('full', models.BooleanField(default=False, help_text='Whether the run rebuilt from scratch')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Recommendation Run',
+                'verbose_name_plural': 'Recommendation Runs',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CoPurchaseCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='co_purchases', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Co-purchase Count',
+                'verbose_name_plural': 'Co-purchase Counts',
+                'unique_together': {('product', 'other')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.PositiveIntegerField(help_text='Orders containing both products')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_products', to='products.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Related Product',
+                'verbose_name_plural': 'Related Products',
+                'ordering': ['product', 'rank'],
+                'unique_together': {('product', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.5 on 2026-10-17 03:01
+
+import django.db.models.deletion
+from datetime import timedelta
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+WINDOWS = (7, 30, 90)
+
+
+def populate_best_sellers(apps, schema_editor):
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    ProductDailySales = apps.get_model('products', 'ProductDailySales')
+    BestSeller = apps.get_model('products', 'BestSeller')
+    
+    today = timezone.localdate()
+    sales = list(
+        OrderItem.objects.exclude(order__status__in=['cancelled', 'refunded'])
+        .annotate(day=TruncDate('order__created_at')).filter(day__gt=today - timedelta(days=max(WINDOWS)))
+        .order_by().values_list('product_id', 'product__category', 'day').annotate(units=Sum('quantity'))
+    )
+    ProductDailySales.objects.bulk_create([
+        ProductDailySales(product_id=product_id, day=day, quantity=units)
+        for product_id, _, day, units in sales
+    ], batch_size=500)
+    
+    for days in WINDOWS:
+        totals = {}
+        for product_id, category, day, units in sales:
+            if day > today - timedelta(days=days):
+                totals[product_id, category] = totals.get((product_id, category), 0) + units
+        BestSeller.objects.bulk_create([
+            BestSeller(days=days, product_id=product_id, category=category, quantity=units)
+            for (product_id, category), units in totals.items() if units > 0
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_productpurchase'),
+        ('products', '0028_copurchase_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestSeller',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days', models.PositiveSmallIntegerField(choices=[(7, '7 days'), (30, '30 days'), (90, '90 days')])),
+                ('category', models.CharField(max_length=100)),
+                ('quantity', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_seller_windows', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Best Seller',
+                'verbose_name_plural': 'Best Sellers',
+                'indexes': [models.Index(fields=['days', '-quantity', 'product'], name='best_seller_idx'), models.Index(fields=['days', 'category', '-quantity', 'product'], name='best_seller_category_idx'), models.Index(fields=['product'], name='best_seller_product_idx')],
+                'unique_together': {('days', 'product')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Product Daily Sales',
+                'verbose_name_plural': 'Product Daily Sales',
+                'indexes': [models.Index(fields=['day'], name='daily_sales_day_idx')],
+                'unique_together': {('product', 'day')},
+            },
+        ),
+        migrations.RunPython(populate_best_sellers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-17 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0029_best_sellers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('product', 'Product'), ('variant', 'Variant'), ('size', 'Size'), ('category', 'Category')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('product_id', models.PositiveBigIntegerField(blank=True, help_text='Product the object belongs to', null=True)),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Catalog Change',
+                'verbose_name_plural': 'Catalog Changes',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['entity', 'id'], name='catalog_change_entity_idx'), models.Index(fields=['created_at'], name='catalog_change_created_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower, Trim
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
@@ -11,6 +12,7 @@ class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    active_product_count = models.PositiveIntegerField(default=0, help_text="Number of active products in this category")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -22,6 +24,25 @@ class Category(models.Model):
     
     def __str__(self):
         return self.name
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    @staticmethod
+    def name_key(name):
+        """Product category names link to the category whose name has the same key (trimmed, case-insensitive)"""
+        return (name or '').strip().lower()
+    
+    @classmethod
+    def for_name(cls, name):
+        """The category a product category name links to, or None"""
+        key = cls.name_key(name)
+        if not key:
+            return None
+        return cls.objects.annotate(name_key=Lower(Trim('name'))).filter(name_key=key).order_by('pk').first()
 
 
 class Product(models.Model):
@@ -37,12 +58,29 @@ class Product(models.Model):
     description = models.TextField(blank=True, null=True)
     gender = models.CharField(max_length=10, choices=Gender.choices, default=Gender.UNISEX)
     category = models.CharField(max_length=100)
+    category_ref = models.ForeignKey(
+        Category, on_delete=models.PROTECT, null=True, blank=True, related_name='products',
+        help_text="Category row matching the category name (filled on save or by backfill_product_categories)"
+    )
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)
     purchasing_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     material_and_care = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True, help_text="Whether the product is active and visible to customers")
     show_on_homepage = models.BooleanField(default=False, help_text="Whether to show product on homepage")
     
+    # Rating aggregates (maintained from Review writes, see products/ratings.py)
+    rating_sum = models.PositiveIntegerField(default=0, help_text="Sum of all review ratings")
+    review_count = models.PositiveIntegerField(default=0, help_text="Number of reviews")
+    average_rating = models.FloatField(default=0, help_text="Average review rating")
+    rating_1_count = models.PositiveIntegerField(default=0, help_text="Number of 1 star reviews")
+    rating_2_count = models.PositiveIntegerField(default=0, help_text="Number of 2 star reviews")
+    rating_3_count = models.PositiveIntegerField(default=0, help_text="Number of 3 star reviews")
+    rating_4_count = models.PositiveIntegerField(default=0, help_text="Number of 4 star reviews")
+    rating_5_count = models.PositiveIntegerField(default=0, help_text="Number of 5 star reviews")
+    
+    # Hash of the product tree last applied by a catalog import/sync (see products/importer.py)
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -51,36 +89,99 @@ class Product(models.Model):
         verbose_name = _('Product')
         verbose_name_plural = _('Products')
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination: (filter columns, ordering column, id tie-breaker)
+            models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['is_active', 'created_at', 'id'], name='product_active_created_idx'),
+            models.Index(fields=['is_active', 'selling_price', 'id'], name='product_active_price_idx'),
+            models.Index(fields=['is_active', 'name', 'id'], name='product_active_name_idx'),
+            models.Index(fields=['category', 'is_active', 'created_at', 'id'], name='product_cat_created_idx'),
+            models.Index(fields=['gender', 'is_active', 'created_at', 'id'], name='product_gender_created_idx'),
+        ]
     
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot of the stored row, used by signals to detect category/activation changes
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        self._sync_category_ref()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'category' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'category_ref'}
+        super().save(*args, **kwargs)
+    
+    def _sync_category_ref(self):
+        """Keep the category foreign key in line with the category name"""
+        if not self.category and self.category_ref_id:
+            self.category = self.category_ref.name
+        
+        loaded = getattr(self, '_loaded_values', {})
+        if self.category_ref_id is None or self.category != loaded.get('category'):
+            self.category_ref = Category.for_name(self.category)
+            if self.category_ref is not None:
+                self.category = self.category_ref.name
+    
+    @property
+    def rating_histogram(self):
+        """Review counts per star, {'1': ..., '5': ...}"""
+        return {str(star): getattr(self, f'rating_{star}_count') for star in range(1, 6)}
+    
     @property
     def profit_margin(self):
         if self.purchasing_price and self.purchasing_price > 0:
             return ((self.selling_price - self.purchasing_price) / self.purchasing_price) * 100
         return 0
+
+class SearchDocumentField(models.TextField):
+    """The hidden FTS5 column named after its table, usable with the `match` lookup"""
+
+
+@SearchDocumentField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
     
-    @property
-    def average_rating(self):
-        """Calculate the average rating for this product"""
-        reviews = self.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return 0
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class ProductSearchIndex(models.Model):
+    """
+    Read-only view of the products_product_fts FTS5 table (SQLite only),
+    created and kept in sync by triggers in migration 0017.
+    """
+    rowid = models.BigIntegerField(primary_key=True)
+    document = SearchDocumentField(db_column='products_product_fts')
+    name = models.TextField()
+    sku = models.TextField()
+    description = models.TextField()
     
-    @property
-    def review_count(self):
-        """Get the total number of reviews for this product"""
-        return self.reviews.count()
+    class Meta:
+        managed = False
+        db_table = 'products_product_fts'
+
 
 class ProductVariant(models.Model):
+    # Uploaded images that get resized renditions
+    IMAGE_FIELDS = ('variant_icon', 'variant_picture')
+    
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
     name = models.CharField(max_length=100)
     color = models.CharField(max_length=50)
     stock = models.PositiveIntegerField(default=0)
     variant_icon = models.ImageField(upload_to='variant_icons/', blank=True, null=True)
     variant_picture = models.ImageField(upload_to='variant_pictures/', blank=True, null=True)
+    renditions = models.JSONField(
+        default=dict, blank=True, editable=False,
+        help_text="Resized copies of the variant images, written by process_image_jobs"
+    )
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -93,6 +194,44 @@ class ProductVariant(models.Model):
     
     def __str__(self):
         return f"{self.product.name} - {self.name}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot of the stored row, used by signals to detect new image uploads
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class VariantImageJob(models.Model):
+    """Queued rendition work for an uploaded variant image (see products/images.py)"""
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        PROCESSING = 'processing', _('Processing')
+        DONE = 'done', _('Done')
+        FAILED = 'failed', _('Failed')
+    
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='image_jobs')
+    field = models.CharField(max_length=30, help_text="Image field on the variant")
+    source = models.CharField(max_length=255, help_text="Stored file name the job was queued for")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Variant Image Job')
+        verbose_name_plural = _('Variant Image Jobs')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='image_job_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.field} for variant {self.variant_id} ({self.status})"
 
 class ProductSize(models.Model):
     variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='sizes')
@@ -108,6 +247,28 @@ class ProductSize(models.Model):
         return f"{self.variant.name} - {self.size}"
 
 
+
+class ProductAvailability(models.Model):
+    """
+    In-stock (color, size) combinations of a product, maintained by
+    products/availability.py for the storefront stock filters.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='availability')
+    color = models.CharField(max_length=50)
+    size = models.CharField(max_length=20, blank=True, help_text="Empty for variants stocked without sizes")
+    
+    class Meta:
+        verbose_name = _('Product Availability')
+        verbose_name_plural = _('Product Availability')
+        unique_together = ['product', 'color', 'size']
+        indexes = [
+            models.Index(fields=['size', 'color', 'product'], name='availability_size_idx'),
+            models.Index(fields=['color', 'product'], name='availability_color_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id}: {self.color} {self.size}".strip()
+
 class Review(models.Model):
     """Product review model for customer feedback"""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -135,6 +296,216 @@ class Review(models.Model):
         verbose_name_plural = _('Product Reviews')
         ordering = ['-created_at']
         unique_together = ['product', 'user']  # One review per user per product
+        indexes = [
+            # Keyset pagination of a product's reviews
+            models.Index(fields=['product', 'created_at', 'id'], name='review_product_created_idx'),
+            models.Index(fields=['product', 'helpful_votes', 'id'], name='review_product_helpful_idx'),
+            models.Index(fields=['product', 'rating', 'id'], name='review_product_rating_idx'),
+            models.Index(fields=['product', 'is_verified_purchase', 'created_at', 'id'], name='review_product_verified_idx'),
+        ]
     
     def __str__(self):
         return f"Review by {self.user.username} for {self.product.name} - {self.rating} stars"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored rating so updates can adjust the product aggregates by delta
+        loaded = dict(zip(field_names, values))
+        if 'product_id' in loaded and 'rating' in loaded:
+            instance._loaded_rating = (loaded['product_id'], loaded['rating'])
+        return instance
+
+
+class ProductCard(models.Model):
+    """
+    Precomputed storefront card of an active product (see products/cards.py),
+    rebuilt whenever the product tree changes.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    data = models.TextField(help_text="Card document, stored as encoded JSON")
+    
+    # Copies of the product columns the cards feed filters and orders by
+    name = models.CharField(max_length=255)
+    category = models.CharField(max_length=100)
+    gender = models.CharField(max_length=10, choices=Product.Gender.choices)
+    selling_price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Product Card')
+        verbose_name_plural = _('Product Cards')
+        indexes = [
+            models.Index(fields=['created_at', 'product'], name='card_created_idx'),
+            models.Index(fields=['selling_price', 'product'], name='card_price_idx'),
+            models.Index(fields=['name', 'product'], name='card_name_idx'),
+            models.Index(fields=['category', 'created_at', 'product'], name='card_cat_created_idx'),
+            models.Index(fields=['gender', 'created_at', 'product'], name='card_gender_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Card for {self.name}"
+
+
+
+class ReviewVote(models.Model):
+    """
+    One user's "helpful" vote on a review. Review.helpful_votes is the
+    counter; votes still waiting for a buffered flush have counted=False
+    (see products/votes.py).
+    """
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='votes')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_votes')
+    counted = models.BooleanField(default=True, help_text="Whether the vote is included in helpful_votes")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Review Vote')
+        verbose_name_plural = _('Review Votes')
+        unique_together = ['review', 'user']  # One vote per user per review
+        indexes = [
+            models.Index(fields=['review'], condition=models.Q(counted=False), name='review_vote_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Vote by {self.user_id} for review {self.review_id}"
+
+
+class CoPurchaseCount(models.Model):
+    """
+    Sparse product-by-product co-occurrence matrix: how many orders contain
+    both products. Stored in both directions; built by products/recommendations.py.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='co_purchases')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = _('Co-purchase Count')
+        verbose_name_plural = _('Co-purchase Counts')
+        unique_together = ['product', 'other']
+    
+    def __str__(self):
+        return f"{self.product_id} + {self.other_id}: {self.count}"
+
+
+class RelatedProduct(models.Model):
+    """Top co-purchased products of a product ("frequently bought together"), ranked from 1"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_products')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.PositiveIntegerField(help_text="Orders containing both products")
+    
+    class Meta:
+        verbose_name = _('Related Product')
+        verbose_name_plural = _('Related Products')
+        ordering = ['product', 'rank']
+        unique_together = ['product', 'rank']
+    
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} (#{self.rank})"
+
+
+class RecommendationRun(models.Model):
+    """One build of the co-purchase recommendations; the latest marks how far orders were read"""
+    last_order_id = models.PositiveBigIntegerField(default=0, help_text="Highest order id included")
+    orders = models.PositiveIntegerField(default=0, help_text="Orders read in this run")
+    products = models.PositiveIntegerField(default=0, help_text="Products whose neighbors were refreshed")
+    full = models.BooleanField(default=False, help_text="Whether the run rebuilt from scratch")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Recommendation Run')
+        verbose_name_plural = _('Recommendation Runs')
+        ordering = ['-id']
+    
+    def __str__(self):
+        return f"Run {self.pk} up to order {self.last_order_id}"
+
+
+class ProductDailySales(models.Model):
+    """Units of a product sold on orders placed on a given day (see products/bestsellers.py)"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    quantity = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = _('Product Daily Sales')
+        verbose_name_plural = _('Product Daily Sales')
+        unique_together = ['product', 'day']
+        indexes = [
+            models.Index(fields=['day'], name='daily_sales_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.quantity}"
+
+
+class BestSeller(models.Model):
+    """
+    Units of a product sold over a rolling window of days, the materialized
+    best-seller leaderboards. `category` copies the product's category so a
+    per-category top N is a single index range scan.
+    """
+    class Window(models.IntegerChoices):
+        WEEK = 7, _('7 days')
+        MONTH = 30, _('30 days')
+        QUARTER = 90, _('90 days')
+    
+    days = models.PositiveSmallIntegerField(choices=Window.choices)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='best_seller_windows')
+    category = models.CharField(max_length=100)
+    quantity = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = _('Best Seller')
+        verbose_name_plural = _('Best Sellers')
+        unique_together = ['days', 'product']
+        indexes = [
+            models.Index(fields=['days', '-quantity', 'product'], name='best_seller_idx'),
+            models.Index(fields=['days', 'category', '-quantity', 'product'], name='best_seller_category_idx'),
+            models.Index(fields=['product'], name='best_seller_product_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} over {self.days} days: {self.quantity}"
+
+
+class CatalogChange(models.Model):
+    """
+    Append-only log of catalog writes for downstream sync (see products/changes.py).
+    The auto-increment id is the feed's sequence number. A product row
+    means anything in that product's tree changed; variant, size and
+    category rows are written when those objects are saved or deleted.
+    """
+    class Entity(models.TextChoices):
+        PRODUCT = 'product', _('Product')
+        VARIANT = 'variant', _('Variant')
+        SIZE = 'size', _('Size')
+        CATEGORY = 'category', _('Category')
+    
+    class Action(models.TextChoices):
+        CREATED = 'created', _('Created')
+        UPDATED = 'updated', _('Updated')
+        DELETED = 'deleted', _('Deleted')
+    
+    entity = models.CharField(max_length=10, choices=Entity.choices)
+    # Plain ids rather than foreign keys, so tombstones outlive the rows they describe
+    object_id = models.PositiveBigIntegerField()
+    product_id = models.PositiveBigIntegerField(null=True, blank=True, help_text="Product the object belongs to")
+    action = models.CharField(max_length=10, choices=Action.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Catalog Change')
+        verbose_name_plural = _('Catalog Changes')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['entity', 'id'], name='catalog_change_entity_idx'),
+            models.Index(fields=['created_at'], name='catalog_change_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"#{self.pk} {self.entity} {self.object_id} {self.action}"
@@ -0,0 +1,162 @@
+import base64
+import json
+from collections import OrderedDict
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Keyset (seek) pagination over one ordering field plus the primary key as
+    tie-breaker.
+
+    The cursor is an opaque base64 token holding the boundary row's ordering
+    value and id, so every page is a single indexed range scan instead of
+    COUNT(*) + OFFSET. The ordering comes from the regular ?ordering= param
+    (first term only) and must be one of `ordering_fields`; any other
+    ordering, including a search relevance ranking, is rejected with a 400
+    rather than silently replaced by the keyset order.
+    """
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_param = api_settings.ORDERING_PARAM
+    ordering_fields = ('created_at',)
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+    # Annotation ProductSearchFilter orders ranked results by
+    rank_annotation = 'search_rank'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request)
+        if self.rank_annotation in queryset.query.annotations:
+            raise ValidationError({self.ordering_param: (
+                'Cursor pagination cannot follow search ranking; pass one of: '
+                + ', '.join(self.ordering_fields)
+            )})
+        cursor = self.decode_cursor(request)
+
+        reverse = bool(cursor and cursor['r'])
+        # Walking backwards flips both the ORDER BY and the seek predicate
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}pk')
+
+        if cursor:
+            lookup = 'lt' if descending else 'gt'
+            value = self.parse_value(queryset.model, cursor['v'])
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value}) |
+                Q(**{self.field: value, f'pk__{lookup}': cursor['id']})
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request):
+        params = request.query_params.get(self.ordering_param, '')
+        ordering = params.split(',')[0].strip() or self.default_ordering
+        if ordering.lstrip('-') not in self.ordering_fields:
+            raise ValidationError({self.ordering_param: (
+                f'Cursor pagination cannot order by {ordering}; pass one of: ' + ', '.join(self.ordering_fields)
+            )})
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if cursor['f'] != self.field or not isinstance(cursor['id'], int) or not isinstance(cursor['v'], str):
+                raise ValueError
+            cursor['r'] = bool(cursor.get('r'))
+            return cursor
+        except (KeyError, TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse=False):
+        value = getattr(instance, self.field)
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        payload = {'f': self.field, 'v': value, 'id': instance.pk, 'r': int(reverse)}
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        return replace_query_param(self.base_url, self.cursor_query_param, token.decode('ascii'))
+
+    def parse_value(self, model, value):
+        try:
+            value = model._meta.get_field(self.field).to_python(value)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ProductCursorPagination(KeysetPagination):
+    """Cursor mode for the storefront product feed (?pagination=cursor) and the card feed"""
+    ordering_fields = ('created_at', 'selling_price', 'name')
+    default_ordering = '-created_at'
+
+
+class ReviewCursorPagination(KeysetPagination):
+    """Cursor pages of a product's reviews"""
+    page_size = 20
+    ordering_fields = ('created_at', 'helpful_votes', 'rating')
+    default_ordering = '-created_at'
@@ -0,0 +1,69 @@
+from django.db.models import Case, Count, F, FloatField, OuterRef, Prefetch, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from .models import Product, Review
+
+# Reviews embedded in the product detail; the rest are paged through the review list
+TOP_REVIEWS_LIMIT = 5
+
+
+def histogram_field(star):
+    return f'rating_{star}_count'
+
+
+def apply_rating_change(product_id, stars):
+    """
+    Atomically shift the stored rating aggregates of a product.
+    `stars` maps a star rating to the change in its review count, e.g.
+    {2: -1, 4: 1} for a review edited from 2 to 4 stars. All columns are
+    computed from the pre-update row in a single UPDATE, so concurrent
+    review writes never lose an increment.
+    """
+    rating_delta = sum(star * delta for star, delta in stars.items())
+    count_delta = sum(stars.values())
+    new_sum = F('rating_sum') + rating_delta
+    new_count = F('review_count') + count_delta
+    Product.objects.filter(pk=product_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        average_rating=Case(
+            When(review_count__lte=-count_delta, then=Value(0.0)),
+            default=Cast(new_sum, FloatField()) / new_count,
+            output_field=FloatField(),
+        ),
+        **{histogram_field(star): F(histogram_field(star)) + delta for star, delta in stars.items() if delta},
+    )
+
+
+def rebuild_rating_aggregates(queryset=None):
+    """
+    Recompute the rating aggregates and histograms from the review table.
+    Returns the number of products updated.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    rating_sum = Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0)
+    review_count = Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0)
+    histogram = {
+        histogram_field(star): Coalesce(
+            Subquery(reviews.annotate(total=Count('id', filter=Q(rating=star))).values('total')), 0
+        )
+        for star in range(1, 6)
+    }
+
+    updated = queryset.update(rating_sum=rating_sum, review_count=review_count, **histogram)
+    queryset.update(
+        average_rating=Case(
+            When(review_count=0, then=Value(0.0)),
+            default=Cast(F('rating_sum'), FloatField()) / F('review_count'),
+            output_field=FloatField(),
+        )
+    )
+    return updated
+
+
+def top_reviews_prefetch():
+    """Prefetch the most helpful reviews of each product into `top_reviews`"""
+    reviews = Review.objects.select_related('user').order_by('-helpful_votes', '-created_at', '-id')
+    return Prefetch('reviews', queryset=reviews[:TOP_REVIEWS_LIMIT], to_attr='top_reviews')
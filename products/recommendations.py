@@ -0,0 +1,197 @@
+"""
+"Frequently bought together" recommendations.
+
+An offline job (build_recommendations) reads orders it has not seen yet,
+counts co-occurring product pairs per basket with vectorized NumPy code,
+adds them to the sparse CoPurchaseCount matrix and re-ranks the top
+RELATED_PRODUCTS_LIMIT neighbors of every product those orders touched.
+Already counted orders that are later cancelled, refunded, reinstated or
+deleted are taken out of (or put back into) the matrix by order signals.
+Requests only read the ranked RelatedProduct rows.
+"""
+import numpy as np
+from django.db import connections, router, transaction
+from django.db.models import F
+from orders.models import Order, OrderItem
+from .models import CoPurchaseCount, RecommendationRun, RelatedProduct
+
+RELATED_PRODUCTS_LIMIT = 10
+
+ORDER_CHUNK_SIZE = 2000
+
+# Products re-ranked per query batch
+RANK_BATCH_SIZE = 500
+
+# Bigger baskets are wholesale orders; their size² pairs would only add noise
+MAX_BASKET_SIZE = 50
+
+EXCLUDED_ORDER_STATUSES = (Order.Status.CANCELLED, Order.Status.REFUNDED)
+
+
+def _ranges(starts, lengths):
+    """Concatenation of range(start, start + length) for each pair, vectorized"""
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets
+
+
+def basket_pairs(order_ids, product_ids):
+    """
+    Count the product pairs bought together.
+    Takes parallel arrays sorted by order id with each product at most
+    once per order and returns (left, right, counts) arrays holding every
+    unordered pair once, left < right.
+    """
+    order_ids = np.asarray(order_ids, dtype=np.int64)
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    empty = np.empty(0, dtype=np.int64)
+    if len(order_ids) < 2:
+        return empty, empty, empty
+    
+    starts = np.flatnonzero(np.r_[True, order_ids[1:] != order_ids[:-1]])
+    sizes = np.diff(np.r_[starts, len(order_ids)])
+    keep = (sizes > 1) & (sizes <= MAX_BASKET_SIZE)
+    starts, sizes = starts[keep], sizes[keep]
+    if not len(starts):
+        return empty, empty, empty
+    
+    # Pair every element of a basket with every element of the same basket
+    elements = _ranges(starts, sizes)
+    element_sizes = np.repeat(sizes, sizes)
+    left = product_ids[np.repeat(elements, element_sizes)]
+    right = product_ids[_ranges(np.repeat(starts, sizes), element_sizes)]
+    ordered = left < right
+    left, right = left[ordered], right[ordered]
+    
+    base = int(product_ids.max()) + 1
+    keys, counts = np.unique(left * base + right, return_counts=True)
+    return keys // base, keys % base, counts
+
+
+def _merge_pairs(chunks):
+    """Sum (left, right, counts) chunks into one set of distinct pairs"""
+    chunks = [chunk for chunk in chunks if len(chunk[0])]
+    if not chunks:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    left = np.concatenate([chunk[0] for chunk in chunks])
+    right = np.concatenate([chunk[1] for chunk in chunks])
+    counts = np.concatenate([chunk[2] for chunk in chunks])
+    base = int(max(left.max(), right.max())) + 1
+    keys, inverse = np.unique(left * base + right, return_inverse=True)
+    return keys // base, keys % base, np.bincount(inverse, weights=counts).astype(np.int64)
+
+
+def count_new_pairs(after_order_id, up_to_order_id, chunk_size=ORDER_CHUNK_SIZE):
+    """Co-purchase pair counts of the orders with after < id <= up_to, read in chunks of orders"""
+    orders = (
+        Order.objects.filter(pk__gt=after_order_id, pk__lte=up_to_order_id)
+        .exclude(status__in=EXCLUDED_ORDER_STATUSES).order_by('pk').values_list('pk', flat=True)
+    )
+    order_ids = list(orders)
+    chunks = []
+    for start in range(0, len(order_ids), chunk_size):
+        window = order_ids[start:start + chunk_size]
+        rows = np.array(list(
+            OrderItem.objects.filter(order_id__gte=window[0], order_id__lte=window[-1])
+            .exclude(order__status__in=EXCLUDED_ORDER_STATUSES)
+            .order_by('order_id', 'product_id').values_list('order_id', 'product_id').distinct()
+        ), dtype=np.int64).reshape(-1, 2)
+        chunks.append(basket_pairs(rows[:, 0], rows[:, 1]))
+    return len(order_ids), _merge_pairs(chunks)
+
+
+def _add_counts(left, right, counts):
+    """Add pair counts to the matrix in both directions with one upsert statement"""
+    if not len(left):
+        return
+    connection = connections[router.db_for_write(CoPurchaseCount)]
+    quote = connection.ops.quote_name
+    table = quote(CoPurchaseCount._meta.db_table)
+    count = quote('count')
+    sql = (
+        f'INSERT INTO {table} ({quote("product_id")}, {quote("other_id")}, {count}) VALUES (%s, %s, %s) '
+        f'ON CONFLICT ({quote("product_id")}, {quote("other_id")}) '
+        f'DO UPDATE SET {count} = {table}.{count} + excluded.{count}'
+    )
+    rows = [(int(a), int(b), int(n)) for a, b, n in zip(left, right, counts)]
+    rows += [(b, a, n) for a, b, n in rows]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def rank_related_products(product_ids, limit=RELATED_PRODUCTS_LIMIT):
+    """Replace the ranked neighbors of the given products from the co-purchase matrix"""
+    product_ids = sorted(set(product_ids))
+    for start in range(0, len(product_ids), RANK_BATCH_SIZE):
+        batch = product_ids[start:start + RANK_BATCH_SIZE]
+        rows = np.array(list(
+            CoPurchaseCount.objects.filter(product__in=batch, count__gt=0)
+            .values_list('product_id', 'other_id', 'count')
+        ), dtype=np.int64).reshape(-1, 3)
+        
+        # Per product: highest count first, lower product id breaks ties
+        rows = rows[np.lexsort((rows[:, 1], -rows[:, 2], rows[:, 0]))]
+        starts = np.flatnonzero(np.r_[True, rows[1:, 0] != rows[:-1, 0]]) if len(rows) else np.empty(0, dtype=np.int64)
+        ranks = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+        top = rows[ranks < limit]
+        
+        RelatedProduct.objects.filter(product__in=batch).delete()
+        RelatedProduct.objects.bulk_create([
+            RelatedProduct(product_id=int(product), related_id=int(other), score=int(count), rank=int(rank) + 1)
+            for (product, other, count), rank in zip(top, ranks[ranks < limit])
+        ])
+
+
+def update_order_copurchases(order, sign):
+    """
+    Add (sign=1) or remove (sign=-1) an order's pairs in the matrix and
+    re-rank its products. Orders the last build has not read yet are left
+    to the next build, which sees their current status.
+    """
+    last_order_id = RecommendationRun.objects.values_list('last_order_id', flat=True).first()
+    if last_order_id is None or order.pk > last_order_id:
+        return
+    product_ids = sorted(set(OrderItem.objects.filter(order=order).values_list('product_id', flat=True)))
+    if not 1 < len(product_ids) <= MAX_BASKET_SIZE:
+        return
+    
+    if sign > 0:
+        _add_counts(*basket_pairs([order.pk] * len(product_ids), product_ids))
+    else:
+        # The order counted once towards every pair of its products
+        CoPurchaseCount.objects.filter(
+            product__in=product_ids, other__in=product_ids, count__gt=0
+        ).update(count=F('count') - 1)
+    rank_related_products(product_ids)
+
+
+def copurchase_status_changed(order, previous_status):
+    """Take cancelled and refunded orders out of the matrix and reinstated ones back in"""
+    was_counted = previous_status not in EXCLUDED_ORDER_STATUSES
+    is_counted = order.status not in EXCLUDED_ORDER_STATUSES
+    if was_counted != is_counted:
+        update_order_copurchases(order, 1 if is_counted else -1)
+
+
+def build_recommendations(full=False, chunk_size=ORDER_CHUNK_SIZE):
+    """
+    Fold orders placed since the last run into the co-purchase matrix and
+    re-rank the affected products; full=True starts over from the first
+    order. Returns the RecommendationRun recorded for this build.
+    """
+    previous = None if full else RecommendationRun.objects.first()
+    after = previous.last_order_id if previous else 0
+    up_to = Order.objects.order_by('-pk').values_list('pk', flat=True).first() or after
+    
+    orders, (left, right, counts) = count_new_pairs(after, up_to, chunk_size)
+    touched = np.union1d(left, right)
+    
+    with transaction.atomic():
+        if full:
+            CoPurchaseCount.objects.all().delete()
+            RelatedProduct.objects.all().delete()
+        _add_counts(left, right, counts)
+        rank_related_products(touched.tolist())
+        return RecommendationRun.objects.create(
+            last_order_id=up_to, orders=orders, products=len(touched), full=full
+        )
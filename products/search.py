@@ -0,0 +1,74 @@
+import re
+from django.db import connections
+from django.db.models import FloatField, Func, OuterRef, Subquery, Value
+from rest_framework import filters
+from rest_framework.settings import api_settings
+from .models import ProductSearchIndex
+
+FTS_TABLE = ProductSearchIndex._meta.db_table
+
+# Column weights passed to bm25(): name, sku, description
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+_fts_tables = {}
+
+
+def fts_available(using='default'):
+    """Whether the FTS5 product index exists on the given database"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    if using not in _fts_tables:
+        with connection.cursor() as cursor:
+            _fts_tables[using] = FTS_TABLE in connection.introspection.table_names(cursor)
+    return _fts_tables[using]
+
+
+def build_match_expression(terms):
+    """
+    Turn free-text search terms into an FTS5 MATCH expression.
+    Every word becomes a quoted prefix query and all words must match.
+    """
+    words = re.findall(r'\w+', ' '.join(terms))
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def rebuild_search_index(using='default'):
+    """Repopulate the FTS5 index from the products table"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+
+
+class BM25(Func):
+    function = 'bm25'
+    output_field = FloatField()
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter backed by the SQLite FTS5 product index.
+    Results are ranked with BM25 unless the client asks for an explicit
+    ?ordering=, so it must run after OrderingFilter. Other databases fall
+    back to the LIKE based SearchFilter over the view's search_fields.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not fts_available(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        match = build_match_expression(search_terms)
+        if not match:
+            return super().filter_queryset(request, queryset, view)
+
+        matches = ProductSearchIndex.objects.using(queryset.db).filter(document__match=match)
+        queryset = queryset.filter(pk__in=matches.values('rowid'))
+
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            # bm25() seeks the match doclists by rowid, so this stays cheap per row
+            weights = [Value(weight) for weight in FTS_WEIGHTS]
+            rank = matches.filter(rowid=OuterRef('pk')).annotate(
+                rank=BM25('document', *weights)
+            ).values('rank')[:1]
+            queryset = queryset.annotate(search_rank=Subquery(rank)).order_by('search_rank', '-id')
+        return queryset
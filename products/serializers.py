@@ -1,22 +1,56 @@
 from rest_framework import serializers
 from .models import Product, ProductVariant, ProductSize, Review, Category
+from .images import decode_data_image, rendition_urls
+from .ratings import TOP_REVIEWS_LIMIT
 from django.contrib.auth import get_user_model
+from orders.models import ProductPurchase
 
 User = get_user_model()
 
 
+class SparseFieldsMixin:
+    """
+    Drops fields that a products.fieldsets.Fieldset does not request.
+    `relation_fields` name the nested serializers that are only included
+    when their path is expanded; nested serializers using this mixin are
+    trimmed with the same fieldset.
+    """
+    supports_fieldsets = True
+    relation_fields = ()
+    
+    def __init__(self, *args, fieldset=None, field_prefix='', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fieldset = fieldset
+        self.field_prefix = field_prefix
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.fieldset is None:
+            return fields
+        
+        for name in list(fields):
+            path = f'{self.field_prefix}{name}'
+            if name in self.relation_fields:
+                if not self.fieldset.expands(path):
+                    del fields[name]
+                    continue
+                nested = getattr(fields[name], 'child', fields[name])
+                if isinstance(nested, SparseFieldsMixin):
+                    nested.fieldset = self.fieldset
+                    nested.field_prefix = f'{path}.'
+            elif not self.field_prefix and not self.fieldset.includes(name):
+                del fields[name]
+        return fields
+
+
 class CategorySerializer(serializers.ModelSerializer):
     """Serializer for Category model"""
-    product_count = serializers.SerializerMethodField()
+    product_count = serializers.IntegerField(source='active_product_count', read_only=True)
     
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'is_active', 'product_count', 'created_at', 'updated_at']
         read_only_fields = ['id', 'product_count', 'created_at', 'updated_at']
-    
-    def get_product_count(self, obj):
-        """Get count of products in this category"""
-        return Product.objects.filter(category=obj.name, is_active=True).count()
 
 
 class ProductSizeSerializer(serializers.ModelSerializer):
@@ -24,22 +58,32 @@ class ProductSizeSerializer(serializers.ModelSerializer):
         model = ProductSize
         fields = ['id', 'size', 'stock']
 
-class ProductVariantSerializer(serializers.ModelSerializer):
+class ProductVariantSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     sizes = ProductSizeSerializer(many=True, read_only=True)
+    renditions = serializers.SerializerMethodField()
+    
+    relation_fields = ('sizes',)
     
     class Meta:
         model = ProductVariant
         fields = [
             'id', 'name', 'color', 'stock', 'variant_icon', 'variant_picture',
-            'sizes', 'created_at', 'updated_at'
+            'renditions', 'sizes', 'created_at', 'updated_at'
         ]
+    
+    def get_renditions(self, obj):
+        """Resized image URLs per image field; null until the upload is processed"""
+        request = self.context.get('request')
+        return {field: rendition_urls(obj, field, request) for field in ProductVariant.IMAGE_FIELDS}
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     variants = ProductVariantSerializer(many=True, read_only=True)
     profit_margin = serializers.ReadOnlyField()
     average_rating = serializers.ReadOnlyField()
     review_count = serializers.ReadOnlyField()
     
+    relation_fields = ('variants',)
+    
     class Meta:
         model = Product
         fields = [
@@ -225,47 +269,15 @@ class ProductVariantCreateSerializer(serializers.ModelSerializer):
         # Create variant without images first
         variant = super().create(validated_data)
         
-        # Handle variant_icon
-        if variant_icon_data and variant_icon_data.startswith('data:image'):
-            # Convert base64 to file and save
-            import base64
-            from django.core.files.base import ContentFile
-            
-            try:
-                # Extract the base64 data
-                format, imgstr = variant_icon_data.split(';base64,')
-                ext = format.split('/')[-1]
-                
-                # Create file name
-                filename = f"variant_icon_{variant.id}_{variant.name}.{ext}"
-                
-                # Convert to file and save
-                data = ContentFile(base64.b64decode(imgstr))
-                variant.variant_icon.save(filename, data, save=False)
-            except Exception as e:
-                # If base64 conversion fails, ignore the image
-                pass
+        # Handle variant_icon (stored as uploaded; renditions are built by process_image_jobs)
+        icon = decode_data_image(variant_icon_data, f"variant_icon_{variant.id}_{variant.name}")
+        if icon:
+            variant.variant_icon.save(icon.name, icon, save=False)
         
-        # Handle variant_picture
-        if variant_picture_data and variant_picture_data.startswith('data:image'):
-            # Convert base64 to file and save
-            import base64
-            from django.core.files.base import ContentFile
-            
-            try:
-                # Extract the base64 data
-                format, imgstr = variant_picture_data.split(';base64,')
-                ext = format.split('/')[-1]
-                
-                # Create file name
-                filename = f"variant_picture_{variant.id}_{variant.name}.{ext}"
-                
-                # Convert to file and save
-                data = ContentFile(base64.b64decode(imgstr))
-                variant.variant_picture.save(filename, data, save=False)
-            except Exception as e:
-                # If base64 conversion fails, ignore the image
-                pass
+        # Handle variant_picture (stored as uploaded; renditions are built by process_image_jobs)
+        picture = decode_data_image(variant_picture_data, f"variant_picture_{variant.id}_{variant.name}")
+        if picture:
+            variant.variant_picture.save(picture.name, picture, save=False)
         
         # Create sizes with individual stock values
         if size_stocks_data:
@@ -305,47 +317,15 @@ class ProductVariantUpdateSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
-        # Handle variant_icon
-        if variant_icon_data and variant_icon_data.startswith('data:image'):
-            # Convert base64 to file and save
-            import base64
-            from django.core.files.base import ContentFile
-            
-            try:
-                # Extract the base64 data
-                format, imgstr = variant_icon_data.split(';base64,')
-                ext = format.split('/')[-1]
-                
-                # Create file name
-                filename = f"variant_icon_{instance.id}_{instance.name}.{ext}"
-                
-                # Convert to file and save
-                data = ContentFile(base64.b64decode(imgstr))
-                instance.variant_icon.save(filename, data, save=False)
-            except Exception as e:
-                # If base64 conversion fails, ignore the image
-                pass
+        # Handle variant_icon (stored as uploaded; renditions are built by process_image_jobs)
+        icon = decode_data_image(variant_icon_data, f"variant_icon_{instance.id}_{instance.name}")
+        if icon:
+            instance.variant_icon.save(icon.name, icon, save=False)
         
-        # Handle variant_picture
-        if variant_picture_data and variant_picture_data.startswith('data:image'):
-            # Convert base64 to file and save
-            import base64
-            from django.core.files.base import ContentFile
-            
-            try:
-                # Extract the base64 data
-                format, imgstr = variant_picture_data.split(';base64,')
-                ext = format.split('/')[-1]
-                
-                # Create file name
-                filename = f"variant_picture_{instance.id}_{instance.name}.{ext}"
-                
-                # Convert to file and save
-                data = ContentFile(base64.b64decode(imgstr))
-                instance.variant_picture.save(filename, data, save=False)
-            except Exception as e:
-                # If base64 conversion fails, ignore the image
-                pass
+        # Handle variant_picture (stored as uploaded; renditions are built by process_image_jobs)
+        picture = decode_data_image(variant_picture_data, f"variant_picture_{instance.id}_{instance.name}")
+        if picture:
+            instance.variant_picture.save(picture.name, picture, save=False)
         
         instance.save()
         return instance
@@ -398,15 +378,31 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data):
-        validated_data['user'] = self.context['request'].user
-        # Check if user has purchased this product to set is_verified_purchase
-        # This logic would check the orders model
+        user = self.context['request'].user
+        validated_data['user'] = user
+        validated_data['is_verified_purchase'] = ProductPurchase.objects.filter(
+            customer=user, product=validated_data['product']
+        ).exists()
         return super().create(validated_data)
 
 
 class ProductDetailSerializer(ProductSerializer):
-    """Extended product serializer that includes reviews"""
-    reviews = ReviewSerializer(many=True, read_only=True)
+    """
+    Extended product serializer with the rating histogram and the most
+    helpful reviews; the full list is paged through the review endpoint.
+    """
+    reviews = serializers.SerializerMethodField()
+    rating_histogram = serializers.ReadOnlyField()
+    
+    relation_fields = ('variants', 'reviews')
     
     class Meta(ProductSerializer.Meta):
-        fields = ProductSerializer.Meta.fields + ['reviews']
+        fields = ProductSerializer.Meta.fields + ['rating_histogram', 'reviews']
+    
+    def get_reviews(self, obj):
+        reviews = getattr(obj, 'top_reviews', None)
+        if reviews is None:
+            reviews = obj.reviews.select_related('user').order_by(
+                '-helpful_votes', '-created_at', '-id'
+            )[:TOP_REVIEWS_LIMIT]
+        return ReviewSerializer(reviews, many=True, context=self.context).data
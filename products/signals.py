@@ -0,0 +1,289 @@
+import threading
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Lower, Trim
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from banners.models import Banner
+from orders.models import Order, ProductPurchase
+from .models import CatalogChange, Category, Product, ProductVariant, ProductSize, Review, VariantImageJob
+from .cache import invalidate_homepage, invalidate_inventory_stats, invalidate_product_details
+from .availability import refresh_product_availability
+from .bestsellers import is_counted, order_status_changed, record_order_sales, refresh_best_seller_categories
+from .cards import refresh_product_cards
+from .changes import record_change, record_product_changes
+from .homepage import featured_products_changed
+from .categories import adjust_active_product_count, recount_active_products
+from .ratings import apply_rating_change
+from .recommendations import copurchase_status_changed, update_order_copurchases
+
+# Keeps IN (...) lists below SQLite's bound parameter limit
+PRODUCT_ID_BATCH_SIZE = 900
+
+# Products whose delete is cascading in this thread (see product_pre_delete)
+_product_deletes = threading.local()
+
+
+def _deleting_product_ids():
+    if not hasattr(_product_deletes, 'ids'):
+        _product_deletes.ids = set()
+    return _product_deletes.ids
+
+
+def products_changed(product_ids, touch=True, action=CatalogChange.Action.UPDATED):
+    """
+    Single hook for anything derived from a product tree (product, variants,
+    sizes, reviews). Signals call it per instance; bulk code paths that
+    bypass signals (queryset.update, bulk_update) must call it themselves.
+    With touch=True the products' updated_at is bumped so conditional GET
+    validators notice changes to child rows. Storefront cards, the stock
+    availability index and the best-seller categories of the products are
+    rebuilt in place, the homepage snapshot is dropped if a featured
+    product is among them, and the change is appended to the catalog
+    change feed with `action`. Products that are being deleted are skipped:
+    their derived rows are removed by the cascade, and rebuilding them from
+    a child's post_delete would leave rows pointing at the deleted product.
+    """
+    product_ids = sorted(set(product_ids) - _deleting_product_ids())
+    if touch:
+        now = timezone.now()
+        for start in range(0, len(product_ids), PRODUCT_ID_BATCH_SIZE):
+            batch = product_ids[start:start + PRODUCT_ID_BATCH_SIZE]
+            Product.objects.filter(pk__in=batch).update(updated_at=now)
+    invalidate_product_details(product_ids)
+    if product_ids:
+        record_product_changes(product_ids, action)
+        refresh_product_cards(product_ids)
+        refresh_product_availability(product_ids)
+        refresh_best_seller_categories(product_ids)
+        invalidate_inventory_stats()
+        featured_products_changed(product_ids)
+
+
+def _counted_category(values):
+    """The category an active product counts towards, if any"""
+    return values.get('category_ref_id') if values.get('is_active') else None
+
+
+def _change_action(signal_kwargs):
+    """Catalog change action of a post_save / post_delete signal"""
+    if signal_kwargs['signal'] is post_delete:
+        return CatalogChange.Action.DELETED
+    return CatalogChange.Action.CREATED if signal_kwargs.get('created') else CatalogChange.Action.UPDATED
+
+
+@receiver(pre_save, sender=Product)
+def product_pre_save(sender, instance, **kwargs):
+    """Make sure updates know the previously stored category and activation state"""
+    loaded = getattr(instance, '_loaded_values', None)
+    if instance.pk and (loaded is None or 'category_ref_id' not in loaded or 'is_active' not in loaded):
+        stored = Product.objects.filter(pk=instance.pk).values('category', 'category_ref_id', 'is_active').first()
+        if stored:
+            instance._loaded_values = {**(loaded or {}), **stored}
+
+
+@receiver(post_save, sender=Product)
+def product_post_save(sender, instance, created, **kwargs):
+    """Maintain Category.active_product_count across saves and activation changes"""
+    previous = None if created else _counted_category(getattr(instance, '_loaded_values', {}))
+    current = instance.category_ref_id if instance.is_active else None
+    
+    if previous != current:
+        adjust_active_product_count(previous, -1)
+        adjust_active_product_count(current, 1)
+    
+    instance._loaded_values = {
+        **getattr(instance, '_loaded_values', {}),
+        'category': instance.category,
+        'category_ref_id': instance.category_ref_id,
+        'is_active': instance.is_active,
+    }
+
+
+@receiver(pre_delete, sender=Product)
+def product_pre_delete(sender, instance, **kwargs):
+    """Runs before the variants and sizes of the product are deleted"""
+    _deleting_product_ids().add(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def product_post_delete(sender, instance, **kwargs):
+    values = getattr(instance, '_loaded_values', None) or {
+        'category_ref_id': instance.category_ref_id,
+        'is_active': instance.is_active,
+    }
+    adjust_active_product_count(_counted_category(values), -1)
+
+
+@receiver(post_save, sender=Category)
+def category_post_save(sender, instance, created, **kwargs):
+    """
+    Link unlinked products already using a new category's name, and carry
+    category renames over to the denormalized product category name
+    """
+    previous_name = getattr(instance, '_loaded_values', {}).get('name')
+    if created:
+        products = Product.objects.annotate(category_key=Lower(Trim('category'))).filter(
+            category_ref__isnull=True, category_key=Category.name_key(instance.name)
+        )
+        product_ids = list(products.values_list('id', flat=True))
+        if product_ids:
+            now = timezone.now()
+            for start in range(0, len(product_ids), PRODUCT_ID_BATCH_SIZE):
+                Product.objects.filter(pk__in=product_ids[start:start + PRODUCT_ID_BATCH_SIZE]).update(
+                    category_ref=instance, category=instance.name, updated_at=now
+                )
+            recount_active_products(Category.objects.filter(pk=instance.pk))
+            products_changed(product_ids, touch=False)
+    elif previous_name is not None and previous_name != instance.name:
+        products = Product.objects.filter(category_ref=instance)
+        product_ids = list(products.values_list('id', flat=True))
+        products.update(category=instance.name, updated_at=timezone.now())
+        products_changed(product_ids, touch=False)
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), 'name': instance.name}
+
+
+@receiver(pre_save, sender=Review)
+def review_pre_save(sender, instance, **kwargs):
+    """Make sure updates know the previously stored rating"""
+    if instance.pk and not hasattr(instance, '_loaded_rating'):
+        stored = Review.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+        if stored:
+            instance._loaded_rating = stored
+
+
+@receiver(post_save, sender=Review)
+def review_post_save(sender, instance, created, **kwargs):
+    """Keep the product rating aggregates and histogram in sync with review writes"""
+    previous = getattr(instance, '_loaded_rating', None)
+
+    if created:
+        apply_rating_change(instance.product_id, {instance.rating: 1})
+    elif previous is None:
+        return
+    elif previous[0] != instance.product_id:
+        apply_rating_change(previous[0], {previous[1]: -1})
+        apply_rating_change(instance.product_id, {instance.rating: 1})
+    elif previous[1] != instance.rating:
+        apply_rating_change(instance.product_id, {previous[1]: -1, instance.rating: 1})
+
+    instance._loaded_rating = (instance.product_id, instance.rating)
+
+
+@receiver(post_delete, sender=Review)
+def review_post_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_rating', (instance.product_id, instance.rating))
+    apply_rating_change(previous[0], {previous[1]: -1})
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    if kwargs['signal'] is post_delete:
+        _deleting_product_ids().discard(instance.pk)
+    products_changed([instance.pk], touch=False, action=_change_action(kwargs))
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def product_child_changed(sender, instance, **kwargs):
+    products_changed([instance.product_id])
+
+
+@receiver(post_save, sender=ProductVariant)
+def variant_images_uploaded(sender, instance, **kwargs):
+    """Queue rendition jobs for newly stored variant images (processed by process_image_jobs)"""
+    loaded = getattr(instance, '_loaded_values', {})
+    uploaded = [
+        field for field in ProductVariant.IMAGE_FIELDS
+        if getattr(instance, field).name and getattr(instance, field).name != loaded.get(field)
+    ]
+    if uploaded:
+        VariantImageJob.objects.bulk_create([
+            VariantImageJob(variant=instance, field=field, source=getattr(instance, field).name)
+            for field in uploaded
+        ])
+    instance._loaded_values = {
+        **loaded,
+        **{field: getattr(instance, field).name for field in ProductVariant.IMAGE_FIELDS}
+    }
+
+
+@receiver(post_save, sender=ProductSize)
+@receiver(post_delete, sender=ProductSize)
+def product_size_changed(sender, instance, **kwargs):
+    product_id = ProductVariant.objects.filter(pk=instance.variant_id).values_list('product_id', flat=True).first()
+    record_change(CatalogChange.Entity.SIZE, instance.pk, _change_action(kwargs), product_id)
+    if product_id is not None:
+        products_changed([product_id])
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def variant_change_logged(sender, instance, **kwargs):
+    record_change(CatalogChange.Entity.VARIANT, instance.pk, _change_action(kwargs), instance.product_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_change_logged(sender, instance, **kwargs):
+    record_change(CatalogChange.Entity.CATEGORY, instance.pk, _change_action(kwargs))
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def banner_changed(sender, instance, **kwargs):
+    invalidate_homepage()
+
+
+def verified_purchases_changed(order, deleted=False):
+    """
+    Re-derive the purchase index rows an order contributes to and the
+    verified-purchase flag of the customer's reviews of those products
+    """
+    product_ids = ProductPurchase.refresh_order(order, deleted=deleted)
+    purchased = Exists(ProductPurchase.objects.filter(customer=OuterRef('user'), product=OuterRef('product')))
+    reviews = Review.objects.filter(user_id=order.customer_id, product__in=product_ids)
+    changed = []
+    for verified, stale in ((True, reviews.filter(purchased)), (False, reviews.exclude(purchased))):
+        stale = stale.exclude(is_verified_purchase=verified)
+        changed.extend(stale.values_list('product_id', flat=True))
+        stale.update(is_verified_purchase=verified)
+    if changed:
+        products_changed(changed)
+
+
+@receiver(pre_save, sender=Order)
+def order_pre_save(sender, instance, **kwargs):
+    """Make sure updates know the previously stored status"""
+    loaded = getattr(instance, '_loaded_values', None)
+    if instance.pk and (loaded is None or 'status' not in loaded):
+        stored = Order.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+        if stored:
+            instance._loaded_values = {**(loaded or {}), 'status': stored}
+
+
+@receiver(post_save, sender=Order)
+def order_post_save(sender, instance, created, **kwargs):
+    """
+    Take cancelled and refunded orders out of the best-seller leaderboards,
+    the co-purchase matrix and the purchase index (and reinstated ones back in)
+    """
+    previous = getattr(instance, '_loaded_values', {}).get('status')
+    if not created and previous is not None:
+        order_status_changed(instance, previous)
+        copurchase_status_changed(instance, previous)
+        if is_counted(previous) != is_counted(instance.status):
+            verified_purchases_changed(instance)
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), 'status': instance.status}
+
+
+@receiver(pre_delete, sender=Order)
+def order_pre_delete(sender, instance, **kwargs):
+    # Runs while the order items still exist
+    if is_counted(getattr(instance, '_loaded_values', {}).get('status', instance.status)):
+        record_order_sales(instance, -1)
+        update_order_copurchases(instance, -1)
+        verified_purchases_changed(instance, deleted=True)
@@ -1,3 +1,1422 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from banners.models import Banner
+from orders.models import Cart, CartItem, Order, OrderItem, ProductPurchase
+from .models import (
+    BestSeller, CatalogChange, Category, CoPurchaseCount, Product, ProductAvailability, ProductCard, ProductVariant, ProductSize, RelatedProduct, Review,
+    ReviewVote, VariantImageJob,
+)
+from .bestsellers import rebuild_daily_sales, record_order_sales, roll_best_sellers
+from .cache import get_cached_homepage
+from .changes import prune_changes
+from .categories import link_products_to_categories
+from .images import MAX_JOB_ATTEMPTS, STALE_JOB_AFTER, process_image_jobs
+from .importer import import_catalog
+from .ratings import rebuild_rating_aggregates
+from .recommendations import basket_pairs, build_recommendations
+from .serializers import ProductVariantSerializer
+from .signals import products_changed
+from .variant_parser import ParsedVariant, parse_variants
+from .votes import flush_review_votes
+from .views import AdminProductListView
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ProductTestMixin:
+    def create_user(self, username='customer', **kwargs):
+        return User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='testpass123',
+            **kwargs
+        )
+    
+    def create_product(self, sku='SKU-1', **kwargs):
+        defaults = {
+            'name': 'Classic Tee',
+            'category': 'T-Shirts',
+            'selling_price': Decimal('25.00'),
+            'purchasing_price': Decimal('10.00'),
+        }
+        defaults.update(kwargs)
+        return Product.objects.create(sku=sku, **defaults)
+
+
+class ProductRatingAggregateTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.product = self.create_product()
+        self.alice = self.create_user('alice')
+        self.bob = self.create_user('bob')
+    
+    def test_review_create_updates_aggregates(self):
+        Review.objects.create(product=self.product, user=self.alice, rating=5, comment='Great')
+        Review.objects.create(product=self.product, user=self.bob, rating=2, comment='Meh')
+        
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_sum, 7)
+        self.assertEqual(self.product.review_count, 2)
+        self.assertAlmostEqual(self.product.average_rating, 3.5)
+    
+    def test_review_update_and_delete_adjust_aggregates(self):
+        Review.objects.create(product=self.product, user=self.alice, rating=5, comment='Great')
+        review = Review.objects.create(product=self.product, user=self.bob, rating=2, comment='Meh')
+        
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 4
+        review.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_sum, 9)
+        self.assertAlmostEqual(self.product.average_rating, 4.5)
+        
+        Review.objects.filter(user=self.alice).delete()
+        review.delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_sum, 0)
+        self.assertEqual(self.product.review_count, 0)
+        self.assertEqual(self.product.average_rating, 0)
+    
+    def test_rebuild_rating_aggregates(self):
+        Review.objects.create(product=self.product, user=self.alice, rating=3, comment='Ok')
+        Product.objects.filter(pk=self.product.pk).update(rating_sum=0, review_count=0, average_rating=0)
+        
+        rebuild_rating_aggregates()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_sum, 3)
+        self.assertEqual(self.product.review_count, 1)
+        self.assertAlmostEqual(self.product.average_rating, 3.0)
+
+
+class ReviewListingTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        self.product = self.create_product()
+        self.reviews = [
+            Review.objects.create(
+                product=self.product, user=self.create_user(f'reviewer{i}'),
+                rating=rating, comment='Review', helpful_votes=votes
+            )
+            for i, (rating, votes) in enumerate([(5, 0), (4, 9), (5, 3), (1, 7), (3, 1), (5, 2), (2, 0)])
+        ]
+    
+    def test_histogram_follows_review_writes(self):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_histogram, {'1': 1, '2': 1, '3': 1, '4': 1, '5': 3})
+        
+        review = Review.objects.get(pk=self.reviews[0].pk)
+        review.rating = 1
+        review.save()
+        self.reviews[1].delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_histogram, {'1': 2, '2': 1, '3': 1, '4': 0, '5': 2})
+        
+        Product.objects.filter(pk=self.product.pk).update(rating_1_count=0, rating_5_count=0)
+        rebuild_rating_aggregates()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_histogram, {'1': 2, '2': 1, '3': 1, '4': 0, '5': 2})
+    
+    def test_reviews_are_cursor_paginated(self):
+        url = f'/api/products/products/{self.product.pk}/reviews/'
+        params = {'ordering': '-helpful_votes', 'page_size': 3}
+        seen = []
+        while url:
+            data = self.client.get(url, params).data['data']
+            seen.extend(review['helpful_votes'] for review in data['results'])
+            url, params = data['next'], None
+        self.assertEqual(seen, [9, 7, 3, 2, 1, 0, 0])
+    
+    def test_detail_embeds_histogram_and_top_reviews(self):
+        data = self.client.get(f'/api/products/products/{self.product.pk}/').data['data']
+        self.assertEqual(data['rating_histogram']['5'], 3)
+        # Top TOP_REVIEWS_LIMIT (5) by helpful votes
+        self.assertEqual([review['helpful_votes'] for review in data['reviews']], [9, 7, 3, 2, 1])
+
+
+class HelpfulVoteTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        product = self.create_product()
+        self.review = Review.objects.create(product=product, user=self.create_user('author'), rating=5, comment='Great')
+        self.url = f'/api/products/reviews/{self.review.pk}/helpful/'
+    
+    def vote(self, username):
+        client = APIClient()
+        client.force_authenticate(User.objects.get_or_create(username=username, email=f'{username}@example.com')[0])
+        return client.post(self.url).data
+    
+    def test_one_vote_per_user(self):
+        self.assertEqual(self.vote('alice')['data']['helpful_votes'], 1)
+        self.assertEqual(self.vote('bob')['data']['helpful_votes'], 2)
+        repeat = self.vote('alice')
+        self.assertEqual(repeat['message'], 'You already marked this review as helpful')
+        self.assertEqual(repeat['data']['helpful_votes'], 2)
+        self.assertEqual(ReviewVote.objects.count(), 2)
+    
+    def test_vote_changes_the_product_detail_etag(self):
+        client = APIClient()
+        client.force_authenticate(self.create_user('reader'))
+        url = f'/api/products/products/{self.review.product_id}/'
+        etag = client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vote('alice')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['reviews'][0]['helpful_votes'], 1)
+    
+    @override_settings(REVIEW_VOTE_BUFFERING=True, REVIEW_VOTE_FLUSH_INTERVAL=60)
+    def test_buffered_votes_are_flushed_in_one_increment(self):
+        # Votes wait for the flush command instead of flushing in the request
+        self.assertEqual(self.vote('alice')['data']['helpful_votes'], 0)
+        for username in ['bob', 'carol', 'dave']:
+            self.vote(username)
+        self.vote('bob')
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.helpful_votes, 0)
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(flush_review_votes(), 4)
+        increments = [q for q in queries if 'UPDATE "products_review"' in q['sql']]
+        self.assertEqual(len(increments), 1)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.helpful_votes, 4)
+        self.assertEqual(flush_review_votes(), 0)
+
+
+class VerifiedPurchaseTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.product = self.create_product()
+        self.buyer = self.create_user('buyer')
+        self.browser = self.create_user('browser')
+        self.url = f'/api/products/products/{self.product.pk}/reviews/'
+    
+    def place_order(self, customer, status=Order.Status.PENDING):
+        order = Order.objects.create(
+            order_number=f'ORD-{Order.objects.count() + 1}', customer=customer, status=status,
+            total_amount=Decimal('25.00'), email=customer.email, phone_number='555-0100'
+        )
+        OrderItem.objects.create(order=order, product=self.product, quantity=1,
+                                 unit_price=Decimal('25.00'), total_price=Decimal('25.00'))
+        return order
+    
+    def review(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(self.url, {'rating': 5, 'comment': 'Great'}, format='json').data['data']
+    
+    def test_review_flag_comes_from_purchase_index(self):
+        ProductPurchase.record_order(self.place_order(self.buyer))
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.review(self.buyer)['is_verified_purchase'])
+        self.assertEqual(sum('orders_order' in q['sql'] for q in queries), 0)
+        self.assertFalse(self.review(self.browser)['is_verified_purchase'])
+        
+        client = APIClient()
+        client.force_authenticate(self.browser)
+        results = client.get(self.url, {'verified': 'true'}).data['data']['results']
+        self.assertEqual([r['username'] for r in results], ['buyer'])
+    
+    def test_cancelled_orders_leave_the_index(self):
+        order = self.place_order(self.buyer)
+        ProductPurchase.record_order(order)
+        self.assertTrue(self.review(self.buyer)['is_verified_purchase'])
+        
+        order.status = Order.Status.CANCELLED
+        order.save()
+        self.assertFalse(ProductPurchase.objects.exists())
+        self.assertFalse(Review.objects.get(user=self.buyer).is_verified_purchase)
+        
+        order.status = Order.Status.PENDING
+        order.save()
+        self.assertEqual(ProductPurchase.objects.get().purchased_at, order.created_at)
+        self.assertTrue(Review.objects.get(user=self.buyer).is_verified_purchase)
+        
+        # Another counted order keeps the pair indexed
+        ProductPurchase.record_order(self.place_order(self.buyer))
+        order.delete()
+        self.assertTrue(ProductPurchase.objects.filter(customer=self.buyer).exists())
+    
+    def test_backfill_indexes_orders_and_flags_reviews(self):
+        self.place_order(self.buyer)
+        self.place_order(self.browser, status=Order.Status.CANCELLED)
+        Review.objects.create(product=self.product, user=self.buyer, rating=4, comment='Good')
+        
+        call_command('backfill_product_purchases', stdout=io.StringIO())
+        self.assertEqual(list(ProductPurchase.objects.values_list('customer__username', flat=True)), ['buyer'])
+        self.assertTrue(Review.objects.get(user=self.buyer).is_verified_purchase)
+
+
+class RelatedProductsTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.customer = self.create_user('shopper')
+        self.tee, self.jeans, self.cap, self.socks = (
+            self.create_product(sku=sku) for sku in ('TEE-1', 'JEANS-1', 'CAP-1', 'SOCKS-1')
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+    
+    def place_order(self, *products, status=Order.Status.PENDING):
+        number = (Order.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        order = Order.objects.create(
+            order_number=f'ORD-{number}', customer=self.customer, status=status,
+            total_amount=Decimal('25.00'), email=self.customer.email, phone_number='555-0100'
+        )
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1,
+                                     unit_price=Decimal('25.00'), total_price=Decimal('25.00'))
+        return order
+    
+    def related(self, product):
+        return list(RelatedProduct.objects.filter(product=product).values_list('related__sku', 'score'))
+    
+    def test_basket_pairs_counts_each_pair_once_per_order(self):
+        left, right, counts = basket_pairs([1, 1, 1, 2, 2, 3], [5, 7, 9, 7, 5, 5])
+        self.assertEqual(list(zip(left.tolist(), right.tolist(), counts.tolist())), [(5, 7, 2), (5, 9, 1), (7, 9, 1)])
+    
+    def test_incremental_build_only_reads_new_orders(self):
+        self.place_order(self.tee, self.jeans, self.cap)
+        self.place_order(self.tee, self.jeans)
+        self.place_order(self.tee, self.socks, status=Order.Status.CANCELLED)
+        build_recommendations()
+        self.assertEqual(self.related(self.tee), [('JEANS-1', 2), ('CAP-1', 1)])
+        self.assertEqual(CoPurchaseCount.objects.count(), 6)
+        
+        self.place_order(self.tee, self.cap)
+        self.place_order(self.tee, self.cap)
+        self.place_order(self.cap, self.socks)
+        run = build_recommendations()
+        self.assertEqual(run.orders, 3)
+        self.assertEqual(self.related(self.tee), [('CAP-1', 3), ('JEANS-1', 2)])
+        self.assertEqual(self.related(self.socks), [('CAP-1', 1)])
+        
+        build_recommendations(full=True)
+        self.assertEqual(self.related(self.tee), [('CAP-1', 3), ('JEANS-1', 2)])
+    
+    def test_cancelled_orders_leave_the_matrix(self):
+        order = self.place_order(self.tee, self.jeans)
+        self.place_order(self.tee, self.cap)
+        build_recommendations()
+        
+        order.status = Order.Status.CANCELLED
+        order.save()
+        self.assertEqual(self.related(self.tee), [('CAP-1', 1)])
+        order.status = Order.Status.PROCESSING
+        order.save()
+        self.assertEqual(self.related(self.tee), [('JEANS-1', 1), ('CAP-1', 1)])
+        order.delete()
+        self.assertEqual(self.related(self.jeans), [])
+        
+        # Orders the next build has yet to read are left to it
+        late = self.place_order(self.tee, self.socks)
+        late.status = Order.Status.CANCELLED
+        late.save()
+        build_recommendations()
+        self.assertEqual(self.related(self.socks), [])
+    
+    def test_endpoint_serves_cards_of_active_neighbors(self):
+        self.place_order(self.tee, self.jeans, self.cap)
+        self.place_order(self.tee, self.cap)
+        build_recommendations()
+        Product.objects.filter(pk=self.jeans.pk).update(is_active=False)
+        products_changed([self.jeans.pk])
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/products/products/{self.tee.pk}/related/')
+        self.assertEqual([card['sku'] for card in json.loads(response.content)['data']], ['CAP-1'])
+        
+        response = self.client.get('/api/products/products/999999/related/')
+        self.assertEqual(response.status_code, 404)
+        
+        # Neighbors of an inactive product are hidden from everyone but admins
+        Product.objects.filter(pk=self.cap.pk).update(is_active=False)
+        self.assertEqual(self.client.get(f'/api/products/products/{self.cap.pk}/related/').status_code, 404)
+        self.client.force_authenticate(self.create_user('admin', role='admin'))
+        response = self.client.get(f'/api/products/products/{self.cap.pk}/related/')
+        self.assertEqual([card['sku'] for card in json.loads(response.content)['data']], ['TEE-1'])
+
+
+class BestSellerTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.customer = self.create_user('shopper')
+        self.tee = self.create_product(sku='TEE-1')
+        self.polo = self.create_product(sku='POLO-1')
+        self.jeans = self.create_product(sku='JEANS-1', category='Jeans')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+    
+    def place_order(self, days_ago=0, **quantities):
+        order = Order.objects.create(
+            order_number=f'ORD-{Order.objects.count() + 1}', customer=self.customer,
+            total_amount=Decimal('25.00'), email=self.customer.email, phone_number='555-0100'
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        order.refresh_from_db()
+        for attr, quantity in quantities.items():
+            OrderItem.objects.create(order=order, product=getattr(self, attr), quantity=quantity,
+                                     unit_price=Decimal('25.00'), total_price=Decimal('25.00') * quantity)
+        record_order_sales(order)
+        return order
+    
+    def units(self, days):
+        return dict(BestSeller.objects.filter(days=days).values_list('product__sku', 'quantity'))
+    
+    def test_order_events_update_windows(self):
+        self.place_order(tee=2, jeans=1)
+        old = self.place_order(days_ago=10, polo=5)
+        self.assertEqual(self.units(7), {'TEE-1': 2, 'JEANS-1': 1})
+        self.assertEqual(self.units(30), {'TEE-1': 2, 'JEANS-1': 1, 'POLO-1': 5})
+        
+        old.status = Order.Status.CANCELLED
+        old.save()
+        self.assertEqual(self.units(30)['POLO-1'], 0)
+        reinstated = Order.objects.get(pk=old.pk)
+        reinstated.status = Order.Status.PROCESSING
+        reinstated.save()
+        self.assertEqual(self.units(90)['POLO-1'], 5)
+        
+        reinstated.delete()
+        self.assertEqual(self.units(90)['POLO-1'], 0)
+    
+    def test_rebuild_rolls_windows_forward(self):
+        self.place_order(tee=2)
+        self.place_order(days_ago=5, polo=3)
+        rebuild_daily_sales()
+        roll_best_sellers(today=timezone.localdate() + timedelta(days=3))
+        self.assertEqual(self.units(7), {'TEE-1': 2})
+        self.assertEqual(self.units(30), {'TEE-1': 2, 'POLO-1': 3})
+    
+    def test_leaderboard_and_list_ordering(self):
+        self.place_order(tee=1, polo=4, jeans=9)
+        self.place_order(days_ago=20, tee=6)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/products/best-sellers/', {'window': 7, 'category': 'T-Shirts'})
+        self.assertEqual([card['sku'] for card in json.loads(response.content)['data']], ['POLO-1', 'TEE-1'])
+        response = self.client.get('/api/products/products/best-sellers/', {'limit': 2})
+        self.assertEqual([card['sku'] for card in json.loads(response.content)['data']], ['JEANS-1', 'TEE-1'])
+        self.assertEqual(self.client.get('/api/products/products/best-sellers/', {'window': 14}).status_code, 400)
+        
+        response = self.client.get('/api/products/products/', {'ordering': '-best_selling', 'window': 7})
+        self.assertEqual([p['sku'] for p in response.data['results']], ['JEANS-1', 'POLO-1', 'TEE-1'])
+        # Rankings move without product writes, so they are never answered with 304
+        self.assertNotIn('ETag', response)
+        
+        self.tee.category = 'Tops'
+        self.tee.save()
+        self.assertEqual(set(BestSeller.objects.filter(product=self.tee).values_list('category', flat=True)), {'Tops'})
+
+
+class ProductLookupTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        self.products = [self.create_product(sku=f'SKU-{i}') for i in range(6)]
+        self.hidden = self.create_product(sku='HIDDEN', is_active=False)
+        for product in self.products + [self.hidden]:
+            variant = ProductVariant.objects.create(product=product, name='Default', color='Black', stock=3)
+            ProductSize.objects.create(variant=variant, size='M', stock=3)
+    
+    def lookup(self, **params):
+        return self.client.get('/api/products/products/lookup/', params)
+    
+    def test_queries_do_not_grow_with_ids(self):
+        variant_ids = list(ProductVariant.objects.values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as few:
+            self.lookup(ids=self.products[0].pk, variant_ids=variant_ids[0])
+        with self.assertNumQueries(len(few)):
+            response = self.lookup(
+                ids=','.join(str(p.pk) for p in self.products), variant_ids=','.join(map(str, variant_ids))
+            )
+        
+        data = response.data['data']
+        self.assertEqual(list(data['products']), [p.pk for p in self.products])
+        self.assertEqual(data['products'][self.products[0].pk]['variants'][0]['sizes'][0]['size'], 'M')
+        self.assertEqual(data['missing'], {'products': [], 'variants': [variant_ids[-1]]})
+        self.assertEqual(data['variants'][variant_ids[0]]['product_id'], self.products[0].pk)
+    
+    def test_visibility_and_validation(self):
+        data = self.lookup(ids=f'{self.hidden.pk},{self.products[0].pk},999999', fields='id,sku').data['data']
+        self.assertEqual(data['products'], {self.products[0].pk: {'id': self.products[0].pk, 'sku': 'SKU-0'}})
+        self.assertEqual(data['missing']['products'], [self.hidden.pk, 999999])
+        
+        self.client.force_authenticate(self.create_user('admin', role='admin'))
+        self.assertIn(self.hidden.pk, self.lookup(ids=self.hidden.pk).data['data']['products'])
+        
+        self.assertEqual(self.lookup().status_code, 400)
+        self.assertEqual(self.lookup(ids='1,x').status_code, 400)
+        self.assertEqual(self.lookup(ids=','.join(map(str, range(1, 400)))).status_code, 400)
+
+
+class CatalogChangeFeedTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+    
+    def feed(self, **params):
+        return self.client.get('/api/products/products/changes/', params)
+    
+    def entries(self, since=0, **params):
+        data = self.feed(since=since, **params).data['data']
+        return [(c['entity'], c['action']) for c in data['results']], data['cursor']
+    
+    def test_feed_records_writes_and_tombstones(self):
+        product = self.create_product()
+        variant = ProductVariant.objects.create(product=product, name='Default', color='Black', stock=3)
+        size = ProductSize.objects.create(variant=variant, size='M', stock=3)
+        entries, cursor = self.entries()
+        self.assertEqual(entries[0], ('product', 'created'))
+        self.assertIn(('variant', 'created'), entries)
+        self.assertIn(('size', 'created'), entries)
+        
+        # Bulk stock updates bypass signals and show up as a product change
+        ProductSize.objects.filter(pk=size.pk).update(stock=0)
+        products_changed([product.pk])
+        self.assertEqual(self.entries(cursor)[0], [('product', 'updated')])
+        variant.delete()
+        entries, cursor = self.entries(cursor, entity='variant,size')
+        self.assertEqual(entries, [('size', 'deleted'), ('variant', 'deleted')])
+        
+        product_id = product.pk
+        product.delete()
+        data = self.feed(since=cursor).data['data']
+        self.assertEqual(data['results'][-1]['entity'], 'product')
+        self.assertEqual((data['results'][-1]['object_id'], data['results'][-1]['action']), (product_id, 'deleted'))
+        self.assertEqual(self.feed(since=data['cursor']).data['data'], {'cursor': data['cursor'], 'has_more': False, 'results': []})
+    
+    def test_paging_and_expired_cursor(self):
+        for i in range(5):
+            Category.objects.create(name=f'Category {i}')
+        first = self.feed(limit=2).data['data']
+        self.assertTrue(first['has_more'])
+        second = self.feed(since=first['cursor'], limit=10).data['data']
+        self.assertEqual(len(first['results']) + len(second['results']), 5)
+        self.assertFalse(second['has_more'])
+        
+        CatalogChange.objects.update(created_at=timezone.now() - timedelta(days=60))
+        self.assertEqual(prune_changes(30), 4)
+        self.assertEqual(self.feed(since=first['cursor']).status_code, 410)
+        self.assertEqual(self.feed(since=second['cursor']).status_code, 200)
+        self.assertEqual(self.feed(entity='brand').status_code, 400)
+
+
+class ProductSearchTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        self.tee = self.create_product(sku='TEE-001', name='Classic Cotton Tee', description='Soft jersey')
+        self.hoodie = self.create_product(sku='HOOD-001', name='Zip Hoodie', description='Cotton blend fleece')
+    
+    def search(self, term, **params):
+        response = self.client.get('/api/products/products/', {'search': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return [product['id'] for product in response.data['results']]
+    
+    def test_prefix_search_ranks_name_matches_first(self):
+        self.assertEqual(self.search('cott'), [self.tee.id, self.hoodie.id])
+        self.assertEqual(self.search('hood'), [self.hoodie.id])
+        self.assertEqual(self.search('TEE-001'), [self.tee.id])
+    
+    def test_explicit_ordering_overrides_rank(self):
+        self.assertEqual(self.search('cotton', ordering='-selling_price,name'), [self.tee.id, self.hoodie.id])
+        self.assertEqual(self.search('cotton', ordering='-name'), [self.hoodie.id, self.tee.id])
+    
+    def test_index_follows_updates_and_deletes(self):
+        self.hoodie.name = 'Zip Sweatshirt'
+        self.hoodie.save()
+        self.assertEqual(self.search('hoodie'), [])
+        self.assertEqual(self.search('sweat'), [self.hoodie.id])
+        
+        self.tee.delete()
+        self.assertEqual(self.search('cotton'), [self.hoodie.id])
+
+
+class ProductCursorPaginationTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        self.products = [
+            self.create_product(sku=f'SKU-{i}', name=f'Product {i}', selling_price=Decimal(price),
+                                category='Jeans' if i % 2 else 'Shirts')
+            for i, price in enumerate(['30.00', '10.00', '30.00', '20.00', '40.00'])
+        ]
+    
+    def fetch(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+    
+    def test_walks_forward_and_back_with_id_tie_breaker(self):
+        page = self.fetch('/api/products/products/', {
+            'pagination': 'cursor', 'ordering': 'selling_price', 'page_size': 2
+        })
+        seen = [item['id'] for item in page['results']]
+        self.assertIsNone(page['previous'])
+        while page['next']:
+            page = self.fetch(page['next'])
+            seen.extend(item['id'] for item in page['results'])
+        
+        p = self.products
+        self.assertEqual(seen, [p[1].id, p[3].id, p[0].id, p[2].id, p[4].id])
+        
+        previous = self.fetch(page['previous'])
+        self.assertEqual([item['id'] for item in previous['results']], [p[0].id, p[2].id])
+        self.assertIsNotNone(previous['previous'])
+    
+    def test_respects_filters(self):
+        page = self.fetch('/api/products/products/', {'pagination': 'cursor', 'category': 'Jeans'})
+        self.assertEqual([item['id'] for item in page['results']], [self.products[3].id, self.products[1].id])
+        self.assertIsNone(page['next'])
+    
+    def test_rejects_orderings_the_cursor_cannot_follow(self):
+        for params in ({'ordering': 'best_selling'}, {'search': 'product'}):
+            response = self.client.get('/api/products/products/', {'pagination': 'cursor', **params})
+            self.assertEqual(response.status_code, 400, params)
+        
+        page = self.fetch('/api/products/products/', {'pagination': 'cursor', 'search': 'product', 'ordering': 'name'})
+        self.assertEqual(len(page['results']), 5)
+    
+    def test_rejects_tampered_cursor(self):
+        response = self.client.get('/api/products/products/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+        
+        for payload in ({'f': 'created_at', 'id': 1}, {'f': 'created_at', 'id': 1, 'v': ''},
+                        {'f': 'created_at', 'id': 1, 'v': 'yesterday'}, {'f': 'created_at', 'id': 1, 'v': 5}):
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+            response = self.client.get('/api/products/products/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, payload)
+
+
+class AdminProductListStreamTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user('admin', role='admin'))
+        for i in range(5):
+            product = self.create_product(sku=f'SKU-{i}', name=f'Product {i}')
+            variant = ProductVariant.objects.create(product=product, name='Default', color='Black', stock=3)
+            ProductSize.objects.create(variant=variant, size='M', stock=3)
+    
+    def test_streams_full_catalog_in_chunks(self):
+        with mock.patch.object(AdminProductListView, 'stream_chunk_size', 2):
+            response = self.client.get('/api/products/admin/products/')
+            self.assertTrue(response.streaming)
+            with self.assertNumQueries(7):
+                body = json.loads(b''.join(response.streaming_content))
+        
+        self.assertTrue(body['success'])
+        self.assertEqual(len(body['data']), 5)
+        self.assertEqual(body['data'][0]['variants'][0]['sizes'][0]['size'], 'M')
+    
+    def test_paginated_mode(self):
+        response = self.client.get('/api/products/admin/products/', {'page': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['count'], 5)
+        self.assertEqual(len(response.data['data']['results']), 5)
+
+
+class CategoryProductCountTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.jeans = Category.objects.create(name='Jeans')
+        self.shirts = Category.objects.create(name='Shirts')
+    
+    def assertCounts(self, jeans, shirts):
+        self.jeans.refresh_from_db()
+        self.shirts.refresh_from_db()
+        self.assertEqual((self.jeans.active_product_count, self.shirts.active_product_count), (jeans, shirts))
+    
+    def test_counts_follow_saves_activation_and_deletes(self):
+        product = self.create_product(category='Jeans')
+        self.create_product(sku='SKU-2', category='Jeans', is_active=False)
+        self.assertEqual(product.category_ref, self.jeans)
+        self.assertCounts(1, 0)
+        
+        product = Product.objects.get(pk=product.pk)
+        product.category = 'Shirts'
+        product.save()
+        self.assertCounts(0, 1)
+        
+        product.is_active = False
+        product.save()
+        self.assertCounts(0, 0)
+        
+        product.is_active = True
+        product.save()
+        product.delete()
+        self.assertCounts(0, 0)
+    
+    def test_backfill_links_products_by_name(self):
+        product = self.create_product(category='Dresses')
+        self.assertIsNone(product.category_ref)
+        
+        linked, unmatched = link_products_to_categories()
+        self.assertEqual((linked, unmatched), (0, ['Dresses']))
+        
+        linked, unmatched = link_products_to_categories(create_missing=True)
+        product.refresh_from_db()
+        self.assertEqual(linked, 1)
+        self.assertEqual(product.category_ref.name, 'Dresses')
+        self.assertEqual(product.category_ref.active_product_count, 1)
+    
+    def test_new_category_links_products_using_its_name(self):
+        product = self.create_product(category='summer dresses ')
+        self.assertIsNone(product.category_ref)
+        
+        category = Category.objects.create(name='Summer Dresses')
+        product.refresh_from_db()
+        category.refresh_from_db()
+        self.assertEqual((product.category_ref, product.category), (category, 'Summer Dresses'))
+        self.assertEqual(category.active_product_count, 1)
+        
+        # Saving matches names the same way
+        other = self.create_product(sku='SKU-2', category='SUMMER DRESSES')
+        self.assertEqual(other.category_ref, category)
+    
+    def test_category_list_is_a_single_query(self):
+        client = APIClient()
+        client.force_authenticate(self.create_user())
+        self.create_product(category='Jeans')
+        
+        # One aggregate for the conditional GET validators, one for the list itself
+        with self.assertNumQueries(2):
+            response = client.get('/api/products/categories/')
+        self.assertEqual([c['product_count'] for c in response.data['data']], [1, 0])
+
+
+class ProductDetailCacheTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        self.product = self.create_product()
+        self.variant = ProductVariant.objects.create(product=self.product, name='Default', color='Black', stock=3)
+        self.url = f'/api/products/products/{self.product.pk}/'
+    
+    def test_hit_is_served_from_cache(self):
+        self.client.get(self.url)
+        # Only the conditional GET fingerprint touches the database
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['data']['variants'][0]['color'], 'Black')
+    
+    def test_child_writes_invalidate(self):
+        self.client.get(self.url)
+        size = ProductSize.objects.create(variant=self.variant, size='L', stock=1)
+        self.assertEqual(self.client.get(self.url).data['data']['variants'][0]['sizes'][0]['size'], 'L')
+        
+        size.delete()
+        self.assertEqual(self.client.get(self.url).data['data']['variants'][0]['sizes'], [])
+        
+        Review.objects.create(product=self.product, user=self.create_user('bob'), rating=4, comment='Nice')
+        self.assertEqual(self.client.get(self.url).data['data']['review_count'], 1)
+    
+    def test_cached_media_urls_do_not_carry_the_first_host(self):
+        ProductVariant.objects.filter(pk=self.variant.pk).update(variant_icon='variant_icons/black.png')
+        self.client.get(self.url, HTTP_HOST='localhost')
+        icon = self.client.get(self.url, HTTP_HOST='127.0.0.1').data['data']['variants'][0]['variant_icon']
+        self.assertTrue(icon.startswith('/'))
+        self.assertNotIn('localhost', icon)
+    
+    def test_missing_product_is_404(self):
+        self.assertEqual(self.client.get('/api/products/products/999/').status_code, 404)
+
+
+class SparseFieldsetTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        for i in range(3):
+            product = self.create_product(sku=f'SKU-{i}', name=f'Product {i}')
+            variant = ProductVariant.objects.create(product=product, name='Default', color='Black', stock=3)
+            ProductSize.objects.create(variant=variant, size='M', stock=3)
+        self.product = product
+    
+    def list_products(self, params, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get('/api/products/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+    
+    def test_lean_list_skips_relations(self):
+        full = self.list_products({}, 5)
+        self.assertIn('sizes', full[0]['variants'][0])
+        
+        # Validators, count and the page; no prefetches
+        lean = self.list_products({'fields': 'id,name,selling_price'}, 3)
+        self.assertEqual(set(lean[0]), {'id', 'name', 'selling_price'})
+    
+    def test_expand_is_opt_in_per_level(self):
+        results = self.list_products({'expand': 'variants'}, 4)
+        self.assertIn('sku', results[0])
+        self.assertNotIn('sizes', results[0]['variants'][0])
+        
+        results = self.list_products({'fields': 'id', 'expand': 'variants.sizes'}, 5)
+        self.assertEqual(set(results[0]), {'id', 'variants'})
+        self.assertEqual(results[0]['variants'][0]['sizes'][0]['size'], 'M')
+    
+    def test_detail_is_trimmed_from_cache(self):
+        url = f'/api/products/products/{self.product.pk}/'
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'id,name', 'expand': 'reviews'})
+        self.assertEqual(set(response.data['data']), {'id', 'name', 'reviews'})
+        
+        # The cached copy stays complete
+        self.assertIn('sizes', self.client.get(url).data['data']['variants'][0])
+
+
+class ProductCardTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        self.product = self.create_product(category='Jeans')
+    
+    def card(self, product=None):
+        return json.loads(ProductCard.objects.get(product=product or self.product).data)
+    
+    def test_card_follows_product_tree_writes(self):
+        self.assertEqual(self.card()['colors'], [])
+        self.assertFalse(self.card()['in_stock'])
+        
+        black = ProductVariant.objects.create(product=self.product, name='Black', color='Black', stock=0)
+        ProductVariant.objects.create(product=self.product, name='Blue', color='Blue', stock=0)
+        size = ProductSize.objects.create(variant=black, size='M', stock=2)
+        card = self.card()
+        self.assertEqual((card['colors'], card['in_stock']), (['Black', 'Blue'], True))
+        
+        size.stock = 0
+        size.save()
+        self.assertFalse(self.card()['in_stock'])
+        
+        Review.objects.create(product=self.product, user=self.create_user('bob'), rating=4, comment='Nice')
+        Product.objects.filter(pk=self.product.pk).update(selling_price=Decimal('19.99'))
+        self.assertEqual(self.card()['review_count'], 1)
+        self.assertEqual(self.card()['selling_price'], '25.00')
+        
+        self.product.refresh_from_db()
+        self.product.save()
+        self.assertEqual(self.card()['selling_price'], '19.99')
+    
+    def test_deleting_a_product_tree_leaves_no_derived_rows(self):
+        black = ProductVariant.objects.create(product=self.product, name='Black', color='Black', stock=1)
+        ProductSize.objects.create(variant=black, size='M', stock=2)
+        ProductVariant.objects.create(product=self.product, name='Blue', color='Blue', stock=3)
+        
+        self.product.delete()
+        connection.check_constraints()
+        self.assertFalse(ProductCard.objects.exists())
+        self.assertFalse(ProductAvailability.objects.exists())
+    
+    def test_feed_pages_cards_without_serializing_products(self):
+        for i in range(4):
+            self.create_product(sku=f'SKU-{i + 2}', name=f'Product {i}', category='Shirts')
+        self.create_product(sku='HIDDEN', is_active=False)
+        
+        seen = []
+        url, params = '/api/products/products/cards/', {'page_size': 2, 'ordering': 'name'}
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, params)
+            body = json.loads(response.content)
+            seen.extend(card['name'] for card in body['results'])
+            url, params = body['next'], None
+        self.assertEqual(seen, ['Classic Tee', 'Product 0', 'Product 1', 'Product 2', 'Product 3'])
+        
+        response = self.client.get('/api/products/products/cards/', {'category': 'Jeans'})
+        self.assertEqual([card['id'] for card in json.loads(response.content)['results']], [self.product.pk])
+
+
+class HomepageTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        self.banner = Banner.objects.create(title='Summer Sale', banner='banners/summer.png')
+        Banner.objects.create(title='Old', banner='banners/old.png', is_active=False)
+        self.featured = self.create_product(sku='FEATURED', show_on_homepage=True)
+        self.other = self.create_product(sku='OTHER')
+    
+    def fetch(self, **headers):
+        response = self.client.get('/api/products/homepage/', **headers)
+        return response, json.loads(response.content) if response.status_code == 200 else None
+    
+    def test_snapshot_is_served_from_cache(self):
+        response, body = self.fetch()
+        self.assertEqual([b['title'] for b in body['data']['banners']], ['Summer Sale'])
+        self.assertEqual([p['id'] for p in body['data']['products']], [self.featured.pk])
+        
+        with self.assertNumQueries(0):
+            cached, _ = self.fetch()
+            not_modified, _ = self.fetch(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+    
+    def test_only_banner_and_featured_writes_rebuild(self):
+        version = self.fetch()[1]['data']['version']
+        
+        ProductVariant.objects.create(product=self.other, name='Default', color='Black', stock=3)
+        self.assertIsNotNone(get_cached_homepage())
+        
+        ProductVariant.objects.create(product=self.featured, name='Default', color='Red', stock=3)
+        body = self.fetch()[1]
+        self.assertNotEqual(body['data']['version'], version)
+        self.assertEqual(body['data']['products'][0]['colors'], ['Red'])
+        
+        self.other.show_on_homepage = True
+        self.other.save()
+        self.assertEqual(len(self.fetch()[1]['data']['products']), 2)
+        
+        self.banner.is_active = False
+        self.banner.save()
+        self.assertEqual(self.fetch()[1]['data']['banners'], [])
+
+
+class StockAvailabilityTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.tee = self.create_product(sku='TEE')
+        self.black = ProductVariant.objects.create(product=self.tee, name='Black', color='Black')
+        self.blue = ProductVariant.objects.create(product=self.tee, name='Blue', color='Blue')
+        self.black_m = ProductSize.objects.create(variant=self.black, size='M', stock=2)
+        ProductSize.objects.create(variant=self.blue, size='L', stock=1)
+        self.cap = self.create_product(sku='CAP')
+        ProductVariant.objects.create(product=self.cap, name='Red', color='Red', stock=4)
+        self.sold_out = self.create_product(sku='SOLD-OUT')
+    
+    def skus(self, **params):
+        response = self.client.get('/api/products/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['sku'] for item in response.data['results'])
+    
+    def test_stock_filters(self):
+        self.assertEqual(self.skus(in_stock='true'), ['CAP', 'TEE'])
+        self.assertEqual(self.skus(in_stock='false'), ['SOLD-OUT'])
+        self.assertEqual(self.skus(size='M'), ['TEE'])
+        self.assertEqual(self.skus(size='M,XL', color='Black'), ['TEE'])
+        # Size and color must be in stock on the same variant
+        self.assertEqual(self.skus(size='M', color='Blue'), [])
+        self.assertEqual(self.skus(color='Red', in_stock='true'), ['CAP'])
+    
+    def test_index_follows_stock_writes(self):
+        self.black_m.stock = 0
+        self.black_m.save()
+        self.assertEqual(self.skus(size='M'), [])
+        
+        ProductSize.objects.filter(pk=self.black_m.pk).update(stock=5)
+        self.assertEqual(self.skus(size='M'), [])
+        products_changed([self.tee.pk])
+        self.assertEqual(self.skus(size='M'), ['TEE'])
+    
+    def checkout(self, quantity):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(
+            cart=cart, product=self.tee, variant=self.black, size=self.black_m, quantity=quantity,
+            unit_price=Decimal('25.00'), total_price=Decimal('25.00') * quantity
+        )
+        address = {'address_line_1': '1 Main St', 'city': 'Springfield', 'state': 'IL',
+                   'postal_code': '62701', 'country': 'United States'}
+        return self.client.post('/api/orders/checkout/', {
+            'email': 'customer@example.com', 'phone_number': '555-0100', 'shipping_address': address
+        }, format='json')
+    
+    def test_checkout_decrements_stock_and_index(self):
+        response = self.checkout(3)
+        self.assertEqual(response.status_code, 400)
+        self.black_m.refresh_from_db()
+        self.assertEqual(self.black_m.stock, 2)
+        
+        Cart.objects.all().delete()
+        self.assertEqual(self.checkout(2).status_code, 201)
+        self.black_m.refresh_from_db()
+        self.assertEqual(self.black_m.stock, 0)
+        self.assertEqual(self.skus(size='M'), [])
+
+
+class ConditionalGetTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        self.product = self.create_product()
+        self.variant = ProductVariant.objects.create(product=self.product, name='Default', color='Black', stock=3)
+    
+    def assertRevalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+        
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        return response['ETag']
+    
+    def test_product_list_and_detail(self):
+        for url in ['/api/products/products/', f'/api/products/products/{self.product.pk}/']:
+            etag = self.assertRevalidates(url)
+            
+            self.variant.stock = 5
+            self.variant.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+    
+    def test_category_list(self):
+        Category.objects.create(name='Shirts')
+        etag = self.assertRevalidates('/api/products/categories/')
+        Category.objects.create(name='Jeans')
+        response = self.client.get('/api/products/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_active_banners(self):
+        Banner.objects.create(title='Summer', banner='banners/summer.jpg')
+        self.client.force_authenticate(None)
+        etag = self.assertRevalidates('/api/banners/active/')
+        
+        Banner.objects.create(title='Winter', banner='banners/winter.jpg', is_active=False)
+        self.assertEqual(self.client.get('/api/banners/active/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class ProductFacetTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user())
+        tee = self.create_product(sku='TEE', name='Cotton Tee', gender='men', selling_price=Decimal('20.00'))
+        jeans = self.create_product(sku='JEANS', name='Slim Jeans', category='Jeans', gender='women',
+                                    selling_price=Decimal('80.00'))
+        self.create_product(sku='OLD', name='Old Tee', is_active=False)
+        
+        for product, colors in [(tee, ['Black', 'White']), (jeans, ['Black'])]:
+            for color in colors:
+                variant = ProductVariant.objects.create(product=product, name=color, color=color)
+                ProductSize.objects.create(variant=variant, size='M')
+    
+    def facets(self, **params):
+        response = self.client.get('/api/products/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+    
+    def test_counts_distinct_products_per_facet(self):
+        with self.assertNumQueries(4):
+            data = self.facets()
+        
+        self.assertEqual(data['total'], 2)
+        self.assertIn({'value': 'men', 'count': 1}, data['gender'])
+        self.assertEqual(data['color'], [{'value': 'Black', 'count': 2}, {'value': 'White', 'count': 1}])
+        self.assertEqual(data['size'], [{'value': 'M', 'count': 2}])
+        self.assertEqual([bucket['count'] for bucket in data['price']], [1, 0, 1, 0, 0])
+    
+    def test_applies_list_filters_and_search(self):
+        data = self.facets(category='Jeans')
+        self.assertEqual(data['category'], [{'value': 'Jeans', 'count': 1}])
+        
+        data = self.facets(search='cotton', price_buckets='0,50')
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['color'], [{'value': 'Black', 'count': 1}, {'value': 'White', 'count': 1}])
+        self.assertEqual(data['price'], [{'min': '0', 'max': '50', 'count': 1}, {'min': '50', 'max': None, 'count': 0}])
+    
+    def test_rejects_bad_price_buckets(self):
+        response = self.client.get('/api/products/products/facets/', {'price_buckets': 'cheap'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkStockUpdateTest(ProductTestMixin, TestCase):
+    url = '/api/products/admin/bulk-update-stock/'
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user('admin', role='admin'))
+        self.variants = []
+        for i in range(4):
+            product = self.create_product(sku=f'SKU-{i}')
+            variant = ProductVariant.objects.create(product=product, name='Default', color='Black', stock=1)
+            ProductSize.objects.create(variant=variant, size='M', stock=1)
+            self.variants.append(variant)
+    
+    def post(self, payload):
+        return self.client.post(self.url, payload, format='json')
+    
+    def test_updates_variants_and_sizes_and_reports_missing(self):
+        size = self.variants[1].sizes.get()
+        response = self.post({
+            'variants': [{'id': self.variants[0].id, 'stock': 7}, {'id': 9999, 'stock': 1}],
+            'sizes': [{'id': size.id, 'stock': 3}, {'id': 8888, 'stock': 2}],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data'], {
+            'updated_variants': 1,
+            'updated_sizes': 1,
+            'missing_variant_ids': [9999],
+            'missing_size_ids': [8888],
+        })
+        self.variants[0].refresh_from_db()
+        size.refresh_from_db()
+        self.assertEqual((self.variants[0].stock, size.stock), (7, 3))
+    
+    def test_query_count_does_not_grow_with_payload(self):
+        def run(variants):
+            with CaptureQueriesContext(connection) as queries:
+                self.post({'variants': [{'id': v.id, 'stock': 5} for v in variants]})
+            return len(queries)
+        
+        self.assertEqual(run(self.variants[:1]), run(self.variants[1:]))
+    
+    def test_invalid_payload_writes_nothing(self):
+        response = self.post({'variants': [{'id': self.variants[0].id, 'stock': 5}, {'id': 'x', 'stock': -1}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('variants[1]', response.data['data'])
+        self.variants[0].refresh_from_db()
+        self.assertEqual(self.variants[0].stock, 1)
+
+
+class InventoryStatsTest(ProductTestMixin, TestCase):
+    url = '/api/products/admin/product-stats/'
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user('admin', role='admin'))
+        self.tees = Category.objects.create(name='T-Shirts')
+        hoodies = Category.objects.create(name='Hoodies')
+        tee = self.create_product(sku='TEE-1')
+        hoodie = self.create_product(sku='HOOD-1', category='Hoodies', purchasing_price=Decimal('20.00'))
+        self.tee_variant = ProductVariant.objects.create(product=tee, name='Black', color='Black', stock=3)
+        ProductVariant.objects.create(product=hoodie, name='Grey', color='Grey', stock=0)
+        self.tee_size = ProductSize.objects.create(variant=self.tee_variant, size='M', stock=2)
+        ProductSize.objects.create(variant=self.tee_variant, size='L', stock=0)
+        self.hoodies = hoodies
+    
+    def test_aggregates_inventory(self):
+        # The tee's stock lives on its sizes; the variant stock is not counted again
+        data = self.client.get(self.url).data['data']
+        self.assertEqual(data['total_products'], 2)
+        self.assertEqual(data['total_stock'], 2)
+        self.assertEqual(data['out_of_stock_variants'], 1)
+        self.assertEqual(data['out_of_stock_sizes'], 1)
+        self.assertEqual(data['inventory_value'], '20.00')
+        self.assertEqual(
+            [(row['category'], row['units']) for row in data['stock_by_category']],
+            [('Hoodies', 0), ('T-Shirts', 2)]
+        )
+    
+    def test_sold_out_sizes_take_the_variant_out_of_stock(self):
+        self.tee_size.stock = 0
+        self.tee_size.save()
+        data = self.client.get(self.url).data['data']
+        self.assertEqual((data['total_stock'], data['out_of_stock_variants'], data['inventory_value']), (0, 2, '0.00'))
+    
+    def test_snapshot_is_cached_until_stock_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        
+        self.client.post(
+            '/api/products/admin/bulk-update-stock/',
+            {'sizes': [{'id': self.tee_size.id, 'stock': 10}]},
+            format='json'
+        )
+        self.assertEqual(self.client.get(self.url).data['data']['total_stock'], 10)
+
+
+class CatalogImportTest(ProductTestMixin, TestCase):
+    url = '/api/products/admin/import-catalog/'
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user('admin', role='admin'))
+        self.category = Category.objects.create(name='T-Shirts')
+    
+    def upload(self, name, content):
+        return self.client.post(self.url, {'file': SimpleUploadedFile(name, content.encode('utf-8'))}, format='multipart')
+    
+    def test_csv_rows_are_grouped_into_product_trees(self):
+        response = self.upload('catalog.csv', (
+            'sku,name,category,selling_price,purchasing_price,variant_name,variant_color,variant_stock,size,size_stock\n'
+            'TEE-1,Tee,t-shirts,25.00,10.00,Black,Black,5,S,2\n'
+            'TEE-1,Tee,t-shirts,25.00,10.00,Black,Black,5,M,3\n'
+            'TEE-1,Tee,T-Shirts,25.00,10.00,White,White,1,M,1\n'
+            'CAP-1,Cap,Hats,12.00,,,,,,\n'
+        ))
+        self.assertEqual(response.status_code, 200)
+        report = response.data['data']
+        self.assertEqual(
+            (report['products_created'], report['variants_created'], report['sizes_created'], report['rows_failed']),
+            (2, 2, 3, 0)
+        )
+        tee = Product.objects.get(sku='TEE-1')
+        self.assertEqual((tee.category_ref, tee.category), (self.category, 'T-Shirts'))
+        self.assertEqual(sorted(tee.variants.get(name='Black').sizes.values_list('size', 'stock')), [('M', 3), ('S', 2)])
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.active_product_count, 1)
+    
+    def test_non_utf8_file_is_rejected(self):
+        # The bad byte sits past the first chunk, which must not be written either
+        rows = ''.join(f'TEE-{i},Tee,T-Shirts,25.00\n' for i in range(600))
+        content = f'sku,name,category,selling_price\n{rows}CAFE-1,Café tee,T-Shirts,25.00\n'.encode('latin-1')
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('catalog.csv', content)}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], 'Catalog file must be UTF-8 encoded')
+        self.assertFalse(Product.objects.exists())
+    
+    def test_jsonl_reports_row_errors_and_keeps_valid_rows(self):
+        self.create_product(sku='TAKEN')
+        lines = [
+            {'sku': 'NEW-1', 'name': 'Hoodie', 'category': 'T-Shirts', 'selling_price': '40',
+             'variants': [{'name': 'Grey', 'color': 'Grey', 'stock': 4, 'sizes': 'S, M'}]},
+            {'sku': 'TAKEN', 'name': 'Tee', 'category': 'T-Shirts', 'selling_price': '20'},
+            {'sku': 'BAD-1', 'name': 'Tee', 'category': 'T-Shirts', 'selling_price': '-1'},
+            {'sku': 'NEW-1', 'name': 'Again', 'category': 'T-Shirts', 'selling_price': '20'},
+        ]
+        content = '\n'.join(json.dumps(line) for line in lines) + '\nnot json\n'
+        
+        report = self.upload('catalog.jsonl', content).data['data']
+        self.assertEqual(report['products_created'], 1)
+        self.assertEqual(
+            [(error['line'], error['sku'], sorted(error['errors'])) for error in report['errors']],
+            [(3, 'BAD-1', ['selling_price']), (4, 'NEW-1', ['sku']), (5, None, ['record']), (2, 'TAKEN', ['sku'])]
+        )
+        variant = ProductVariant.objects.get(product__sku='NEW-1')
+        self.assertEqual(sorted(variant.sizes.values_list('size', 'stock')), [('M', 4), ('S', 4)])
+    
+    def test_queries_per_chunk_do_not_grow_with_rows(self):
+        def run(count, offset):
+            rows = ''.join(
+                json.dumps({'sku': f'SKU-{offset + i}', 'name': 'Tee', 'category': 'T-Shirts', 'selling_price': '20',
+                            'variants': [{'name': 'Black', 'color': 'Black', 'stock': 1, 'sizes': 'S,M'}]}) + '\n'
+                for i in range(count)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                import_catalog(io.StringIO(rows), 'jsonl')
+            return len(queries)
+        
+        self.assertEqual(run(1, 0), run(20, 100))
+
+
+class CatalogSyncTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='T-Shirts')
+        self.snapshot = [
+            {'sku': f'SYNC-{i}', 'name': f'Tee {i}', 'category': 'T-Shirts', 'selling_price': '20',
+             'variants': [{'name': 'Black', 'color': 'Black', 'stock': 5, 'sizes': [{'size': 'M', 'stock': 5}]}]}
+            for i in range(3)
+        ]
+        self.sync(self.snapshot)
+    
+    def sync(self, records, **kwargs):
+        content = ''.join(json.dumps(record) + '\n' for record in records)
+        return import_catalog(io.StringIO(content), 'jsonl', sync=True, **kwargs)
+    
+    def test_unchanged_snapshot_writes_nothing(self):
+        before = dict(Product.objects.values_list('sku', 'updated_at'))
+        with CaptureQueriesContext(connection) as queries:
+            report = self.sync(self.snapshot)
+        self.assertEqual((report['products_unchanged'], report['products_updated']), (3, 0))
+        self.assertFalse([query for query in queries if not query['sql'].startswith('SELECT')])
+        self.assertEqual(dict(Product.objects.values_list('sku', 'updated_at')), before)
+    
+    def test_changed_trees_are_diffed(self):
+        self.snapshot[0]['selling_price'] = '25.00'
+        self.snapshot[1]['variants'] = [
+            {'name': 'White', 'color': 'White', 'stock': 2, 'sizes': [{'size': 'L', 'stock': 2}]}
+        ]
+        untouched = Product.objects.get(sku='SYNC-2').updated_at
+        
+        report = self.sync(self.snapshot)
+        self.assertEqual((report['products_updated'], report['products_unchanged']), (2, 1))
+        self.assertEqual((report['variants_created'], report['variants_updated'], report['sizes_created']), (1, 1, 1))
+        self.assertEqual(Product.objects.get(sku='SYNC-0').selling_price, Decimal('25.00'))
+        # Dropped variants are kept for order history, with no stock
+        self.assertEqual(
+            sorted(ProductVariant.objects.filter(product__sku='SYNC-1').values_list('name', 'stock')),
+            [('Black', 0), ('White', 2)]
+        )
+        self.assertEqual(Product.objects.get(sku='SYNC-2').updated_at, untouched)
+    
+    def test_missing_products_are_deactivated_and_come_back(self):
+        manual = self.create_product(sku='MANUAL-1')
+        report = self.sync(self.snapshot[:2])
+        self.assertEqual(report['products_deactivated'], 1)
+        self.assertFalse(Product.objects.get(sku='SYNC-2').is_active)
+        self.assertTrue(Product.objects.get(pk=manual.pk).is_active)
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.active_product_count, 3)
+        
+        report = self.sync(self.snapshot)
+        self.assertEqual(report['products_updated'], 1)
+        self.assertTrue(Product.objects.get(sku='SYNC-2').is_active)
+    
+    def test_bad_snapshot_deactivates_nothing(self):
+        bad_header = 'SKU,name,category,selling_price\nSYNC-0,Tee 0,T-Shirts,20\n'
+        report = import_catalog(io.StringIO(bad_header), 'csv', sync=True)
+        self.assertEqual(report['rows_failed'], 1)
+        self.assertEqual(report['products_deactivated'], 0)
+        self.assertTrue(report['deactivation_skipped'])
+        self.assertEqual(Product.objects.filter(is_active=True).count(), 3)
+        
+        report = self.sync(self.snapshot[:1])
+        self.assertEqual(report['products_deactivated'], 0)
+        self.assertEqual(Product.objects.filter(is_active=True).count(), 3)
+        report = self.sync(self.snapshot[:1], force=True)
+        self.assertEqual(report['products_deactivated'], 2)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class VariantImageRenditionTest(ProductTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.create_user('admin', role='admin'))
+        self.product = self.create_product()
+    
+    def data_image(self, size=(640, 320)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'PNG')
+        return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+    
+    def create_variant(self):
+        response = self.client.post(
+            f'/api/products/products/{self.product.id}/variants/',
+            {'name': 'Red', 'color': 'Red', 'stock': 1, 'variant_icon': self.data_image()},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return ProductVariant.objects.get(product=self.product, name='Red')
+    
+    def test_upload_is_queued_and_processed_into_renditions(self):
+        variant = self.create_variant()
+        job = VariantImageJob.objects.get(variant=variant)
+        self.assertEqual((job.field, job.status), ('variant_icon', VariantImageJob.Status.PENDING))
+        self.assertIsNone(ProductVariantSerializer(variant).data['renditions']['variant_icon'])
+        
+        self.assertEqual(process_image_jobs(), (1, 0))
+        variant.refresh_from_db()
+        icon = variant.renditions['variant_icon']
+        with default_storage.open(icon['thumbnail']['webp']) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (96, 48))
+        
+        urls = self.client.get(f'/api/products/products/{self.product.id}/').data['data']['variants'][0]['renditions']
+        self.assertTrue(urls['variant_icon']['medium']['jpeg'].endswith('.jpeg'))
+        self.assertIsNone(urls['variant_picture'])
+    
+    def test_superseded_upload_is_skipped(self):
+        variant = self.create_variant()
+        variant.variant_icon.save('replacement.png', ContentFile(base64.b64decode(self.data_image().split(',')[1])))
+        
+        self.assertEqual(process_image_jobs(), (2, 0))
+        variant.refresh_from_db()
+        self.assertEqual(variant.renditions['variant_icon']['source'], variant.variant_icon.name)
+        self.assertEqual(VariantImageJob.objects.filter(error='Superseded by a newer upload').count(), 1)
+    
+    def test_broken_upload_is_retried_then_failed(self):
+        variant = self.create_variant()
+        variant.variant_icon.save('broken.png', ContentFile(b'not an image'))
+        for _ in range(MAX_JOB_ATTEMPTS):
+            process_image_jobs()
+        job = VariantImageJob.objects.get(source=variant.variant_icon.name)
+        self.assertEqual((job.status, job.attempts), (VariantImageJob.Status.FAILED, MAX_JOB_ATTEMPTS))
+    
+    def test_stale_job_is_reclaimed_until_it_runs_out_of_attempts(self):
+        variant = self.create_variant()
+        job = VariantImageJob.objects.get(variant=variant)
+        stale = timezone.now() - STALE_JOB_AFTER - timedelta(minutes=1)
+        VariantImageJob.objects.filter(pk=job.pk).update(
+            status=VariantImageJob.Status.PROCESSING, attempts=MAX_JOB_ATTEMPTS - 1, updated_at=stale
+        )
+        self.assertEqual(process_image_jobs(), (1, 0))
+        
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (VariantImageJob.Status.DONE, MAX_JOB_ATTEMPTS))
+        VariantImageJob.objects.filter(pk=job.pk).update(status=VariantImageJob.Status.PROCESSING, updated_at=stale)
+        self.assertEqual(process_image_jobs(), (0, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (VariantImageJob.Status.FAILED, MAX_JOB_ATTEMPTS))
+
+
+class VariantParserTest(ProductTestMixin, TestCase):
+    expected = [
+        ParsedVariant(name='Black', color='Black', stock=3, sizes=['S', 'M']),
+        ParsedVariant(name='White', color='White', stock=0, sizes=[]),
+    ]
+    
+    def form(self, fields):
+        data = QueryDict(mutable=True)
+        for key, value in fields.items():
+            data[key] = value
+        return data
+    
+    def test_all_shapes_parse_to_the_same_variants(self):
+        variants = [
+            {'name': 'Black', 'color': 'Black', 'stock': '3', 'sizes': 'S, M'},
+            {'name': 'White', 'color': 'White', 'stock': 'n/a'},
+        ]
+        shapes = {
+            'list': {'variants': variants},
+            'json': self.form({'variants': json.dumps(variants)}),
+            'bracket': self.form({
+                'variants[0][name]': 'Black', 'variants[0][color]': 'Black',
+                'variants[0][stock]': '3', 'variants[0][sizes]': 'S,M',
+                'variants[1][name]': 'White', 'variants[1][color]': 'White',
+            }),
+            'indexed': self.form({
+                'variant_0_name': 'Black', 'variant_0_color': 'Black',
+                'variant_0_stock_quantity': '3', 'variant_0_sizes': 'S,M',
+                'variant_1_name': 'White', 'variant_1_color': 'White',
+            }),
+        }
+        for shape, data in shapes.items():
+            with self.subTest(shape=shape):
+                self.assertEqual(parse_variants(data, {}), self.expected)
+    
+    def test_stock_field_precedence_follows_each_shape(self):
+        both = {'name': 'Black', 'color': 'Black', 'stock': '3', 'stock_quantity': '7'}
+        self.assertEqual(parse_variants({'variants': [both]}, {})[0].stock, 3)
+        self.assertEqual(parse_variants(self.form({'variants': json.dumps([both])}), {})[0].stock, 3)
+        indexed = self.form({f'variant_0_{key}': value for key, value in both.items()})
+        self.assertEqual(parse_variants(indexed, {})[0].stock, 7)
+    
+    def test_single_variant_and_files(self):
+        icon = SimpleUploadedFile('icon.png', b'icon')
+        data = self.form({'variant_name': 'Red', 'variant_color': 'Red', 'variant_stock': '2'})
+        self.assertEqual(parse_variants(data, {}), [ParsedVariant(name='Red', color='Red', stock=2)])
+        
+        data = self.form({'variants[0][name]': 'Red', 'variants[0][color]': 'Red'})
+        variant, = parse_variants(data, {'variants[0][variant_icon]': icon})
+        self.assertIs(variant.as_dict()['variant_icon'], icon)
+        self.assertNotIn('variant_picture', variant.as_dict())
+    
+    def test_create_with_variants_uses_parsed_form_fields(self):
+        client = APIClient()
+        client.force_authenticate(self.create_user('admin', role='admin'))
+        response = client.post('/api/products/products/create-with-variants/', {
+            'name': 'Hoodie', 'sku': 'HOOD-9', 'category': 'Hoodies', 'selling_price': '40.00',
+            'purchasing_price': '20.00',
+            'variants[0][name]': 'Grey', 'variants[0][color]': 'Grey', 'variants[0][stock]': '4',
+            'variants[0][sizes]': 'S,M',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        variant = ProductVariant.objects.get(product__sku='HOOD-9')
+        self.assertEqual(sorted(variant.sizes.values_list('size', 'stock')), [('M', 4), ('S', 4)])
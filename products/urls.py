@@ -4,9 +4,16 @@ from . import views
 urlpatterns = [
     # Products
     path('products/', views.ProductListView.as_view(), name='product-list'),
+    path('products/facets/', views.ProductFacetView.as_view(), name='product-facets'),
+    path('products/cards/', views.ProductCardListView.as_view(), name='product-cards'),
+    path('products/lookup/', views.ProductLookupView.as_view(), name='product-lookup'),
+    path('products/best-sellers/', views.best_sellers, name='product-best-sellers'),
+    path('products/changes/', views.catalog_changes, name='catalog-changes'),
+    path('homepage/', views.homepage, name='homepage'),
     path('products/create/', views.ProductCreateView.as_view(), name='product-create'),
     path('products/create-with-variants/', views.EnhancedProductCreateView.as_view(), name='enhanced-product-create'),
     path('products/<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
+    path('products/<int:pk>/related/', views.related_products, name='product-related'),
     
     # Product variants
     path('products/<int:product_id>/variants/', views.ProductVariantCreateView.as_view(), name='variant-create'),
@@ -26,6 +33,7 @@ urlpatterns = [
     path('admin/product-stats/', views.product_stats, name='product-stats'),
     path('admin/category-stats/', views.category_stats, name='category-stats'),
     path('admin/bulk-update-stock/', views.bulk_update_stock, name='bulk-update-stock'),
+    path('admin/import-catalog/', views.import_catalog_view, name='import-catalog'),
     
     # Categories
     path('categories/', views.CategoryListCreateView.as_view(), name='category-list-create'),
@@ -0,0 +1,158 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FIELDS = ('name', 'color', 'stock', 'sizes')
+
+# Per-shape aliases onto ParsedVariant attributes
+BRACKET_FIELDS = {
+    'name': 'name', 'color': 'color', 'stock': 'stock', 'stock_quantity': 'stock_quantity',
+    'sizes': 'sizes', 'variant_icon': 'variant_icon', 'variant_picture': 'variant_picture',
+}
+INDEXED_FIELDS = {
+    'name': 'name', 'color': 'color', 'stock': 'stock', 'stock_quantity': 'stock_quantity',
+    'sizes': 'sizes', 'icon': 'variant_icon', 'image': 'variant_picture',
+}
+
+
+@dataclass
+class ParsedVariant:
+    """One variant from a create-with-variants request, in the serializer's shape"""
+    name: str
+    color: str
+    stock: int = 0
+    sizes: list = field(default_factory=list)
+    variant_icon: Optional[Any] = None
+    variant_picture: Optional[Any] = None
+
+    @classmethod
+    def from_fields(cls, values, stock_fields=('stock', 'stock_quantity')):
+        """
+        Build a variant from raw field values, or None without a name and
+        color. The first of `stock_fields` present supplies the stock.
+        """
+        name = values.get('name')
+        color = values.get('color')
+        if not name or not color:
+            return None
+        return cls(
+            name=str(name),
+            color=str(color),
+            stock=parse_stock(next((values[key] for key in stock_fields if key in values), None)),
+            sizes=parse_sizes(values.get('sizes')),
+            variant_icon=values.get('variant_icon') or None,
+            variant_picture=values.get('variant_picture') or None,
+        )
+
+    def as_dict(self):
+        data = {'name': self.name, 'color': self.color, 'stock': self.stock, 'sizes': self.sizes}
+        if self.variant_icon is not None:
+            data['variant_icon'] = self.variant_icon
+        if self.variant_picture is not None:
+            data['variant_picture'] = self.variant_picture
+        return data
+
+
+def parse_stock(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_sizes(value):
+    if isinstance(value, str):
+        return [size.strip() for size in value.split(',') if size.strip()]
+    if isinstance(value, (list, tuple)):
+        return [str(size) for size in value]
+    return []
+
+
+def _indexed_variants(groups, **options):
+    """Variants from index -> fields groups, stopping at the first index without a name"""
+    variants = []
+    index = 0
+    while 'name' in groups.get(index, {}):
+        variant = ParsedVariant.from_fields(groups[index], **options)
+        if variant is not None:
+            variants.append(variant)
+        index += 1
+    return variants
+
+
+def parse_variants(data, files):
+    """
+    Extract the variants of a create-with-variants request in one pass over
+    the form keys and one over the uploaded files.
+
+    Supported shapes, in order of precedence: a native `variants` list
+    (JSON requests), `variants[i][field]` form fields, a `variants` JSON
+    string, a single `variant_<field>` variant and `variant_i_field` form
+    fields. Returns a list of ParsedVariant.
+    """
+    bracket, indexed, single = {}, {}, {}
+    for source, values in (('data', data), ('files', files)):
+        for key, value in _form_items(values):
+            if not key.startswith('variant'):
+                continue
+            if key.startswith('variants['):
+                # variants[0][name]
+                index, _, field = key[9:].partition('][')
+                field = BRACKET_FIELDS.get(field[:-1]) if field.endswith(']') else None
+                if field and index.isdigit():
+                    bracket.setdefault(int(index), {})[field] = value
+            elif key.startswith('variant_'):
+                # variant_0_name or variant_name
+                index, _, field = key[8:].partition('_')
+                if index.isdigit():
+                    field = INDEXED_FIELDS.get(field)
+                    if field:
+                        indexed.setdefault(int(index), {})[field] = value
+                elif source == 'data' and key[8:] in SINGLE_FIELDS:
+                    single[key[8:]] = value
+
+    raw = data.get('variants')
+    if isinstance(raw, list):
+        return _parsed('list', _variants_from_list(raw))
+    if bracket:
+        variants = _indexed_variants(bracket)
+        if variants:
+            return _parsed('bracket', variants)
+    if isinstance(raw, str):
+        variants = _json_variants(raw)
+        if variants:
+            return _parsed('json', variants)
+    if single:
+        variant = ParsedVariant.from_fields(single)
+        if variant is not None:
+            return _parsed('single', [variant])
+    # variant_i_ fields have always let stock_quantity win over stock
+    return _parsed('indexed', _indexed_variants(indexed, stock_fields=('stock_quantity', 'stock')))
+
+
+def _form_items(values):
+    """(key, value) pairs, reading QueryDict/MultiValueDict lists directly (last value wins)"""
+    if hasattr(values, 'lists'):
+        return ((key, items[-1] if items else []) for key, items in values.lists())
+    return values.items()
+
+
+def _parsed(shape, variants):
+    logger.debug('Parsed %d variants from %s fields', len(variants), shape)
+    return variants
+
+
+def _variants_from_list(items):
+    variants = (ParsedVariant.from_fields(item) for item in items if isinstance(item, dict))
+    return [variant for variant in variants if variant is not None]
+
+
+def _json_variants(raw):
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        return []
+    return _variants_from_list(parsed) if isinstance(parsed, list) else []
@@ -1,11 +1,35 @@
+import io
+import logging
+import os
 from rest_framework import status, generics, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Q, Count
+from rest_framework.renderers import JSONRenderer
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db.models import Q, Count, F
+from django.utils.cache import get_conditional_response
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Product, ProductVariant, ProductSize, Review, Category
+from .models import CatalogChange, Product, ProductCard, ProductVariant, ProductSize, RelatedProduct, Review, Category
+from .search import ProductSearchFilter
+from .pagination import ProductCursorPagination, ReviewCursorPagination
+from .bestsellers import (
+    BEST_SELLERS_LIMIT, DEFAULT_WINDOW, MAX_BEST_SELLERS_LIMIT, best_seller_cards, best_selling, parse_window,
+)
+from .changes import CHANGE_FEED_LIMIT, MAX_CHANGE_FEED_LIMIT, CursorExpired, change_feed
+from .cache import get_cached_product_detail, set_cached_product_detail
+from .conditional import ConditionalGetMixin, ConditionalRetrieveMixin
+from .facets import parse_price_bounds, product_facets
+from .filters import ProductFilter
+from .homepage import get_homepage_snapshot
+from .fieldsets import SparseFieldsetMixin
+from .importer import import_catalog, is_utf8
+from .lookup import parse_ids
+from .inventory import apply_stock_updates, get_inventory_stats, parse_stock_entries
+from .ratings import top_reviews_prefetch
+from .variant_parser import parse_variants
+from .votes import record_helpful_vote
 from .serializers import (
     ProductSerializer, ProductCreateSerializer, ProductUpdateSerializer,
     ProductVariantSerializer, ProductVariantCreateSerializer, ProductVariantUpdateSerializer,
@@ -13,35 +37,191 @@ from .serializers import (
     ReviewSerializer, ReviewCreateSerializer, CategorySerializer
 )
 
+logger = logging.getLogger(__name__)
+
 # Product Views
-class ProductListView(generics.ListCreateAPIView):
+class ProductListView(SparseFieldsetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'gender', 'is_active']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
+    filterset_class = ProductFilter
     search_fields = ['name', 'sku', 'description']
-    ordering_fields = ['name', 'selling_price', 'created_at']
+    ordering_fields = ['name', 'selling_price', 'created_at', 'best_selling']
     ordering = ['-created_at']
+    relation_prefetches = {'variants': 'variants', 'variants.sizes': 'variants__sizes'}
     
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Product.objects.none()
         
-        queryset = Product.objects.prefetch_related(
-            'variants', 'variants__sizes'
-        )
+        queryset = self.prefetch_for_fieldset(Product.objects.all())
         
         # Filter by is_active for non-admin users
         if not self.request.user.is_admin:
             queryset = queryset.filter(is_active=True)
         
+        # ?ordering=best_selling sorts by units sold over ?window= days (see products/bestsellers.py)
+        if self.orders_by_best_selling(self.request):
+            days = parse_window(self.request.query_params.get('window')) or DEFAULT_WINDOW
+            queryset = queryset.annotate(best_selling=best_selling(days))
+        
         return queryset
     
+    def orders_by_best_selling(self, request):
+        return 'best_selling' in request.query_params.get('ordering', '')
+    
+    def supports_conditional_get(self, request):
+        # Order events and the daily roll reorder best sellers without touching any product
+        return not self.orders_by_best_selling(request)
+    
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client asks for ?pagination=cursor"""
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request else {}
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = ProductCursorPagination()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
+    
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return ProductCreateSerializer
         return ProductSerializer
 
+class ProductFacetView(generics.GenericAPIView):
+    """
+    Facet counts for the storefront filter sidebar.
+    Accepts the same filters and search as ProductListView and returns counts
+    per gender, category, color, size and price bucket (?price_buckets=0,50,100).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
+    filterset_class = ProductListView.filterset_class
+    search_fields = ProductListView.search_fields
+    
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Product.objects.none()
+        
+        queryset = Product.objects.all()
+        if not self.request.user.is_admin:
+            queryset = queryset.filter(is_active=True)
+        return queryset
+    
+    def get(self, request, *args, **kwargs):
+        try:
+            price_bounds = parse_price_bounds(request.query_params.get('price_buckets'))
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response({
+            'success': True,
+            'message': 'Product facets retrieved successfully',
+            'data': product_facets(queryset, price_bounds)
+        })
+
+class ProductCardListView(generics.GenericAPIView):
+    """
+    Storefront grid feed of precomputed product cards (see products/cards.py).
+    Cursor paginated like ?pagination=cursor on ProductListView; the stored
+    card JSON is spliced into the response without re-serializing it.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProductCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['category', 'gender']
+    
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ProductCard.objects.none()
+        return ProductCard.objects.all()
+    
+    def get(self, request, *args, **kwargs):
+        cards = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        links = JSONRenderer().render({
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
+        })
+        results = ','.join(card.data for card in cards).encode('utf-8')
+        return HttpResponse(
+            links[:-1] + b',"results":[' + results + b']}',
+            content_type='application/json'
+        )
+
+class ProductLookupView(SparseFieldsetMixin, generics.GenericAPIView):
+    """
+    Batch hydration for carts, wishlists and recently viewed lists.
+    ?ids=1,2,3 and/or ?variant_ids=4,5 return products and variants keyed
+    by id in a fixed number of queries, whatever the number of ids.
+    Inactive products and their variants are only visible to admins;
+    like unknown ids they are listed under `missing`. ?fields= / ?expand=
+    trim the products as on ProductListView.
+    """
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    relation_prefetches = ProductListView.relation_prefetches
+    
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Product.objects.none()
+        
+        queryset = Product.objects.all()
+        if not self.request.user.is_admin:
+            queryset = queryset.filter(is_active=True)
+        return queryset
+    
+    def get(self, request, *args, **kwargs):
+        try:
+            product_ids = parse_ids(request.query_params.get('ids'), 'ids')
+            variant_ids = parse_ids(request.query_params.get('variant_ids'), 'variant_ids')
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not product_ids and not variant_ids:
+            return Response({
+                'success': False,
+                'message': 'Provide ids and/or variant_ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        products = {}
+        if product_ids:
+            products = self.prefetch_for_fieldset(self.get_queryset()).in_bulk(product_ids)
+        variants = {}
+        if variant_ids:
+            queryset = ProductVariant.objects.prefetch_related('sizes')
+            if not request.user.is_admin:
+                queryset = queryset.filter(product__is_active=True)
+            variants = queryset.in_bulk(variant_ids)
+        
+        found_products = [products[pk] for pk in product_ids if pk in products]
+        found_variants = [variants[pk] for pk in variant_ids if pk in variants]
+        product_data = self.get_serializer(found_products, many=True).data
+        variant_data = ProductVariantSerializer(found_variants, many=True, context=self.get_serializer_context()).data
+        
+        return Response({
+            'success': True,
+            'message': 'Products retrieved successfully',
+            'data': {
+                'products': {product.pk: data for product, data in zip(found_products, product_data)},
+                'variants': {
+                    variant.pk: {**data, 'product_id': variant.product_id}
+                    for variant, data in zip(found_variants, variant_data)
+                },
+                'missing': {
+                    'products': [pk for pk in product_ids if pk not in products],
+                    'variants': [pk for pk in variant_ids if pk not in variants],
+                },
+            }
+        })
+
 class ProductCreateView(generics.CreateAPIView):
     serializer_class = ProductCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -70,58 +250,10 @@ class EnhancedProductCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def create(self, request, *args, **kwargs):
-        print("\n" + "="*80)
-        print("🚀 ENHANCED PRODUCT CREATE VIEW - START")
-        print("="*80)
-        
-        # Debug: Print the incoming request details
-        print(f"🔍 Request Method: {request.method}")
-        print(f"🔍 Content-Type: {request.content_type}")
-        print(f"🔍 Content-Length: {request.headers.get('Content-Length', 'Unknown')}")
-        print(f"🔍 User: {request.user}")
-        print()
-        
-        # Debug: Print all request data
-        print("📊 REQUEST.DATA CONTENTS:")
-        print("-" * 40)
-        for key, value in request.data.items():
-            print(f"  {key}: {type(value)} = {repr(value)}")
-        print()
-        
-        # Debug: Print all files
-        print("📁 REQUEST.FILES CONTENTS:")
-        print("-" * 40)
-        for key, value in request.FILES.items():
-            print(f"  {key}: {type(value)} = {value.name if hasattr(value, 'name') else value}")
-        print()
-        
-        # Debug: Print all headers
-        print("📋 REQUEST HEADERS:")
-        print("-" * 40)
-        for key, value in request.headers.items():
-            if key.lower() in ['authorization', 'content-type', 'content-length']:
-                print(f"  {key}: {value}")
-        print()
-        
-        # Parse multipart form data to extract variants
-        print("🔧 PARSING VARIANTS...")
-        variants_data = self._parse_variants_from_form_data(request.data, request.FILES)
-        
-        print(f"✅ PARSED VARIANTS RESULT:")
-        print(f"  Type: {type(variants_data)}")
-        print(f"  Length: {len(variants_data) if isinstance(variants_data, list) else 'N/A'}")
-        print(f"  Content: {variants_data}")
-        print()
-        
-        # Create a copy of data and add parsed variants
-        data = request.data.copy()
-        data['variants'] = variants_data
+        variants_data = [variant.as_dict() for variant in parse_variants(request.data, request.FILES)]
+        data = request.data
         
         # Map frontend fields to model fields
-        print("🔧 MAPPING FIELDS...")
-        mapped_data = {}
-        
-        # Direct mappings
         field_mappings = {
             'name': 'name',
             'sku': 'sku',
@@ -132,18 +264,15 @@ class EnhancedProductCreateView(generics.CreateAPIView):
             'purchasing_price': 'purchasing_price',
             'material_and_care': 'material_and_care'
         }
-        
-        for frontend_field, model_field in field_mappings.items():
-            if frontend_field in data:
-                mapped_data[model_field] = data[frontend_field]
-                print(f"  {frontend_field} → {model_field}: {data[frontend_field]}")
-            else:
-                print(f"  ❌ Missing field: {frontend_field}")
+        mapped_data = {
+            model_field: data[frontend_field]
+            for frontend_field, model_field in field_mappings.items()
+            if frontend_field in data
+        }
         
         # Handle special cases
         if 'cost_price' in data:
             mapped_data['purchasing_price'] = data['cost_price']
-            print(f"  cost_price → purchasing_price: {data['cost_price']}")
         
         if 'brand' in data:
             # Map brand to gender if needed
@@ -156,374 +285,35 @@ class EnhancedProductCreateView(generics.CreateAPIView):
                 mapped_data['gender'] = 'unisex'
             elif brand in ['kids', 'children']:
                 mapped_data['gender'] = 'kids'
-            print(f"  brand → gender: {data['brand']} → {mapped_data.get('gender')}")
         
         # Add variants
         mapped_data['variants'] = variants_data
         
-        print("📝 FINAL MAPPED DATA FOR SERIALIZER:")
-        print("-" * 40)
-        for key, value in mapped_data.items():
-            print(f"  {key}: {type(value)} = {repr(value)}")
-        print()
-        
-        # Validate serializer
-        print("🔍 VALIDATING SERIALIZER...")
         serializer = self.get_serializer(data=mapped_data)
-        
         if serializer.is_valid():
-            print("✅ SERIALIZER VALIDATION PASSED!")
-            print("💾 SAVING PRODUCT...")
             product = serializer.save()
-            print(f"✅ PRODUCT SAVED! ID: {product.id}")
-            
-            # Get the response data
-            response_data = ProductSerializer(product).data
-            print("📤 RESPONSE DATA:")
-            print(f"  Product ID: {response_data.get('id')}")
-            print(f"  Product Name: {response_data.get('name')}")
-            print(f"  Variants Count: {len(response_data.get('variants', []))}")
-            
-            print("="*80)
-            print("🚀 ENHANCED PRODUCT CREATE VIEW - SUCCESS")
-            print("="*80)
+            logger.debug('Created product %s with %d variants', product.id, len(variants_data))
             
             return Response({
                 'success': True,
                 'message': 'Product with variants created successfully',
-                'data': response_data
+                'data': ProductSerializer(product).data
             }, status=status.HTTP_201_CREATED)
         
-        print("❌ SERIALIZER VALIDATION FAILED!")
-        print("🔍 VALIDATION ERRORS:")
-        print("-" * 40)
-        for field, errors in serializer.errors.items():
-            print(f"  {field}: {errors}")
-        print()
-        
-        print("="*80)
-        print("🚀 ENHANCED PRODUCT CREATE VIEW - FAILED")
-        print("="*80)
-        
+        logger.debug('Product creation failed: %s', serializer.errors)
         return Response({
             'success': False,
             'message': 'Product creation failed',
             'data': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
-    
-    def _parse_variants_from_form_data(self, data, files):
-        """
-        Parse multipart form data to extract variants array.
-        Handles different data structures from frontend.
-        """
-        print("🔧 _parse_variants_from_form_data called")
-        print(f"  Input data type: {type(data)}")
-        print(f"  Input files type: {type(files)}")
-        print(f"  Data keys: {list(data.keys())}")
-        print(f"  Files keys: {list(files.keys())}")
-        
-        variants = []
-        
-        # Method 1: Check if variants is already a list (Frontend sends this way)
-        print("🔧 Method 1: Checking if variants is already a list...")
-        if 'variants' in data and isinstance(data['variants'], list):
-            print(f"✅ Method 1 succeeded: variants is already a list with {len(data['variants'])} items")
-            # Process the variants to match expected format
-            processed_variants = []
-            for i, variant in enumerate(data['variants']):
-                print(f"  Processing variant {i}: {variant}")
-                
-                processed_variant = {}
-                
-                # Handle name
-                if 'name' in variant:
-                    processed_variant['name'] = str(variant['name'])
-                    print(f"    Name: {processed_variant['name']}")
-                else:
-                    print(f"    ❌ Missing name for variant {i}")
-                    continue
-                
-                # Handle color
-                if 'color' in variant:
-                    processed_variant['color'] = str(variant['color'])
-                    print(f"    Color: {processed_variant['color']}")
-                else:
-                    print(f"    ❌ Missing color for variant {i}")
-                    continue
-                
-                # Handle stock (convert from stock_quantity if needed)
-                if 'stock' in variant:
-                    stock_value = variant['stock']
-                elif 'stock_quantity' in variant:
-                    stock_value = variant['stock_quantity']
-                else:
-                    stock_value = 0
-                
-                try:
-                    processed_variant['stock'] = int(stock_value)
-                    print(f"    Stock: {processed_variant['stock']}")
-                except (ValueError, TypeError) as e:
-                    print(f"    Stock conversion failed: {e}")
-                    processed_variant['stock'] = 0
-                
-                # Handle sizes (convert from array to string if needed)
-                if 'sizes' in variant:
-                    sizes_data = variant['sizes']
-                    if isinstance(sizes_data, list):
-                        processed_variant['sizes'] = [str(size) for size in sizes_data]
-                        print(f"    Sizes (from array): {processed_variant['sizes']}")
-                    elif isinstance(sizes_data, str):
-                        processed_variant['sizes'] = [size.strip() for size in sizes_data.split(',')]
-                        print(f"    Sizes (from string): {processed_variant['sizes']}")
-                    else:
-                        processed_variant['sizes'] = []
-                        print(f"    Sizes (unknown type): {sizes_data}")
-                else:
-                    processed_variant['sizes'] = []
-                    print(f"    Sizes: Not found")
-                
-                # Handle image files if present
-                if 'variant_icon' in variant:
-                    processed_variant['variant_icon'] = variant['variant_icon']
-                    print(f"    Icon: {variant['variant_icon']}")
-                
-                if 'variant_picture' in variant:
-                    processed_variant['variant_picture'] = variant['variant_picture']
-                    print(f"    Picture: {variant['variant_picture']}")
-                
-                # Only add variant if it has required fields
-                if processed_variant['name'] and processed_variant['color']:
-                    processed_variants.append(processed_variant)
-                    print(f"    ✅ Variant {i} processed and added")
-                else:
-                    print(f"    ❌ Variant {i} skipped - missing required fields")
-            
-            print(f"  Total processed variants: {len(processed_variants)}")
-            return processed_variants
-        
-        # Method 2: Try to parse array-style field names
-        print("🔧 Method 2: Trying array-style field names...")
-        variants_data = self._parse_array_style_fields(data, files)
-        if variants_data:
-            print(f"✅ Method 2 succeeded: {len(variants_data)} variants found")
-            return variants_data
-        print("❌ Method 2 failed")
-        
-        # Method 3: Try to parse if variants is a JSON string
-        print("🔧 Method 3: Checking if variants is a JSON string...")
-        if 'variants' in data and isinstance(data['variants'], str):
-            try:
-                import json
-                parsed_variants = json.loads(data['variants'])
-                if isinstance(parsed_variants, list):
-                    print(f"✅ Method 3 succeeded: parsed JSON variants with {len(parsed_variants)} items")
-                    return parsed_variants
-            except (json.JSONDecodeError, TypeError) as e:
-                print(f"❌ Method 3 failed: JSON decode error - {e}")
-        print("❌ Method 3 failed")
-        
-        # Method 4: Try to parse individual variant fields
-        print("🔧 Method 4: Checking for individual variant fields...")
-        variants_data = self._parse_individual_variant_fields(data, files)
-        if variants_data:
-            print(f"✅ Method 4 succeeded: {len(variants_data)} variants found")
-            return variants_data
-        print("❌ Method 4 failed")
-        
-        # Method 5: Try to parse variant_0_name style fields
-        print("🔧 Method 5: Checking for variant_0_name style fields...")
-        variants_data = self._parse_variant_indexed_fields(data, files)
-        if variants_data:
-            print(f"✅ Method 5 succeeded: {len(variants_data)} variants found")
-            return variants_data
-        print("❌ Method 5 failed")
-        
-        print("❌ All parsing methods failed - returning empty list")
-        return []
-    
-    def _parse_array_style_fields(self, data, files):
-        """Parse variants[0][name] style fields"""
-        print("🔧 _parse_array_style_fields called")
-        variants = []
-        variant_index = 0
-        
-        while True:
-            # Check if we have a variant at this index
-            name_key = f'variants[{variant_index}][name]'
-            if name_key not in data:
-                print(f"  No more variants found at index {variant_index}")
-                break
-            
-            print(f"  Found variant at index {variant_index}")
-            variant_data = {}
-            
-            # Extract basic fields
-            variant_data['name'] = data.get(f'variants[{variant_index}][name]', '')
-            variant_data['color'] = data.get(f'variants[{variant_index}][color]', '')
-            stock_value = data.get(f'variants[{variant_index}][stock]', 0)
-            
-            print(f"    Name: {variant_data['name']}")
-            print(f"    Color: {variant_data['color']}")
-            print(f"    Stock (raw): {stock_value} (type: {type(stock_value)})")
-            
-            # Convert stock to integer
-            try:
-                variant_data['stock'] = int(stock_value)
-                print(f"    Stock (converted): {variant_data['stock']}")
-            except (ValueError, TypeError) as e:
-                print(f"    Stock conversion failed: {e}")
-                variant_data['stock'] = 0
-            
-            # Extract image files
-            icon_key = f'variants[{variant_index}][variant_icon]'
-            if icon_key in files and files[icon_key]:
-                variant_data['variant_icon'] = files[icon_key]
-                print(f"    Icon: {files[icon_key].name}")
-            else:
-                print(f"    Icon: Not found or empty")
-            
-            picture_key = f'variants[{variant_index}][variant_picture]'
-            if picture_key in files and files[picture_key]:
-                variant_data['variant_picture'] = files[picture_key]
-                print(f"    Picture: {files[picture_key].name}")
-            else:
-                print(f"    Picture: Not found or empty")
-            
-            # Extract sizes
-            sizes_key = f'variants[{variant_index}][sizes]'
-            if sizes_key in data:
-                sizes_str = data[sizes_key]
-                print(f"    Sizes (raw): {sizes_str} (type: {type(sizes_str)})")
-                if isinstance(sizes_str, str):
-                    variant_data['sizes'] = [size.strip() for size in sizes_str.split(',')]
-                    print(f"    Sizes (parsed): {variant_data['sizes']}")
-                else:
-                    variant_data['sizes'] = sizes_str
-                    print(f"    Sizes (direct): {variant_data['sizes']}")
-            else:
-                print(f"    Sizes: Not found")
-            
-            # Only add variant if it has required fields
-            if variant_data['name'] and variant_data['color']:
-                variants.append(variant_data)
-                print(f"    ✅ Variant added to list")
-            else:
-                print(f"    ❌ Variant skipped - missing name or color")
-            
-            variant_index += 1
-        
-        print(f"  Total variants parsed: {len(variants)}")
-        return variants
-    
-    def _parse_individual_variant_fields(self, data, files):
-        """Parse individual variant fields if they exist"""
-        variants = []
-        
-        # Look for variant fields in the data
-        variant_fields = {}
-        for key, value in data.items():
-            if key.startswith('variant_'):
-                variant_fields[key] = value
-        
-        if variant_fields:
-            # This might be a single variant
-            variant_data = {}
-            variant_data['name'] = data.get('variant_name', '')
-            variant_data['color'] = data.get('variant_color', '')
-            variant_data['stock'] = int(data.get('variant_stock', 0))
-            
-            # Handle sizes
-            sizes_str = data.get('variant_sizes', '')
-            if sizes_str:
-                variant_data['sizes'] = [size.strip() for size in sizes_str.split(',')]
-            
-            if variant_data['name'] and variant_data['color']:
-                variants.append(variant_data)
-        
-        return variants
-    
-    def _parse_variant_indexed_fields(self, data, files):
-        """Parse variant_0_name, variant_0_color style fields"""
-        print("🔧 _parse_variant_indexed_fields called")
-        variants = []
-        variant_index = 0
-        
-        while True:
-            # Check if we have a variant at this index
-            name_key = f'variant_{variant_index}_name'
-            if name_key not in data:
-                print(f"  No more variants found at index {variant_index}")
-                break
-            
-            print(f"  Found variant at index {variant_index}")
-            variant_data = {}
-            
-            # Extract basic fields
-            variant_data['name'] = data.get(f'variant_{variant_index}_name', '')
-            variant_data['color'] = data.get(f'variant_{variant_index}_color', '')
-            # Handle both stock and stock_quantity field names
-            stock_value = data.get(f'variant_{variant_index}_stock_quantity', 
-                                 data.get(f'variant_{variant_index}_stock', 0))
-            
-            print(f"    Name: {variant_data['name']}")
-            print(f"    Color: {variant_data['color']}")
-            print(f"    Stock (raw): {stock_value} (type: {type(stock_value)})")
-            
-            # Convert stock to integer
-            try:
-                variant_data['stock'] = int(stock_value)
-                print(f"    Stock (converted): {variant_data['stock']}")
-            except (ValueError, TypeError) as e:
-                print(f"    Stock conversion failed: {e}")
-                variant_data['stock'] = 0
-            
-            # Extract image files
-            icon_key = f'variant_{variant_index}_icon'
-            if icon_key in files and files[icon_key]:
-                variant_data['variant_icon'] = files[icon_key]
-                print(f"    Icon: {files[icon_key].name}")
-            else:
-                print(f"    Icon: Not found or empty")
-            
-            picture_key = f'variant_{variant_index}_image'
-            if picture_key in files and files[picture_key]:
-                variant_data['variant_picture'] = files[picture_key]
-                print(f"    Picture: {files[picture_key].name}")
-            else:
-                print(f"    Picture: Not found or empty")
-            
-            # Extract sizes
-            sizes_key = f'variant_{variant_index}_sizes'
-            if sizes_key in data:
-                sizes_str = data[sizes_key]
-                print(f"    Sizes (raw): {sizes_str} (type: {type(sizes_str)})")
-                if isinstance(sizes_str, str):
-                    variant_data['sizes'] = [size.strip() for size in sizes_str.split(',')]
-                    print(f"    Sizes (parsed): {variant_data['sizes']}")
-                else:
-                    variant_data['sizes'] = sizes_str
-                    print(f"    Sizes (direct): {variant_data['sizes']}")
-            else:
-                print(f"    Sizes: Not found")
-            
-            # Only add variant if it has required fields
-            if variant_data['name'] and variant_data['color']:
-                variants.append(variant_data)
-                print(f"    ✅ Variant added to list")
-            else:
-                print(f"    ❌ Variant skipped - missing name or color")
-            
-            variant_index += 1
-        
-        print(f"  Total variants parsed: {len(variants)}")
-        return variants
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductDetailView(SparseFieldsetMixin, ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.prefetch_related(
-        'variants', 'variants__sizes'
+        'variants', 'variants__sizes', top_reviews_prefetch()
     )
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
+    relation_prefetches = {'variants': 'variants', 'variants.sizes': 'variants__sizes', 'reviews': top_reviews_prefetch()}
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -531,17 +321,24 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
         return ProductDetailSerializer
     
     def retrieve(self, request, *args, **kwargs):
-        """Override retrieve to return consistent response format"""
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        
-        # Debug logging
-        print(f"🔍 ProductDetailView.retrieve - Product ID: {instance.id}")
-        print(f"🔍 ProductDetailView.retrieve - Product Name: {instance.name}")
-        print(f"🔍 ProductDetailView.retrieve - Variants count: {instance.variants.count()}")
+        """
+        Override retrieve to return consistent response format.
+        The full serialized product is cached until the product, its variants,
+        sizes or reviews change (see products.signals.products_changed);
+        ?fields= / ?expand= requests are trimmed from that cached copy.
+        It is serialized without the request, so media URLs stay relative
+        instead of carrying the first requester's host.
+        """
+        serialized_data = get_cached_product_detail(kwargs[self.lookup_field])
+        if serialized_data is None:
+            instance = self.get_object()
+            context = {'format': self.format_kwarg, 'view': self}
+            serialized_data = self.get_serializer(instance, fieldset=None, context=context).data
+            set_cached_product_detail(instance.pk, serialized_data)
         
-        serialized_data = serializer.data
-        print(f"🔍 ProductDetailView.retrieve - Serialized variants: {serialized_data.get('variants', [])}")
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            serialized_data = fieldset.apply(serialized_data, self.relation_prefetches)
         
         return Response({
             'success': True,
@@ -635,50 +432,202 @@ class ProductImageCreateView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 # Admin Views
-class AdminProductListView(generics.ListAPIView):
+class AdminProductListView(SparseFieldsetMixin, generics.ListAPIView):
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
     filterset_fields = ['category', 'gender']
     search_fields = ['name', 'sku', 'description']
     ordering_fields = ['name', 'selling_price', 'created_at']
     ordering = ['-created_at']
+    relation_prefetches = ProductListView.relation_prefetches
+    
+    stream_chunk_size = 200
     
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Product.objects.none()
-        return Product.objects.prefetch_related(
-            'variants', 'variants__sizes'
-        )
+        return self.prefetch_for_fieldset(Product.objects.all())
     
     def list(self, request, *args, **kwargs):
+        """
+        Stream the whole catalog by default; ?page= switches to the
+        regular paginated response used by the admin UI.
+        """
         queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
         
+        if self.paginator and self.paginator.page_query_param in request.query_params:
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return Response({
+                'success': True,
+                'message': 'Admin product list retrieved successfully',
+                'data': {
+                    'count': self.paginator.page.paginator.count,
+                    'next': self.paginator.get_next_link(),
+                    'previous': self.paginator.get_previous_link(),
+                    'results': serializer.data
+                }
+            }, status=status.HTTP_200_OK)
+        
+        return StreamingHttpResponse(
+            self._stream_products(queryset),
+            content_type='application/json',
+            status=status.HTTP_200_OK
+        )
+    
+    def _stream_products(self, queryset):
+        """
+        Yield the response envelope piece by piece. iterator() runs the
+        prefetches per chunk, so only one chunk of products, variants and
+        sizes is held in memory at a time.
+        """
+        renderer = JSONRenderer()
+        yield b'{"success":true,"message":"Admin product list retrieved successfully","data":['
+        
+        chunk = []
+        separator = b''
+        for product in queryset.iterator(chunk_size=self.stream_chunk_size):
+            chunk.append(product)
+            if len(chunk) == self.stream_chunk_size:
+                yield separator + self._render_chunk(renderer, chunk)
+                separator = b','
+                chunk = []
+        if chunk:
+            yield separator + self._render_chunk(renderer, chunk)
+        
+        yield b']}'
+    
+    def _render_chunk(self, renderer, products):
+        # Render the chunk as a JSON array and drop the surrounding brackets
+        data = self.get_serializer(products, many=True).data
+        return renderer.render(data)[1:-1]
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def homepage(request):
+    """
+    Active banners and featured product cards in one response, served from
+    a cached snapshot that is rebuilt only after a banner or featured
+    product changes (see products/homepage.py).
+    """
+    snapshot = get_homepage_snapshot()
+    etag = '"%s"' % snapshot['version']
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    
+    response = HttpResponse(snapshot['body'], content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def related_products(request, pk):
+    """
+    Products frequently bought together with this one, best match first.
+    Reads the ranked neighbors built offline by build_recommendations and
+    splices their stored cards into the response; inactive products (which
+    have no card) are left out. Only admins see the neighbors of an
+    inactive product.
+    """
+    products = Product.objects.filter(pk=pk)
+    if not request.user.is_admin:
+        products = products.filter(is_active=True)
+    if not products.exists():
         return Response({
-            'success': True,
-            'message': 'Admin product list retrieved successfully',
-            'data': serializer.data
-        }, status=status.HTTP_200_OK)
+            'success': False,
+            'message': 'Product not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    cards = list(
+        RelatedProduct.objects.filter(product_id=pk, related__card__isnull=False)
+        .order_by('rank').values_list('related__card__data', flat=True)
+    )
+    return HttpResponse(
+        b'{"success":true,"message":"Related products retrieved successfully","data":['
+        + ','.join(cards).encode('utf-8') + b']}',
+        content_type='application/json'
+    )
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
-def product_stats(request):
+def best_sellers(request):
     """
-    Get product statistics for admin dashboard
+    Top selling products over the last ?window= 7, 30 or 90 days (default
+    30), optionally within one ?category=. Reads the materialized
+    leaderboard (see products/bestsellers.py) and splices in the stored
+    product cards.
     """
-    total_products = Product.objects.count()
-    total_variants = ProductVariant.objects.count()
-    total_stock = sum(variant.stock for variant in ProductVariant.objects.all())
+    days = parse_window(request.query_params.get('window', DEFAULT_WINDOW))
+    if days is None:
+        return Response({
+            'success': False,
+            'message': 'window must be 7, 30 or 90'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', BEST_SELLERS_LIMIT))
+    except ValueError:
+        limit = BEST_SELLERS_LIMIT
+    limit = min(max(limit, 1), MAX_BEST_SELLERS_LIMIT)
+    
+    cards = best_seller_cards(days, request.query_params.get('category'), limit)
+    return HttpResponse(
+        b'{"success":true,"message":"Best sellers retrieved successfully","data":['
+        + ','.join(cards).encode('utf-8') + b']}',
+        content_type='application/json'
+    )
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def catalog_changes(request):
+    """
+    Catalog changes after sequence number ?since= (default 0), oldest first,
+    up to ?limit= rows, optionally only for ?entity=product,variant,size,category.
+    Pass the returned `cursor` as the next ?since=. Responds 410 when the
+    changes after ?since= were pruned and the consumer has to resync.
+    """
+    params = request.query_params
+    entities = [name for name in params.get('entity', '').split(',') if name]
+    try:
+        since = int(params.get('since', 0))
+        limit = int(params.get('limit', CHANGE_FEED_LIMIT))
+        if since < 0 or any(name not in CatalogChange.Entity.values for name in entities):
+            raise ValueError
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'since and limit must be integers and entity one of ' + ', '.join(CatalogChange.Entity.values)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        changes, has_more = change_feed(since, min(max(limit, 1), MAX_CHANGE_FEED_LIMIT), entities)
+    except CursorExpired:
+        return Response({
+            'success': False,
+            'message': 'Changes after this cursor are no longer available; resync the full catalog'
+        }, status=status.HTTP_410_GONE)
     
     return Response({
         'success': True,
-        'message': 'Product statistics retrieved successfully',
+        'message': 'Catalog changes retrieved successfully',
         'data': {
-            'total_products': total_products,
-            'total_variants': total_variants,
-            'total_stock': total_stock
+            'cursor': changes[-1]['id'] if changes else since,
+            'has_more': has_more,
+            'results': changes,
         }
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def product_stats(request):
+    """
+    Get product statistics for admin dashboard
+    """
+    return Response({
+        'success': True,
+        'message': 'Product statistics retrieved successfully',
+        'data': get_inventory_stats()
     }, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
@@ -687,9 +636,9 @@ def category_stats(request):
     """
     Get category statistics for admin dashboard
     """
-    categories = Product.objects.values('category').annotate(
-        product_count=Count('id')
-    )
+    categories = Category.objects.annotate(
+        product_count=Count('products')
+    ).values('id', 'product_count', 'active_product_count', category=F('name'))
     
     return Response({
         'success': True,
@@ -701,31 +650,74 @@ def category_stats(request):
 @permission_classes([permissions.IsAuthenticated])
 def bulk_update_stock(request):
     """
-    Bulk update stock for multiple variants
+    Bulk update stock for variants and sizes.
+    Expects {"variants": [{"id", "stock"}], "sizes": [{"id", "stock"}]}; all
+    rows are written in one transaction and unknown ids are reported back.
     """
-    variants_data = request.data.get('variants', [])
-    updated_variants = []
+    variant_stock, variant_errors = parse_stock_entries(request.data.get('variants', []), 'variants')
+    size_stock, size_errors = parse_stock_entries(request.data.get('sizes', []), 'sizes')
     
-    for variant_data in variants_data:
-        variant_id = variant_data.get('id')
-        new_stock = variant_data.get('stock')
-        
-        try:
-            variant = ProductVariant.objects.get(id=variant_id)
-            variant.stock = new_stock
-            variant.save()
-            updated_variants.append({
-                'id': variant.id,
-                'name': variant.name,
-                'stock': variant.stock
-            })
-        except ProductVariant.DoesNotExist:
-            continue
+    if variant_errors or size_errors:
+        return Response({
+            'success': False,
+            'message': 'Invalid stock update payload',
+            'data': {**variant_errors, **size_errors}
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    summary = apply_stock_updates(variant_stock, size_stock)
+    
+    return Response({
+        'success': True,
+        'message': f"Updated stock for {summary['updated_variants']} variants and {summary['updated_sizes']} sizes",
+        'data': summary
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def import_catalog_view(request):
+    """
+    Import a catalog file uploaded as multipart `file` (CSV or JSON Lines).
+    With `sync=true` the file is a full snapshot applied as a delta;
+    `force=true` lets it deactivate a large share of the catalog.
+    Runs in the request, so very large catalogs belong in the import_catalog
+    management command instead.
+    """
+    if not request.user.is_admin:
+        return Response({
+            'success': False,
+            'message': 'Admin access required'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({
+            'success': False,
+            'message': 'A catalog file is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    file_format = request.data.get('format') or os.path.splitext(upload.name)[1].lstrip('.').lower()
+    if file_format not in ('csv', 'jsonl'):
+        return Response({
+            'success': False,
+            'message': 'Catalog format must be csv or jsonl'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not is_utf8(upload.chunks()):
+        return Response({
+            'success': False,
+            'message': 'Catalog file must be UTF-8 encoded'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    upload.seek(0)
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    sync = str(request.data.get('sync', '')).lower() in ('1', 'true', 'yes')
+    force = str(request.data.get('force', '')).lower() in ('1', 'true', 'yes')
+    report = import_catalog(stream, file_format, sync=sync, force=force)
     
     return Response({
         'success': True,
-        'message': f'Updated stock for {len(updated_variants)} variants',
-        'data': updated_variants
+        'message': f"Imported {report['products_created']} products, {report['rows_failed']} rows failed",
+        'data': report
     }, status=status.HTTP_200_OK)
 
 @api_view(['DELETE'])
@@ -851,16 +843,17 @@ class ReviewListCreateView(generics.ListCreateAPIView):
     """
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [filters.OrderingFilter]
-    ordering_fields = ['created_at', 'rating', 'helpful_votes']
-    ordering = ['-created_at']
+    pagination_class = ReviewCursorPagination
     
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Review.objects.none()
         
         product_id = self.kwargs.get('product_id')
-        return Review.objects.filter(product_id=product_id).select_related('user')
+        queryset = Review.objects.filter(product_id=product_id).select_related('user')
+        if self.request.query_params.get('verified') in ('true', '1'):
+            queryset = queryset.filter(is_verified_purchase=True)
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -868,7 +861,11 @@ class ReviewListCreateView(generics.ListCreateAPIView):
         return ReviewSerializer
     
     @swagger_auto_schema(
-        operation_description="List all reviews for a product",
+        operation_description=(
+            "List the reviews of a product in cursor pages. "
+            "?ordering= accepts created_at, helpful_votes or rating (prefix - for descending); "
+            "?verified=true keeps only verified-purchase reviews."
+        ),
         responses={
             200: openapi.Response(
                 description="Reviews retrieved successfully",
@@ -877,20 +874,31 @@ class ReviewListCreateView(generics.ListCreateAPIView):
                     properties={
                         'success': openapi.Schema(type=openapi.TYPE_BOOLEAN),
                         'message': openapi.Schema(type=openapi.TYPE_STRING),
-                        'data': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT))
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'next': openapi.Schema(type=openapi.TYPE_STRING, x_nullable=True),
+                                'previous': openapi.Schema(type=openapi.TYPE_STRING, x_nullable=True),
+                                'results': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT)),
+                            }
+                        )
                     }
                 )
             )
         }
     )
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
         
         return Response({
             'success': True,
             'message': 'Reviews retrieved successfully',
-            'data': serializer.data
+            'data': {
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link(),
+                'results': serializer.data
+            }
         })
     
     @swagger_auto_schema(
@@ -1075,29 +1083,30 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
 )
 def mark_review_helpful(request, review_id):
     """
-    Mark a review as helpful (increment helpful_votes).
+    Mark a review as helpful. Each user counts once per review; see
+    products/votes.py for the buffered counting mode.
     """
     try:
         review = Review.objects.get(id=review_id)
-        review.helpful_votes += 1
-        review.save()
-        
-        return Response({
-            'success': True,
-            'message': 'Review marked as helpful',
-            'data': {
-                'helpful_votes': review.helpful_votes
-            }
-        })
     except Review.DoesNotExist:
         return Response({
             'success': False,
             'message': 'Review not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    
+    recorded = record_helpful_vote(review, request.user)
+    helpful_votes = Review.objects.filter(pk=review.pk).values_list('helpful_votes', flat=True).first()
+    return Response({
+        'success': True,
+        'message': 'Review marked as helpful' if recorded else 'You already marked this review as helpful',
+        'data': {
+            'helpful_votes': helpful_votes
+        }
+    })
 
 
 # Category Views
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     List all categories or create a new category (Admin only for create)
     """
@@ -1279,7 +1288,7 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance = self.get_object()
         
         # Check if any products are using this category
-        product_count = Product.objects.filter(category=instance.name).count()
+        product_count = instance.products.count()
         if product_count > 0:
             return Response({
                 'success': False,
@@ -0,0 +1,69 @@
+from functools import partial
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .cache import invalidate_product_details
+from .models import Product, Review, ReviewVote
+from .signals import PRODUCT_ID_BATCH_SIZE
+
+
+def vote_buffering_enabled():
+    return getattr(settings, 'REVIEW_VOTE_BUFFERING', False)
+
+
+def helpful_votes_changed(product_ids):
+    """
+    Drop the cached details of the products and bump their updated_at, so
+    the detail ETag / Last-Modified follow the embedded vote counts.
+    Nothing else derived from a product depends on votes.
+    """
+    product_ids = sorted(set(product_ids))
+    now = timezone.now()
+    for start in range(0, len(product_ids), PRODUCT_ID_BATCH_SIZE):
+        Product.objects.filter(pk__in=product_ids[start:start + PRODUCT_ID_BATCH_SIZE]).update(updated_at=now)
+    invalidate_product_details(product_ids)
+
+
+def record_helpful_vote(review, user):
+    """
+    Record `user`'s helpful vote on `review`. Returns False when the user
+    already voted. Without buffering the counter is bumped right away with
+    an F() increment; with REVIEW_VOTE_BUFFERING the vote is stored as
+    uncounted and folded into the counter by the flush_review_votes
+    command, so voters on a busy review never queue on its row lock.
+    Counted votes touch the product through helpful_votes_changed once the
+    vote has committed, outside the transaction holding the review row.
+    """
+    buffered = vote_buffering_enabled()
+    try:
+        with transaction.atomic():
+            ReviewVote.objects.create(review=review, user=user, counted=not buffered)
+            if not buffered:
+                Review.objects.filter(pk=review.pk).update(helpful_votes=F('helpful_votes') + 1)
+                transaction.on_commit(partial(helpful_votes_changed, [review.product_id]))
+    except IntegrityError:
+        return False
+    return True
+
+
+def flush_review_votes():
+    """
+    Fold uncounted votes into Review.helpful_votes with one increment per
+    review. Claiming the votes and bumping the counter share a
+    transaction, so concurrent flushes never count a vote twice.
+    Returns the number of votes counted.
+    """
+    counted = 0
+    product_ids = set()
+    pending = ReviewVote.objects.filter(counted=False).values_list('review_id', 'review__product_id').distinct()
+    for review_id, product_id in list(pending):
+        with transaction.atomic():
+            claimed = ReviewVote.objects.filter(review_id=review_id, counted=False).update(counted=True)
+            if claimed:
+                Review.objects.filter(pk=review_id).update(helpful_votes=F('helpful_votes') + claimed)
+        if claimed:
+            counted += claimed
+            product_ids.add(product_id)
+    helpful_votes_changed(product_ids)
+    return counted